@@ -1,4 +1,8 @@
-const CACHE_NAME = 'geomapper-elite-v2';
+const CACHE_NAME = 'geomapper-elite-v3';
+// Map data is written as data/<name>.<hash>.json: a name never changes content,
+// so these files live in their own cache that survives app-shell updates.
+const DATA_CACHE = 'geomapper-data';
+const HASHED_DATA = /\/data\/([\w.-]+?)\.[0-9a-f]{16}\.json$/;
 const ASSETS_TO_CACHE = [
     './mineral_map.html',
     './config.js',
@@ -35,7 +39,7 @@ self.addEventListener('activate', (event) => {
             clients.claim(), // Force new SW to control all clients immediately
             caches.keys().then((keyList) => {
                 return Promise.all(keyList.map((key) => {
-                    if (key !== CACHE_NAME) {
+                    if (key !== CACHE_NAME && key !== DATA_CACHE) {
                         return caches.delete(key);
                     }
                 }));
@@ -49,6 +53,20 @@ self.addEventListener('fetch', (event) => {
     // Ignora requests not http/https (like chrome-extension)
     if (!event.request.url.startsWith('http')) return;
 
+    const url = new URL(event.request.url);
+    const hashed = url.pathname.match(HASHED_DATA);
+    if (hashed) {
+        event.respondWith(cacheHashedData(event.request, hashed[1]));
+        return;
+    }
+    if (event.request.mode === 'navigate') {
+        // Network first for pages, so a rebuilt page's new data hash is picked up
+        event.respondWith(
+            fetch(event.request).catch(() => caches.match(event.request))
+        );
+        return;
+    }
+
     event.respondWith(
         caches.match(event.request).then((response) => {
             return response || fetch(event.request).then((networkResponse) => {
@@ -59,3 +77,20 @@ self.addEventListener('fetch', (event) => {
         })
     );
 });
+
+// Cache-first for hashed data; keeps only the newest hash of each data file
+async function cacheHashedData(request, stem) {
+    const cache = await caches.open(DATA_CACHE);
+    const cached = await cache.match(request);
+    if (cached) return cached;
+
+    const response = await fetch(request);
+    if (response.ok) {
+        for (const old of await cache.keys()) {
+            const match = new URL(old.url).pathname.match(HASHED_DATA);
+            if (match && match[1] === stem) await cache.delete(old);
+        }
+        await cache.put(request, response.clone());
+    }
+    return response;
+}
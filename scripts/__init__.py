@@ -1,2 +1,24 @@
 # scripts package init: allow tests to import scripts as a package
-__all__ = ["build_nc_localities", "build_site"]
+__all__ = [
+    "async_fetch",
+    "build_manifest",
+    "build_nc_localities",
+    "build_site",
+    "census_join",
+    "columnar_points",
+    "fuzzy_dedupe",
+    "geojson_writer",
+    "geoparquet_io",
+    "http_cache",
+    "http_session",
+    "map_assets",
+    "osm_pbf",
+    "osm_snapshot",
+    "overpass_area",
+    "overpass_stream",
+    "overpass_tiles",
+    "run_metrics",
+    "us_states",
+    "vector_tiles",
+    "web_map",
+]
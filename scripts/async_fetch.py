@@ -0,0 +1,299 @@
+"""
+asyncio fetch layer for the pipeline's HTTP requests (Nominatim, Overpass, TIGER).
+
+An alternative to the thread-per-request ``requests`` code path: an
+``AsyncFetcher`` owns one ``httpx.AsyncClient`` (HTTP/2 when the ``h2`` package
+is installed, so concurrent requests to one host share a connection), and every
+request waits for a bounded semaphore of its host before it is sent. Hundreds of
+concurrent tile queries then cost one thread and a handful of sockets.
+
+Per host, requests also go through the limiters of ``http_session``: the rate
+limits of ``HOST_LIMITS``, a shared back-off (a ``Retry-After``, or the backoff
+after a 429/503, holds back every request to that host) and, for the Overpass
+instance given to ``watch_overpass``, a free slot claimed from its
+``/api/status`` before each query. Inside ``http_session.shared_limits()`` all
+of these are shared with the other processes. Responses in
+``status_forcelist`` are retried with exponential backoff, like the
+``requests`` sessions.
+
+Bodies are streamed straight to disk with ``download``; ``get_json`` reads small
+JSON responses (Nominatim) into memory.
+
+    async with AsyncFetcher(headers=HEADERS) as fetcher:
+        status, headers = await fetcher.download("GET", url, Path("tl.zip"))
+
+Requires ``httpx`` (``pip install httpx[http2]``).
+"""
+
+from __future__ import annotations
+
+import asyncio
+import copy
+import importlib.util
+import json
+import logging
+import os
+from contextlib import asynccontextmanager
+from pathlib import Path
+from urllib.parse import urlsplit
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+try:
+    from scripts import http_session, run_metrics
+except ImportError:  # executed as ``python scripts/...``
+    import http_session
+    import run_metrics
+
+logger = logging.getLogger(__name__)
+# httpx logs every request at INFO; keep the per-tile noise out of the run log
+logging.getLogger("httpx").setLevel(logging.WARNING)
+
+HTTP2 = importlib.util.find_spec("h2") is not None
+# Concurrent requests per host; Nominatim's usage policy allows one at a time
+HOST_CONCURRENCY = {
+    "nominatim.openstreetmap.org": 1,
+    "www2.census.gov": 8,
+}
+DEFAULT_CONCURRENCY = 16
+CHUNK_SIZE = 1024 * 1024
+
+
+class _Host:
+    """Semaphore of one host, with its ``http_session`` limiter."""
+
+    def __init__(self, concurrency, limiter):
+        self.semaphore = asyncio.BoundedSemaphore(concurrency)
+        self.limiter = limiter
+        self.gate = asyncio.Lock()  # one slot claim at a time in this process
+
+    async def wait(self):
+        while True:
+            delay = self.limiter.reserve()
+            if delay <= 0:
+                return
+            await asyncio.sleep(delay)
+
+
+@asynccontextmanager
+async def _holding(state):
+    """Hold a limiter state's (blocking) lock without blocking the event loop."""
+    lock = state.locked()
+    await asyncio.to_thread(lock.__enter__)
+    try:
+        yield
+    finally:
+        lock.__exit__(None, None, None)
+
+
+class AsyncFetcher:
+    """One HTTP client with per-host concurrency bounds; use as ``async with``.
+
+    ``concurrency`` overrides ``HOST_CONCURRENCY`` per host (``{"host": n}``);
+    other hosts get ``default_concurrency``.
+    """
+
+    def __init__(
+        self,
+        headers=None,
+        total_retries=5,
+        status_forcelist=(429, 500, 502, 503, 504),
+        concurrency=None,
+        default_concurrency=DEFAULT_CONCURRENCY,
+        http2=None,
+    ):
+        if httpx is None:
+            raise ImportError(
+                "httpx is required for the async fetch layer (pip install httpx[http2])"
+            )
+        self.headers = dict(headers or {})
+        self.total_retries = total_retries
+        self.status_forcelist = frozenset(status_forcelist)
+        self.concurrency = {**HOST_CONCURRENCY, **(concurrency or {})}
+        self.default_concurrency = default_concurrency
+        self.http2 = HTTP2 if http2 is None else http2
+        # Overpass status pages are read by this fetcher, not a requests session
+        self.limits = http_session.Limits(status_session=None)
+        self._hosts = {}
+        self.client = None
+
+    async def __aenter__(self):
+        # enough connections for every host's semaphore; HTTP/2 needs only one each
+        self.client = httpx.AsyncClient(
+            headers=self.headers,
+            http2=self.http2,
+            follow_redirects=True,
+            limits=httpx.Limits(max_connections=None, max_keepalive_connections=32),
+        )
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.client.aclose()
+        self.client = None
+        return False
+
+    def watch_overpass(self, interpreter_url):
+        """Make queries to this Overpass instance wait for free slots."""
+        self.limits.watch_overpass(interpreter_url)
+
+    def _host(self, url) -> _Host:
+        limiter = self.limits.for_url(url)
+        host = self._hosts.get(id(limiter))
+        if host is None:
+            name = urlsplit(url).hostname or ""
+            host = self._hosts[id(limiter)] = _Host(
+                self.concurrency.get(name, self.default_concurrency), limiter
+            )
+        return host
+
+    async def _overpass_status(self, limiter):
+        try:
+            resp = await self.client.get(limiter.status_url, timeout=15)
+            resp.raise_for_status()
+        except httpx.HTTPError as e:
+            logger.debug(f"Overpass status unavailable ({e}); not limiting by slots")
+            return None
+        return limiter.update_status(resp.text)
+
+    async def _claim_slot(self, host):
+        """Wait for a free Overpass slot (see ``http_session.OverpassLimiter``)."""
+        limiter = host.limiter
+        async with host.gate, _holding(limiter.gate):
+            while True:
+                wait = limiter.claim(await self._overpass_status(limiter))
+                if not wait:
+                    return
+                logger.info(f"No Overpass slot free; waiting {wait:.0f}s")
+                await asyncio.sleep(wait)
+
+    def with_status_forcelist(self, status_forcelist) -> AsyncFetcher:
+        """This fetcher (same client and host limits) retrying other statuses."""
+        view = copy.copy(self)
+        view.status_forcelist = frozenset(status_forcelist)
+        return view
+
+    def with_total_retries(self, total_retries) -> AsyncFetcher:
+        """This fetcher (same client and host limits) retrying fewer or more times."""
+        view = copy.copy(self)
+        view.total_retries = total_retries
+        return view
+
+    async def _send(
+        self, method, url, consume, *, params=None, data=None, headers=None, timeout=60
+    ):
+        """Send a request, retrying ``status_forcelist`` responses, and return
+        ``await consume(response)`` for the final response (still streaming)."""
+        host = self._host(url)
+        overpass = isinstance(host.limiter, http_session.OverpassLimiter)
+        # a raw body (an Overpass query) is sent as is, like ``requests``' data=str
+        body = {"content": data} if isinstance(data, (str, bytes)) else {"data": data}
+        attempt = 0
+        while True:
+            async with host.semaphore:
+                if overpass:
+                    await self._claim_slot(host)
+                try:
+                    await host.wait()
+                    async with self.client.stream(
+                        method,
+                        url,
+                        params=params,
+                        headers=headers,
+                        timeout=timeout,
+                        **body,
+                    ) as resp:
+                        retry = (
+                            resp.status_code in self.status_forcelist
+                            and attempt < self.total_retries
+                            and method.upper() in http_session.RETRY_METHODS
+                        )
+                        if not retry:
+                            return await consume(resp)
+                finally:
+                    # the body has been read or discarded: the query is over
+                    host.limiter.after_request()
+            delay = http_session.retry_after_seconds(resp)
+            if delay is None:
+                delay = min(
+                    http_session.MAX_BACKOFF, http_session.BACKOFF_FACTOR * 2**attempt
+                )
+            attempt += 1
+            logger.info(
+                f"{method} {url} returned {resp.status_code}; "
+                f"retry {attempt}/{self.total_retries} in {delay:.0f}s"
+            )
+            if resp.status_code in http_session.THROTTLE_STATUSES:
+                host.limiter.defer(delay)  # every request to the host waits
+            else:
+                await asyncio.sleep(delay)
+
+    async def status(self, method, url, timeout=30) -> int:
+        """Status code of a request whose body is not needed (e.g. a HEAD probe)."""
+
+        async def consume(resp):
+            return resp.status_code
+
+        return await self._send(method, url, consume, timeout=timeout)
+
+    async def get_json(self, method, url, *, params=None, data=None, timeout=60):
+        """Parsed JSON body of a successful response; error statuses raise
+        ``httpx.HTTPStatusError``."""
+
+        async def consume(resp):
+            resp.raise_for_status()
+            body = await resp.aread()
+            run_metrics.count_bytes(resp.num_bytes_downloaded)
+            return json.loads(body)
+
+        return await self._send(
+            method, url, consume, params=params, data=data, timeout=timeout
+        )
+
+    async def download(
+        self,
+        method,
+        url,
+        path: Path,
+        *,
+        params=None,
+        data=None,
+        headers=None,
+        timeout=120,
+    ):
+        """Stream a response body to ``path``; returns ``(status, headers)``.
+
+        The file is written next to ``path`` and moved into place once complete.
+        A 304 leaves ``path`` untouched; other error statuses raise
+        ``httpx.HTTPStatusError``.
+        """
+
+        async def consume(resp):
+            if resp.status_code == 304:
+                return resp.status_code, resp.headers
+            resp.raise_for_status()
+            tmp = Path(f"{path}.part")
+            try:
+                with open(tmp, "wb") as fh:
+                    async for chunk in resp.aiter_bytes(CHUNK_SIZE):
+                        # a slow disk must not stall the other transfers
+                        await asyncio.to_thread(fh.write, chunk)
+                os.replace(tmp, path)
+            except BaseException:
+                if tmp.exists():
+                    tmp.unlink()
+                raise
+            run_metrics.count_bytes(resp.num_bytes_downloaded)
+            return resp.status_code, resp.headers
+
+        return await self._send(
+            method,
+            url,
+            consume,
+            params=params,
+            data=data,
+            headers=headers,
+            timeout=timeout,
+        )
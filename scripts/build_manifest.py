@@ -0,0 +1,150 @@
+"""
+Build manifest for incremental site builds.
+
+``<site-dir>/.build-manifest.json`` records, per build step (``map``,
+``mineral_map``, ...), the SHA-256 of each input, a version hash of the scripts
+that produce the step's outputs, the step's parameters and the hash of every
+output file (relative to the site dir):
+
+    {"version": 1, "steps": {"mineral_map": {
+        "inputs": {"csv": "<sha256>"}, "script": "<sha256>", "params": {"payload": "columnar"},
+        "outputs": {"mineral_map.html": "<sha256>", "data/minerals.<hash>.json": "<sha256>"}}}}
+
+A step is skipped when all of these match and its outputs are still on disk with
+the recorded contents. Independently, ``write_if_changed``/``copy_if_changed``
+never rewrite a file whose bytes are unchanged, so mtimes survive for rsync and
+Pages deploys even when a step does run.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import tempfile
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_NAME = ".build-manifest.json"
+MANIFEST_VERSION = 1
+
+
+def file_hash(path: Path) -> str | None:
+    """SHA-256 of a file's bytes, or None when it does not exist."""
+    h = hashlib.sha256()
+    try:
+        with open(path, "rb") as fh:
+            for block in iter(lambda: fh.read(1 << 20), b""):
+                h.update(block)
+    except FileNotFoundError:
+        return None
+    return h.hexdigest()
+
+
+def script_version(*modules) -> str:
+    """Hash of the source of the given modules (the code that produces a step)."""
+    h = hashlib.sha256()
+    for module in modules:
+        h.update(Path(module.__file__).read_bytes())
+    return h.hexdigest()
+
+
+def write_if_changed(path: Path, data) -> bool:
+    """Atomically write ``data`` unless ``path`` already holds exactly these bytes.
+
+    Returns True when the file was written.
+    """
+    if isinstance(data, str):
+        data = data.encode("utf8")
+    path = Path(path)
+    try:
+        if path.stat().st_size == len(data) and path.read_bytes() == data:
+            return False
+    except FileNotFoundError:
+        pass
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as fh:
+            fh.write(data)
+        os.chmod(tmp, 0o644)
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.unlink(tmp)
+        raise
+    return True
+
+
+def copy_if_changed(src: Path, dest: Path) -> bool:
+    """Copy ``src`` to ``dest`` unless the contents are already identical."""
+    src, dest = Path(src), Path(dest)
+    try:
+        if src.stat().st_size == dest.stat().st_size and file_hash(src) == file_hash(
+            dest
+        ):
+            return False
+    except FileNotFoundError:
+        pass
+    return write_if_changed(dest, src.read_bytes())
+
+
+class BuildManifest:
+    """The manifest of one site directory; ``force`` makes every step run."""
+
+    def __init__(self, site_dir: Path, force=False):
+        self.site_dir = Path(site_dir)
+        self.path = self.site_dir / MANIFEST_NAME
+        self.force = force
+        self.steps = {}
+        try:
+            with open(self.path, "r", encoding="utf8") as fh:
+                data = json.load(fh)
+            if data.get("version") == MANIFEST_VERSION:
+                self.steps = data.get("steps", {})
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable build manifest {self.path}: {e}")
+
+    def _signature(self, inputs, script, params):
+        return {
+            "inputs": {name: file_hash(path) for name, path in inputs.items()},
+            "script": script,
+            "params": params or {},
+        }
+
+    def up_to_date(self, step, inputs, script, params=None) -> bool:
+        """Whether ``step`` can be skipped: same inputs, script and params, and
+        its recorded outputs are unchanged on disk."""
+        if self.force:
+            return False
+        record = self.steps.get(step)
+        if not record or not record.get("outputs"):
+            return False
+        signature = self._signature(inputs, script, params)
+        if any(record.get(k) != v for k, v in signature.items()):
+            return False
+        return all(
+            file_hash(self.site_dir / rel) == digest
+            for rel, digest in record["outputs"].items()
+        )
+
+    def record(self, step, inputs, script, outputs, params=None):
+        """Record a completed step; ``outputs`` are paths inside the site dir."""
+        entry = self._signature(inputs, script, params)
+        entry["outputs"] = {
+            Path(p)
+            .resolve()
+            .relative_to(self.site_dir.resolve())
+            .as_posix(): file_hash(p)
+            for p in outputs
+        }
+        self.steps[step] = entry
+        self.save()
+
+    def save(self):
+        data = {"version": MANIFEST_VERSION, "steps": self.steps}
+        write_if_changed(self.path, json.dumps(data, indent=2, sort_keys=True) + "\n")
@@ -9,8 +9,19 @@ from __future__ import annotations
 
 import argparse
 import logging
+import sys
 from pathlib import Path
 
+try:
+    from scripts import build_manifest, columnar_points, geojson_writer, map_assets
+except ImportError:  # executed as ``python scripts/build_mineral_map.py``
+    import build_manifest
+    import columnar_points
+    import geojson_writer
+    import map_assets
+
+PAYLOADS = ("columnar", "geojson")
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -20,45 +31,41 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
-def build_mineral_map(data_csv: Path, site_dir: Path):
-    """Build an interactive map from the mineral localities CSV."""
+def build_mineral_map(data_csv: Path, site_dir: Path, payload="columnar"):
+    """Build an interactive map from the mineral localities CSV.
+
+    The points go to a hashed data file in the ``payload`` format: the compact
+    ``columnar_points`` layout (default) or GeoJSON. Returns the files written
+    (unchanged files are left alone), or None on failure.
+    """
     try:
         import pandas as pd
         import json
     except ImportError as e:
         logger.error(f"Required library not available: {e}")
-        return
+        return None
 
     if not data_csv.exists():
         logger.error(f"Mineral localities CSV not found: {data_csv}")
-        return
+        return None
 
     # Read the CSV
     df = pd.read_csv(data_csv)
     logger.info(f"Loaded {len(df)} mineral localities from CSV")
 
-    # Create GeoJSON features
-    features = []
-    for _, row in df.iterrows():
-        feature = {
-            "type": "Feature",
-            "properties": {
-                "name": row["name"],
-                "mineral_type": row["mineral_type"],
-                "description": row["description"],
-            },
-            "geometry": {
-                "type": "Point",
-                "coordinates": [float(row["longitude"]), float(row["latitude"])],
-            },
-        }
-        features.append(feature)
-
-    geojson_data = {"type": "FeatureCollection", "features": features}
-
-    # Create the HTML map with embedded GeoJSON
+    # Serialise the points straight from the columns into a content-hashed data
+    # file next to the page; the page fetches it, so it can be cached separately
     map_html = site_dir / "mineral_map.html"
-    geojson_str = json.dumps(geojson_data)
+    writer = columnar_points if payload == "columnar" else geojson_writer
+    data = writer.dumps_points(
+        df["longitude"].to_numpy(dtype=float),
+        df["latitude"].to_numpy(dtype=float),
+        {col: df[col].to_numpy() for col in ("name", "mineral_type", "description")},
+    )
+    data_file = map_assets.write_hashed(
+        data, site_dir / map_assets.DATA_DIR, "minerals"
+    )
+    data_url = f"{map_assets.DATA_DIR}/{data_file.name}"
 
     # Color coding by mineral type
     color_map = {
@@ -323,8 +330,8 @@ html,body,#map{{height:100%;margin:0;padding:0;font-family:Arial,sans-serif}}
 
 <script src="https://unpkg.com/leaflet@1.9.4/dist/leaflet.js"></script>
 <script src="https://unpkg.com/leaflet.markercluster@1.5.3/dist/leaflet.markercluster.js"></script>
-<script>
-const data = {geojson_str};
+<script>{columnar_points.DECODER_JS}
+const dataUrl = {json.dumps(data_url)};
 // Expose colorMap to window for external JS
 window.colorMap = {json.dumps(color_map)};
 const colorMap = window.colorMap;
@@ -368,8 +375,9 @@ function formatMineralType(type) {{
     return type.replace(/_/g, ' ').replace(/\\b\\w/g, l => l.toUpperCase());
 }}
 
-// Create markers
-if (data && data.features && data.features.length > 0) {{
+// Create markers once the data file has loaded
+function addFeatures(data) {{
+    if (!(data && data.features && data.features.length > 0)) return;
     data.features.forEach(feature => {{
         const props = feature.properties || {{}};
         const coords = feature.geometry.coordinates;
@@ -417,6 +425,7 @@ if (data && data.features && data.features.length > 0) {{
     updateMarkers();
     map.fitBounds(mapState.markerCluster.getBounds(), {{maxZoom: 8}});
 }}
+fetch(dataUrl).then((r) => r.json()).then((p) => addFeatures(loadPoints(p)));
 
 // Update markers based on filters
 function updateMarkers() {{
@@ -655,11 +664,14 @@ function resetView() {{
 </html>"""
 
     try:
-        with open(map_html, "w", encoding="utf8") as f:
-            f.write(html_content)
-        logger.info(f"Created mineral localities map: {map_html}")
+        if build_manifest.write_if_changed(map_html, html_content):
+            logger.info(f"Created mineral localities map: {map_html}")
+        else:
+            logger.info(f"{map_html} is up to date")
     except Exception as e:
         logger.error(f"Failed to write mineral map: {e}")
+        return None
+    return [map_html, data_file]
 
 
 def main(argv=None):
@@ -672,13 +684,35 @@ def main(argv=None):
     parser.add_argument(
         "--site-dir", default="./site", help="Path to site/ folder to modify"
     )
+    parser.add_argument(
+        "--payload",
+        choices=PAYLOADS,
+        default="columnar",
+        help="Format of the map's data file: compact columnar (default) or GeoJSON",
+    )
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="Rebuild the map even if the build manifest says it is up to date",
+    )
     args = parser.parse_args(argv)
 
     data_csv = Path(args.data_csv).resolve()
     site_dir = Path(args.site_dir).resolve()
     site_dir.mkdir(parents=True, exist_ok=True)
 
-    build_mineral_map(data_csv, site_dir)
+    manifest = build_manifest.BuildManifest(site_dir, force=args.force)
+    inputs = {"csv": data_csv}
+    script = build_manifest.script_version(
+        sys.modules[__name__], columnar_points, geojson_writer, map_assets
+    )
+    params = {"payload": args.payload}
+    if manifest.up_to_date("mineral_map", inputs, script, params):
+        logger.info("mineral_map.html is up to date; skipping (use --force to rebuild)")
+        return
+    outputs = build_mineral_map(data_csv, site_dir, payload=args.payload)
+    if outputs:
+        manifest.record("mineral_map", inputs, script, outputs, params)
 
 
 if __name__ == "__main__":
@@ -8,18 +8,21 @@ Usage:
 """
 
 import argparse
+import asyncio
 import json
 import logging
 import os
+import shutil
 import sys
 import tempfile
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
 from pathlib import Path
+from urllib.parse import urlsplit
 
 # Third-party imports
 try:
     import requests
-    from requests.adapters import HTTPAdapter
-    from urllib3.util.retry import Retry
 except ImportError:
     requests = None
 
@@ -34,9 +37,15 @@ except ImportError:
     pd = None
 
 try:
-    from shapely.geometry import Point
+    import numpy as np
+except ImportError:
+    np = None
+
+try:
+    from shapely.geometry import Point, shape
 except ImportError:
     Point = None
+    shape = None
 
 try:
     from tqdm import tqdm
@@ -45,15 +54,83 @@ except ImportError:
     def tqdm(iterable, **kwargs):
         return iterable
 
+try:
+    from scripts import (
+        async_fetch,
+        build_manifest,
+        census_join,
+        fuzzy_dedupe,
+        geojson_writer,
+        geoparquet_io,
+        http_cache,
+        http_session,
+        map_assets,
+        osm_pbf,
+        osm_snapshot,
+        overpass_area,
+        overpass_stream,
+        overpass_tiles,
+        run_metrics,
+        us_states,
+        vector_tiles,
+        web_map,
+    )
+except ImportError:  # executed as ``python scripts/build_nc_localities.py``
+    import async_fetch
+    import build_manifest
+    import census_join
+    import fuzzy_dedupe
+    import geojson_writer
+    import geoparquet_io
+    import http_cache
+    import http_session
+    import map_assets
+    import osm_pbf
+    import osm_snapshot
+    import overpass_area
+    import overpass_stream
+    import overpass_tiles
+    import run_metrics
+    import us_states
+    import vector_tiles
+    import web_map
 
 # Constants
-NOMINATIM_URL = "https://nominatim.openstreetmap.org/search"
-OVERPASS_URL = "https://overpass-api.de/api/interpreter"
-CENSUS_BASE = "https://www2.census.gov/geo/tiger/"
+# Service endpoints; each can be overridden by the environment variable of the
+# same name (e.g. to point at scripts/dev_tools/http_standin.py)
+NOMINATIM_URL = os.environ.get(
+    "NOMINATIM_URL", "https://nominatim.openstreetmap.org/search"
+)
+OVERPASS_URL = os.environ.get("OVERPASS_URL", "https://overpass-api.de/api/interpreter")
+CENSUS_BASE = (
+    os.environ.get("CENSUS_BASE", "https://www2.census.gov/geo/tiger/").rstrip("/")
+    + "/"
+)
 
 # User agent to avoid being blocked
 HEADERS = {"User-Agent": "nc-localities/1.0 (+https://example.com)"}
 
+# How long cached responses are served without revalidation (seconds)
+NOMINATIM_CACHE_TTL = 30 * 24 * 3600
+OVERPASS_CACHE_TTL = 24 * 3600
+CENSUS_CACHE_TTL = 90 * 24 * 3600
+
+# Column layout of the GeoDataFrame returned by fetch_osm_places
+OSM_COLUMNS = ["osm_id", "osm_type", "name", "place", "population", "tags", "geometry"]
+# Column layout of the exported localities (prepare_out_geo output)
+OUT_COLUMNS = [
+    "osm_id",
+    "osm_type",
+    "final_name",
+    "place",
+    "population",
+    "geoid",
+    "geometry",
+]
+
+# NC bounding box: approximately 33.8°N to 36.6°N, -84.3°W to -75.4°W
+NC_BBOX = "33.8,-84.3,36.6,-75.4"  # south,west,north,east
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -63,32 +140,45 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
-def get_requests_session():
-    """Create a requests session with retry logic."""
+def get_requests_session(total_retries=5, status_forcelist=(429, 500, 502, 503, 504)):
+    """The run's session for this retry policy.
+
+    All sessions share one connection pool and the per-host rate limiters of
+    http_session; Overpass requests also wait for free slots on OVERPASS_URL.
+    """
     if requests is None:
         return None
-    session = requests.Session()
-    retries = Retry(
-        total=5,
-        backoff_factor=1,
-        status_forcelist=[429, 500, 502, 503, 504],
-        allowed_methods=["HEAD", "GET", "POST", "OPTIONS"],
-    )
-    adapter = HTTPAdapter(max_retries=retries)
-    session.mount("https://", adapter)
-    session.mount("http://", adapter)
-    session.headers.update(HEADERS)
+    session = http_session.get_session(
+        total_retries,
+        status_forcelist,
+        headers=HEADERS,
+        hooks=[run_metrics.count_response_bytes],
+    )
+    http_session.watch_overpass(OVERPASS_URL)
     return session
 
 
+def points_from_lonlat(lon, lat, crs="EPSG:4326"):
+    """Build point geometries for coordinate arrays in a single vectorised call.
+
+    Falls back to one shapely Point per row when NumPy or geopandas'
+    ``points_from_xy`` are unavailable.
+    """
+    if np is not None and hasattr(gpd, "points_from_xy"):
+        lon = np.asarray(lon, dtype=np.float64)
+        lat = np.asarray(lat, dtype=np.float64)
+        return gpd.points_from_xy(lon, lat, crs=crs)
+    return [Point(xy) for xy in zip(lon, lat, strict=True)]
+
+
 def load_mineral_localities_from_csv(csv_path: Path):
     """Load mineral locality data from CSV file."""
     logger.info(f"Loading mineral localities from {csv_path}")
-    
+
     if not csv_path.exists():
         logger.error(f"Mineral localities CSV not found: {csv_path}")
         return None
-    
+
     try:
         if pd is None:
             logger.error("pandas is required to read CSV files")
@@ -96,17 +186,17 @@ def load_mineral_localities_from_csv(csv_path: Path):
         if gpd is None or Point is None:
             logger.error("geopandas and shapely are required for spatial data")
             return None
-            
+
         # Read CSV
         df = pd.read_csv(csv_path)
         logger.info(f"Loaded {len(df)} mineral localities from CSV")
-        
+
         # Create Point geometries from lat/lon
-        geometry = [Point(xy) for xy in zip(df['longitude'], df['latitude'])]
-        
+        geometry = points_from_lonlat(df["longitude"], df["latitude"])
+
         # Create GeoDataFrame
         gdf = gpd.GeoDataFrame(df, geometry=geometry, crs="EPSG:4326")
-        
+
         # Rename columns to match expected format
         gdf['final_name'] = gdf['name']
         gdf['place'] = gdf['mineral_type']
@@ -114,67 +204,341 @@ def load_mineral_localities_from_csv(csv_path: Path):
         gdf['osm_id'] = range(1, len(gdf) + 1)  # Generate IDs
         gdf['osm_type'] = 'mineral_site'
         gdf['geoid'] = ''
-        
+
         return gdf
-        
+
     except Exception as e:
         logger.error(f"Failed to load mineral localities from CSV: {e}")
         return None
 
 
-def fetch_state_polygon(state_name="North Carolina"):
-    session = get_requests_session()
-    if session is None:
-        raise ImportError("requests library is required for fetching data")
+def make_response_cache(args):
+    """Build the on-disk response cache from CLI args, or None if disabled."""
+    if not args.cache_dir:
+        return None
+    return http_cache.ResponseCache(
+        Path(args.cache_dir),
+        max_bytes=args.cache_max_mb * 1024 * 1024,
+        offline=args.offline,
+    )
 
-    params = {
-        "q": state_name,
+
+def state_search_params(state_name):
+    """Nominatim search parameters for a US state's boundary.
+
+    A structured query: free text matches other places first ("Georgia" is also
+    a country, "Washington" a city and DC).
+    """
+    return {
+        "state": state_name,
+        "country": "United States",
         "format": "jsonv2",
         "polygon_geojson": 1,
     }
+
+
+def fetch_state_polygon(state_name="North Carolina", cache=None):
+    session = get_requests_session()
+    if session is None:
+        raise ImportError("requests library is required for fetching data")
+
+    params = state_search_params(state_name)
     logger.info(f"Fetching state polygon for {state_name} from Nominatim...")
     try:
-        resp = session.get(NOMINATIM_URL, params=params, timeout=60)
-        resp.raise_for_status()
-        items = resp.json()
+        if cache is not None:
+            entry = cache.fetch(
+                session, "GET", NOMINATIM_URL, params=params, ttl=NOMINATIM_CACHE_TTL
+            )
+            items = entry.json()
+        else:
+            resp = session.get(NOMINATIM_URL, params=params, timeout=60)
+            resp.raise_for_status()
+            items = resp.json()
     except requests.RequestException as e:
         logger.error(f"Network error fetching state polygon: {e}")
         raise
     except json.JSONDecodeError as e:
         logger.error(f"JSON decode error fetching state polygon: {e}")
         raise
+    return state_from_nominatim(items, state_name)
 
+
+def state_from_nominatim(items, state_name):
+    """Pick the state's boundary from Nominatim search results."""
     if not items:
         raise RuntimeError(f"State polygon for {state_name} not found via Nominatim")
-    
+
     for itm in items:
-        if itm.get("osm_type") in ("relation", "way") and "geojson" in itm:
+        if (
+            itm.get("osm_type") in ("relation", "way")
+            and "geojson" in itm
+            and itm.get("addresstype") == "state"
+            and itm.get("type") == "administrative"
+        ):
             return itm
-    return items[0]
+    found = ", ".join(
+        f"{itm.get('display_name')} ({itm.get('addresstype')})" for itm in items
+    )
+    raise RuntimeError(f"No state boundary for {state_name} in Nominatim: {found}")
 
 
 def polygon_to_overpass_poly(poly_geojson):
     coords = poly_geojson["coordinates"][0]
+    if poly_geojson.get("type") == "MultiPolygon":
+        # First polygon's exterior ring
+        coords = coords[0]
     return " ".join(f"{lat} {lon}" for lon, lat in coords)
 
 
-def fetch_osm_places(polygon_str=None):
+def geojson_to_overpass_bbox(poly_geojson):
+    """Return the Overpass ``south,west,north,east`` bbox of a GeoJSON geometry."""
+    west, south, east, north = shape(poly_geojson).bounds
+    return f"{south},{west},{north},{east}"
+
+
+def empty_osm_gdf():
+    return gpd.GeoDataFrame(columns=OSM_COLUMNS, geometry="geometry", crs="EPSG:4326")
+
+
+def osm_places_from_batches(batches):
+    """Assemble columnar place batches (see overpass_stream) into a GeoDataFrame."""
+    parts = []
+    for batch in batches:
+        geometry = points_from_lonlat(batch["lon"], batch["lat"])
+        data = {col: batch[col] for col in OSM_COLUMNS if col != "geometry"}
+        parts.append(gpd.GeoDataFrame(data, geometry=geometry, crs="EPSG:4326"))
+    if not parts:
+        return empty_osm_gdf()
+    if len(parts) == 1:
+        return parts[0]
+    return gpd.GeoDataFrame(pd.concat(parts, ignore_index=True), crs="EPSG:4326")
+
+
+def with_osm_base(gdf, timestamp):
+    """Record in ``gdf.attrs["osm_base"]`` the Overpass database time its places
+    reflect (``timestamp_osm_base``); incremental refreshes resume from it."""
+    if timestamp:
+        gdf.attrs["osm_base"] = timestamp
+    return gdf
+
+
+def osm_places_from_file(path, batch_size=None):
+    """Parse a saved Overpass JSON response incrementally into a GeoDataFrame."""
+    batch_size = batch_size or overpass_stream.DEFAULT_BATCH_SIZE
+    chunks = overpass_stream.iter_file_chunks(path)
+    header = {}
+    elements = overpass_stream.iter_elements(chunks, header)
+    gdf = osm_places_from_batches(
+        overpass_stream.iter_place_batches(elements, batch_size)
+    )
+    return with_osm_base(gdf, header.get("timestamp_osm_base"))
+
+
+def stream_osm_places(session, payload, cache=None, batch_size=None):
+    """Run an Overpass query and parse the response incrementally into a GeoDataFrame."""
+    batch_size = batch_size or overpass_stream.DEFAULT_BATCH_SIZE
+    if cache is not None:
+        entry = cache.fetch(
+            session,
+            "POST",
+            OVERPASS_URL,
+            data=payload,
+            ttl=OVERPASS_CACHE_TTL,
+            timeout=600,
+        )
+        return osm_places_from_file(entry.path, batch_size)
+
+    resp = session.post(OVERPASS_URL, data=payload, timeout=600, stream=True)
+    resp.raise_for_status()
+    try:
+        header = {}
+        elements = overpass_stream.iter_elements(
+            resp.iter_content(chunk_size=1 << 20), header
+        )
+        gdf = osm_places_from_batches(
+            overpass_stream.iter_place_batches(elements, batch_size)
+        )
+        return with_osm_base(gdf, header.get("timestamp_osm_base"))
+    finally:
+        resp.close()
+
+
+def overpass_place_query(
+    filters, timeout=300, limit=None, newer=None, out="center tags"
+):
+    """Build the place query for a list of Overpass spatial filters (bbox or poly).
+
+    ``newer`` restricts the result to elements modified after that timestamp.
+    """
+    newer_filter = f'(newer:"{newer}")' if newer else ""
+    clauses = "".join(
+        f'{kind}["place"]({flt}){newer_filter};'
+        for flt in filters
+        for kind in ("node", "way", "relation")
+    )
+    out_limit = f" {limit}" if limit else ""
+    return f"[out:json][timeout:{timeout}];({clauses});out {out}{out_limit};"
+
+
+def fetch_osm_changes(filters, since):
+    """Return ``(changed_gdf, current_keys)`` for places modified after ``since``.
+
+    ``current_keys`` holds the (type, id) of every place that currently exists in
+    the area, so callers can detect deletions.
+    """
     session = get_requests_session()
     if session is None:
         raise ImportError("requests library is required for fetching data")
 
-    # Use bounding box for North Carolina instead of complex polygon
-    # NC bounding box: approximately 33.8°N to 36.6°N, -84.3°W to -75.4°W
-    bbox = "33.8,-84.3,36.6,-75.4"  # south,west,north,east
-    
-    node_query = f'(node["place"]({bbox});way["place"]({bbox});relation["place"]({bbox}););out center tags;'
-    payload = f"[out:json][timeout:300];{node_query}"
-
-    logger.info("Querying Overpass API for places in NC bounding box...")
+    logger.info(f"Querying Overpass for places changed since {since}...")
     try:
-        resp = session.post(OVERPASS_URL, data=payload, timeout=600)
+        resp = session.post(
+            OVERPASS_URL, data=overpass_place_query(filters, newer=since), timeout=600
+        )
         resp.raise_for_status()
         data = resp.json()
+        changed = overpass_complete_elements(data)
+        resp = session.post(
+            OVERPASS_URL, data=overpass_place_query(filters, out="ids"), timeout=600
+        )
+        resp.raise_for_status()
+        current = overpass_complete_elements(resp.json())
+    except requests.RequestException as e:
+        logger.error(f"Network error fetching OSM changes: {e}")
+        raise
+
+    current_keys = {(el.get("type"), el.get("id")) for el in current}
+    batches = overpass_stream.iter_place_batches(
+        changed, batch_size=max(len(changed), 1)
+    )
+    gdf = osm_places_from_batches(batches)
+    return with_osm_base(gdf, overpass_stream.osm_base_timestamp(data)), current_keys
+
+
+def overpass_tile_elements(data):
+    """A tile response's elements; raises TileTooLarge if the server gave up on it."""
+    remark = data.get("remark") or ""
+    if "timed out" in remark or "out of memory" in remark:
+        raise overpass_tiles.TileTooLarge(remark)
+    return data.get("elements", [])
+
+
+def overpass_complete_elements(data):
+    """A response's elements; raises RuntimeError if it carries any remark.
+
+    A query that timed out or ran out of memory still answers 200 with the
+    elements found so far, and a partial id list would read as deletions.
+    """
+    remark = data.get("remark")
+    if remark:
+        raise RuntimeError(f"Overpass returned a partial result: {remark}")
+    return data.get("elements", [])
+
+
+def fetch_osm_places_tiled(
+    bounds,
+    checkpoint_dir: Path,
+    area=None,
+    grid=overpass_tiles.DEFAULT_GRID,
+    max_workers=overpass_tiles.DEFAULT_WORKERS,
+    cache=None,
+):
+    """Fetch places tile by tile over ``(west, south, east, north)`` bounds.
+
+    Finished tiles are checkpointed under ``checkpoint_dir`` so an interrupted run
+    resumes; the checkpoint is removed once every tile has been fetched.
+    """
+    # 504s are answered by subdividing the tile rather than by blind retries
+    session = get_requests_session(status_forcelist=(429, 500, 502, 503))
+    if session is None:
+        raise ImportError("requests library is required for fetching data")
+
+    limit = overpass_tiles.DEFAULT_ELEMENT_LIMIT
+    signature = overpass_tiles.query_signature(bounds, grid, limit, OVERPASS_URL)
+    checkpoint = overpass_tiles.TileCheckpoint(checkpoint_dir, signature)
+
+    def fetch_tile(tile):
+        payload = overpass_place_query([tile.bbox], timeout=180, limit=limit)
+        try:
+            if cache is not None:
+                data = cache.fetch(
+                    session,
+                    "POST",
+                    OVERPASS_URL,
+                    data=payload,
+                    ttl=OVERPASS_CACHE_TTL,
+                    timeout=240,
+                ).json()
+            else:
+                resp = session.post(OVERPASS_URL, data=payload, timeout=240)
+                resp.raise_for_status()
+                data = resp.json()
+        except requests.HTTPError as e:
+            if e.response is not None and e.response.status_code == 504:
+                raise overpass_tiles.TileTooLarge("504 Gateway Timeout") from e
+            raise
+        checkpoint.note_osm_base(overpass_stream.osm_base_timestamp(data))
+        return overpass_tile_elements(data)
+
+    tiles = overpass_tiles.grid_tiles(bounds, rows=grid, area=area)
+    logger.info(
+        f"Querying Overpass in {len(tiles)} tile(s) with {max_workers} worker(s)..."
+    )
+    elements = overpass_tiles.fetch_tiles(
+        tiles, fetch_tile, checkpoint=checkpoint, max_workers=max_workers
+    )
+    osm_base = checkpoint.osm_base()
+    checkpoint.clear()
+
+    batches = overpass_stream.iter_place_batches(
+        elements, batch_size=max(len(elements), 1)
+    )
+    return with_osm_base(osm_places_from_batches(batches), osm_base)
+
+
+def overpass_places_payload(polygon_str=None, bbox=None):
+    """``(query, description)`` for the places in ``polygon_str`` or ``bbox``."""
+    if polygon_str:
+        polys = [polygon_str] if isinstance(polygon_str, str) else list(polygon_str)
+        payload = overpass_place_query([f'poly:"{p}"' for p in polys])
+        return payload, f"{len(polys)} state polygon part(s)"
+    bbox = bbox or NC_BBOX  # south,west,north,east
+    return overpass_place_query([bbox]), f"bounding box {bbox}"
+
+
+def fetch_osm_places(polygon_str=None, cache=None, stream=False, bbox=None):
+    """Fetch place nodes/ways/relations from Overpass.
+
+    ``polygon_str`` (an Overpass poly string or a list of them) restricts the query
+    to those polygons; otherwise the bounding box ``bbox`` (default: NC) is used.
+    """
+    session = get_requests_session()
+    if session is None:
+        raise ImportError("requests library is required for fetching data")
+
+    payload, area_desc = overpass_places_payload(polygon_str, bbox)
+    logger.info(f"Querying Overpass API for places in {area_desc}...")
+    try:
+        if stream:
+            gdf = stream_osm_places(session, payload, cache=cache)
+            logger.info(f"Streamed {len(gdf)} places from Overpass.")
+            if gdf.empty:
+                logger.warning("No valid places found in OSM data.")
+            return gdf
+        if cache is not None:
+            entry = cache.fetch(
+                session,
+                "POST",
+                OVERPASS_URL,
+                data=payload,
+                ttl=OVERPASS_CACHE_TTL,
+                timeout=600,
+            )
+            data = entry.json()
+        else:
+            resp = session.post(OVERPASS_URL, data=payload, timeout=600)
+            resp.raise_for_status()
+            data = resp.json()
     except requests.RequestException as e:
         logger.error(f"Network error fetching OSM places: {e}")
         raise
@@ -184,69 +548,110 @@ def fetch_osm_places(polygon_str=None):
 
     elements = data.get("elements", [])
     logger.info(f"Received {len(elements)} elements from Overpass.")
-    
-    rows = []
-    for el in tqdm(elements, desc="Processing OSM elements"):
-        el_type = el.get("type")
-        tags = el.get("tags", {})
-        name = tags.get("name")
-        place = tags.get("place")
-        population = tags.get("population")
-        
-        geom = None
-        if el_type == "node":
-            geom = Point(el.get("lon"), el.get("lat"))
-        else:
-            center = el.get("center")
-            if center:
-                geom = Point(center.get("lon"), center.get("lat"))
-        
-        if geom:
-            rows.append(
-                {
-                    "osm_id": el.get("id"),
-                    "osm_type": el_type,
-                    "name": name,
-                    "place": place,
-                    "population": population,
-                    "tags": tags,
-                    "geometry": geom,
-                }
-            )
 
-    if not rows:
+    # One columnar batch for the whole response; geometries are built in bulk
+    batches = overpass_stream.iter_place_batches(
+        elements, batch_size=max(len(elements), 1)
+    )
+    gdf = with_osm_base(
+        osm_places_from_batches(batches), overpass_stream.osm_base_timestamp(data)
+    )
+    if gdf.empty:
         logger.warning("No valid places found in OSM data.")
-        return gpd.GeoDataFrame(columns=["osm_id", "osm_type", "name", "place", "population", "tags", "geometry"], geometry="geometry", crs="EPSG:4326")
-
-    gdf = gpd.GeoDataFrame(rows, geometry="geometry", crs="EPSG:4326")
     return gdf
 
 
-def fetch_census_places(state_fips="37", year=2025):
+def census_place_url(state_fips, year):
+    return f"{CENSUS_BASE}TIGER{year}/PLACE/tl_{year}_{state_fips}_place.zip"
+
+
+def newest_cached_census_year(cache, state_fips, years):
+    for y in sorted(years, reverse=True):
+        if cache.has("GET", census_place_url(state_fips, y), extra=y):
+            return y
+    return None
+
+
+def probe_census_years(state_fips, years, cache=None, max_workers=8):
+    """Return the newest year in ``years`` with a TIGER place zip, or None.
+
+    All candidate years are probed at once with HEAD requests; as soon as every
+    newer year has answered, the remaining probes are abandoned. In offline mode
+    the cache is consulted instead of the network.
+    """
+    years = sorted(years, reverse=True)
+    if cache is not None and cache.offline:
+        return newest_cached_census_year(cache, state_fips, years)
+
+    session = get_requests_session(total_retries=1)
+    if session is None:
+        raise ImportError("requests library is required for fetching data")
+
+    def head(year):
+        try:
+            resp = session.head(
+                census_place_url(state_fips, year), allow_redirects=True, timeout=30
+            )
+            return resp.status_code
+        except requests.RequestException as e:
+            logger.debug(f"HEAD probe for TIGER {year} failed: {e}")
+            return None
+
+    logger.info(f"Probing TIGER place vintages {years[-1]}-{years[0]} in parallel...")
+    executor = ThreadPoolExecutor(max_workers=min(max_workers, len(years)) or 1)
+    try:
+        futures = [(y, executor.submit(head, y)) for y in years]
+        for y, fut in futures:
+            status = fut.result()
+            if status == 200:
+                logger.info(f"Newest available TIGER place vintage: {y}")
+                return y
+            logger.info(f"TIGER {y} place shapefile not available (status {status})")
+        return None
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def fetch_census_places(state_fips="37", year=2025, cache=None):
     session = get_requests_session()
     if session is None:
         raise ImportError("requests library is required for fetching data")
 
-    base = f"{CENSUS_BASE}TIGER{year}/PLACE/"
-    filename = f"tl_{year}_{state_fips}_place.zip"
-    url = base + filename
-    
+    url = census_place_url(state_fips, year)
+    filename = url.rsplit("/", 1)[-1]
+
     logger.info(f"Downloading Census TIGER shapefile from {url}...")
     try:
+        if cache is not None:
+            entry = cache.fetch(
+                session,
+                "GET",
+                url,
+                key_extra=year,
+                ttl=CENSUS_CACHE_TTL,
+                timeout=120,
+                progress_desc=f"Downloading TIGER {year}",
+            )
+            logger.info("Reading shapefile...")
+            gdf = gpd.read_file("zip://" + str(entry.path))
+            # Lets census_join persist its spatial index next to the cached zip
+            gdf.attrs["source_path"] = str(entry.path)
+            return gdf
+
         resp = session.get(url, stream=True, timeout=120)
         if resp.status_code != 200:
             raise RuntimeError(f"Failed to download census TIGER {year} place shapefile. Status: {resp.status_code}")
-        
+
         total_size = int(resp.headers.get('content-length', 0))
         tmpdir = tempfile.mkdtemp()
         zpath = os.path.join(tmpdir, filename)
-        
+
         with open(zpath, "wb") as fh:
             with tqdm(total=total_size, unit='B', unit_scale=True, desc=f"Downloading TIGER {year}") as pbar:
                 for chunk in resp.iter_content(chunk_size=8192):
                     fh.write(chunk)
                     pbar.update(len(chunk))
-                    
+
         logger.info("Reading shapefile...")
         gdf = gpd.read_file("zip://" + zpath)
         return gdf
@@ -258,6 +663,178 @@ def fetch_census_places(state_fips="37", year=2025):
         raise
 
 
+async def fetch_state_polygon_async(fetcher, state_name="North Carolina", cache=None):
+    """fetch_state_polygon on an ``async_fetch.AsyncFetcher``."""
+    params = state_search_params(state_name)
+    logger.info(f"Fetching state polygon for {state_name} from Nominatim...")
+    try:
+        if cache is not None:
+            entry = await cache.fetch_async(
+                fetcher, "GET", NOMINATIM_URL, params=params, ttl=NOMINATIM_CACHE_TTL
+            )
+            items = entry.json()
+        else:
+            items = await fetcher.get_json("GET", NOMINATIM_URL, params=params)
+    except async_fetch.httpx.HTTPError as e:
+        logger.error(f"Network error fetching state polygon: {e}")
+        raise
+    except json.JSONDecodeError as e:
+        logger.error(f"JSON decode error fetching state polygon: {e}")
+        raise
+    return state_from_nominatim(items, state_name)
+
+
+async def fetch_osm_places_async(fetcher, polygon_str=None, cache=None, bbox=None):
+    """fetch_osm_places on an ``async_fetch.AsyncFetcher``.
+
+    The response is streamed to disk (the cache, or a temporary file) and parsed
+    incrementally, as with ``stream=True``; parsing runs in a worker thread so
+    the event loop keeps serving the other fetches.
+    """
+    payload, area_desc = overpass_places_payload(polygon_str, bbox)
+    logger.info(f"Querying Overpass API for places in {area_desc}...")
+    try:
+        if cache is not None:
+            entry = await cache.fetch_async(
+                fetcher,
+                "POST",
+                OVERPASS_URL,
+                data=payload,
+                ttl=OVERPASS_CACHE_TTL,
+                timeout=600,
+            )
+            gdf = await asyncio.to_thread(osm_places_from_file, entry.path)
+        else:
+            with tempfile.TemporaryDirectory() as tmpdir:
+                path = Path(tmpdir) / "overpass.json"
+                await fetcher.download(
+                    "POST", OVERPASS_URL, path, data=payload, timeout=600
+                )
+                gdf = await asyncio.to_thread(osm_places_from_file, path)
+    except async_fetch.httpx.HTTPError as e:
+        logger.error(f"Network error fetching OSM places: {e}")
+        raise
+
+    logger.info(f"Streamed {len(gdf)} places from Overpass.")
+    if gdf.empty:
+        logger.warning("No valid places found in OSM data.")
+    return gdf
+
+
+async def fetch_osm_places_tiled_async(
+    fetcher,
+    bounds,
+    checkpoint_dir: Path,
+    area=None,
+    grid=overpass_tiles.DEFAULT_GRID,
+    max_concurrent=overpass_tiles.DEFAULT_WORKERS,
+    cache=None,
+):
+    """fetch_osm_places_tiled on an ``async_fetch.AsyncFetcher``: the tiles are
+    tasks of the event loop instead of threads."""
+    # 504s are answered by subdividing the tile rather than by blind retries
+    fetcher = fetcher.with_status_forcelist((429, 500, 502, 503))
+    limit = overpass_tiles.DEFAULT_ELEMENT_LIMIT
+    signature = overpass_tiles.query_signature(bounds, grid, limit, OVERPASS_URL)
+    checkpoint = overpass_tiles.TileCheckpoint(checkpoint_dir, signature)
+
+    async def fetch_tile(tile):
+        payload = overpass_place_query([tile.bbox], timeout=180, limit=limit)
+        try:
+            if cache is not None:
+                entry = await cache.fetch_async(
+                    fetcher,
+                    "POST",
+                    OVERPASS_URL,
+                    data=payload,
+                    ttl=OVERPASS_CACHE_TTL,
+                    timeout=240,
+                )
+                data = entry.json()
+            else:
+                data = await fetcher.get_json(
+                    "POST", OVERPASS_URL, data=payload, timeout=240
+                )
+        except async_fetch.httpx.HTTPStatusError as e:
+            if e.response.status_code == 504:
+                raise overpass_tiles.TileTooLarge("504 Gateway Timeout") from e
+            raise
+        checkpoint.note_osm_base(overpass_stream.osm_base_timestamp(data))
+        return overpass_tile_elements(data)
+
+    tiles = overpass_tiles.grid_tiles(bounds, rows=grid, area=area)
+    logger.info(
+        f"Querying Overpass in {len(tiles)} tile(s), {max_concurrent} at a time..."
+    )
+    elements = await overpass_tiles.fetch_tiles_async(
+        tiles, fetch_tile, checkpoint=checkpoint, max_concurrent=max_concurrent
+    )
+    osm_base = checkpoint.osm_base()
+    checkpoint.clear()
+
+    batches = overpass_stream.iter_place_batches(
+        elements, batch_size=max(len(elements), 1)
+    )
+    return with_osm_base(osm_places_from_batches(batches), osm_base)
+
+
+async def probe_census_years_async(fetcher, state_fips, years, cache=None):
+    """probe_census_years on an ``async_fetch.AsyncFetcher``."""
+    years = sorted(years, reverse=True)
+    if cache is not None and cache.offline:
+        return newest_cached_census_year(cache, state_fips, years)
+
+    # like the requests path: one retry, a missing vintage is not worth waiting for
+    fetcher = fetcher.with_total_retries(1)
+
+    async def head(year):
+        try:
+            return await fetcher.status("HEAD", census_place_url(state_fips, year))
+        except async_fetch.httpx.HTTPError as e:
+            logger.debug(f"HEAD probe for TIGER {year} failed: {e}")
+            return None
+
+    logger.info(f"Probing TIGER place vintages {years[-1]}-{years[0]} concurrently...")
+    probes = [(y, asyncio.ensure_future(head(y))) for y in years]
+    try:
+        for y, probe in probes:
+            status = await probe
+            if status == 200:
+                logger.info(f"Newest available TIGER place vintage: {y}")
+                return y
+            logger.info(f"TIGER {y} place shapefile not available (status {status})")
+        return None
+    finally:
+        for _, probe in probes:
+            probe.cancel()
+
+
+async def fetch_census_places_async(fetcher, state_fips="37", year=2025, cache=None):
+    """fetch_census_places on an ``async_fetch.AsyncFetcher``; the zip is
+    streamed to disk and read in a worker thread."""
+    url = census_place_url(state_fips, year)
+    logger.info(f"Downloading Census TIGER shapefile from {url}...")
+    try:
+        if cache is not None:
+            entry = await cache.fetch_async(
+                fetcher, "GET", url, key_extra=year, ttl=CENSUS_CACHE_TTL, timeout=120
+            )
+            zpath = entry.path
+        else:
+            zpath = Path(tempfile.mkdtemp()) / url.rsplit("/", 1)[-1]
+            await fetcher.download("GET", url, zpath, timeout=120)
+    except async_fetch.httpx.HTTPError as e:
+        logger.error(f"Network error downloading Census data: {e}")
+        raise
+
+    logger.info("Reading shapefile...")
+    gdf = await asyncio.to_thread(gpd.read_file, "zip://" + str(zpath))
+    if cache is not None:
+        # Lets census_join persist its spatial index next to the cached zip
+        gdf.attrs["source_path"] = str(zpath)
+    return gdf
+
+
 def merge_and_export(osm_gdf, census_gdf, output_dir: Path):
     # Wrap the two helpers to keep public API backward-compatible
     out_geo = prepare_out_geo(osm_gdf, census_gdf)
@@ -289,14 +866,349 @@ def parse_args(argv=None):
         action="store_true",
         help="Use a small sample dataset instead of fetching from OSM/Census for quick testing",
     )
+    parser.add_argument(
+        "--cache-dir",
+        default=None,
+        help="Persist Nominatim/Overpass/TIGER responses here and reuse them on later runs",
+    )
+    parser.add_argument(
+        "--cache-max-mb",
+        default=2048,
+        type=int,
+        help="Size bound for --cache-dir; least recently used responses are evicted",
+    )
+    parser.add_argument(
+        "--offline",
+        action="store_true",
+        help="Serve every request from --cache-dir and never touch the network",
+    )
+    parser.add_argument(
+        "--stream-osm",
+        action="store_true",
+        help="Parse the Overpass response incrementally in columnar batches to bound memory",
+    )
+    parser.add_argument(
+        "--states",
+        default=None,
+        help="Comma-separated state abbreviations (e.g. NC,SC,VA) to build in batch mode",
+    )
+    parser.add_argument(
+        "--max-workers",
+        default=4,
+        type=int,
+        help="Maximum number of states processed concurrently in batch mode",
+    )
+    parser.add_argument(
+        "--merge-states",
+        action="store_true",
+        help="In batch mode, also write a merged file covering every successful state",
+    )
+    parser.add_argument(
+        "--osm-area",
+        choices=["bbox", "polygon"],
+        default="bbox",
+        help="Overpass query area: the state's bounding box, or its simplified boundary polygon",
+    )
+    parser.add_argument(
+        "--poly-max-vertices",
+        default=overpass_area.DEFAULT_MAX_VERTICES,
+        type=int,
+        help="Vertex budget for the simplified boundary used with --osm-area polygon",
+    )
+    parser.add_argument(
+        "--osm-tiles",
+        default=0,
+        type=int,
+        help="Fetch Overpass data as an N x N grid of resumable tiles (0 = single query)",
+    )
+    parser.add_argument(
+        "--tile-workers",
+        default=overpass_tiles.DEFAULT_WORKERS,
+        type=int,
+        help="Concurrent Overpass tile requests with --osm-tiles",
+    )
+    parser.add_argument(
+        "--async-fetch",
+        action="store_true",
+        help="Fetch with one asyncio event loop (httpx, HTTP/2 with h2) instead of a thread per request",
+    )
+    parser.add_argument(
+        "--checkpoint-dir",
+        default=None,
+        help="Where finished tiles are checkpointed (default: <output-dir>/.overpass_tiles)",
+    )
+    parser.add_argument(
+        "--snapshot-dir",
+        default=None,
+        help="Keep the last OSM snapshot here and refresh only places changed since then",
+    )
+    parser.add_argument(
+        "--full-refresh",
+        action="store_true",
+        help="Ignore the stored snapshot and refetch every place (with --snapshot-dir)",
+    )
+    parser.add_argument(
+        "--osm-pbf",
+        default=None,
+        help="Read OSM places from this local .osm.pbf extract instead of Overpass (needs pyosmium)",
+    )
+    parser.add_argument(
+        "--join-simplify",
+        default=None,
+        type=float,
+        help="Tolerance (degrees) for a simplified first pass of the census join; "
+        "only points near a boundary are tested against the full polygons",
+    )
+    parser.add_argument(
+        "--dedupe-radius",
+        default=0,
+        type=float,
+        help="Opt-in: also merge localities with similar names within this many "
+        f"metres ({fuzzy_dedupe.DEFAULT_RADIUS_M:g} is a good start; "
+        "default 0 = exact dedup only)",
+    )
+    parser.add_argument(
+        "--name-similarity",
+        default=fuzzy_dedupe.DEFAULT_MIN_SIMILARITY,
+        type=float,
+        help="Minimum normalised-name similarity (0-1) for --dedupe-radius merges",
+    )
+    parser.add_argument(
+        "--formats",
+        default=None,
+        help="Comma-separated exports to write, from "
+        + ",".join(EXPORT_FORMATS)
+        + " or 'all' (default: "
+        + ",".join(DEFAULT_FORMATS)
+        + ")",
+    )
+    parser.add_argument(
+        "--geojson-precision",
+        default=geojson_writer.DEFAULT_PRECISION,
+        type=int,
+        help="Decimal places kept for GeoJSON/NDJSON coordinates",
+    )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="Run each pipeline stage under cProfile; dumps go to <output-dir>/profiles/",
+    )
     args = parser.parse_args(argv)
+    if args.states and args.osm_pbf:
+        parser.error(
+            "--osm-pbf reads a single extract and cannot be combined with --states"
+        )
+    if args.states:
+        try:
+            us_states.parse_state_list(args.states)
+        except ValueError as e:
+            parser.error(str(e))
+    if args.offline and not args.cache_dir and not args.use_sample:
+        parser.error("--offline requires --cache-dir")
+    try:
+        args.formats = parse_formats(args.formats)
+    except ValueError as e:
+        parser.error(str(e))
+    if args.merge_states and not {"geojson", "parquet"} & set(args.formats):
+        parser.error("--merge-states needs the geojson or parquet export")
     return args
 
 
+def osm_query_filters(args, poly_geojson):
+    """Overpass spatial filters for the state: its bbox or simplified boundary parts."""
+    if args.osm_area == "polygon":
+        polys = overpass_area.overpass_polys_from_geojson(
+            poly_geojson, max_vertices=args.poly_max_vertices
+        )
+        return [f'poly:"{p}"' for p in polys]
+    return [geojson_to_overpass_bbox(poly_geojson)]
+
+
+def empty_census_gdf():
+    logger.warning(
+        "No Census TIGER place shapefile could be fetched. Continuing with OSM points only."
+    )
+    if gpd is None:
+        return None
+    return gpd.GeoDataFrame(
+        columns=["GEOID", "NAME", "geometry"],
+        geometry="geometry",
+        crs="EPSG:4326",
+    )
+
+
+@run_metrics.timed("fetch_osm")
+def fetch_osm_for_state(args, cache=None):
+    """Fetch the state polygon from Nominatim and the OSM places inside it."""
+    logger.info("Fetching state polygon from Nominatim...")
+    state = fetch_state_polygon(args.state, cache=cache)
+    poly_geojson = state["geojson"]
+    if shape is None:
+        return fetch_osm_places(cache=cache, stream=args.stream_osm)
+
+    logger.info(
+        "Querying Overpass for place nodes/ways/relations in the state polygon..."
+    )
+    state_geom = shape(poly_geojson)
+    if args.osm_tiles:
+        checkpoint_dir = Path(
+            args.checkpoint_dir or Path(args.output_dir) / ".overpass_tiles"
+        )
+        osm_gdf = fetch_osm_places_tiled(
+            state_geom.bounds,
+            checkpoint_dir,
+            area=state_geom,
+            grid=args.osm_tiles,
+            max_workers=args.tile_workers,
+            cache=cache,
+        )
+    elif args.osm_area == "polygon":
+        polys = overpass_area.overpass_polys_from_geojson(
+            poly_geojson, max_vertices=args.poly_max_vertices
+        )
+        osm_gdf = fetch_osm_places(polys, cache=cache, stream=args.stream_osm)
+    else:
+        bbox = geojson_to_overpass_bbox(poly_geojson)
+        osm_gdf = fetch_osm_places(cache=cache, stream=args.stream_osm, bbox=bbox)
+    # Drop neighbouring-state places before they reach the census join
+    clipped = overpass_area.clip_to_polygon(osm_gdf, state_geom)
+    return with_osm_base(clipped, osm_gdf.attrs.get("osm_base"))
+
+
+@run_metrics.timed("fetch_osm_changes", rows_out=lambda result: len(result[0]))
+def fetch_osm_changes_for_state(args, since, cache=None):
+    """Fetch the state's places changed after ``since``; see fetch_osm_changes."""
+    state = fetch_state_polygon(args.state, cache=cache)
+    poly_geojson = state["geojson"]
+    changed, current_keys = fetch_osm_changes(
+        osm_query_filters(args, poly_geojson), since
+    )
+    clipped = overpass_area.clip_to_polygon(changed, shape(poly_geojson))
+    return with_osm_base(clipped, changed.attrs.get("osm_base")), current_keys
+
+
+@run_metrics.timed("read_osm_pbf")
+def load_osm_places_from_pbf(pbf_path, parallel=True):
+    """Read places from a local .osm.pbf extract in the fetch_osm_places layout.
+
+    State extracts are already cut to the state boundary, so no Nominatim lookup
+    or clipping is needed.
+    """
+    batch = osm_pbf.read_pbf_places(Path(pbf_path), parallel=parallel)
+    return osm_places_from_batches([batch])
+
+
+@run_metrics.timed("fetch_census")
+def fetch_census_for_state(args, cache=None):
+    """Load the newest available TIGER place shapefile up to ``args.year``, or None."""
+    logger.info(
+        "Downloading Census TIGER place shapefile (attempting the requested year, falling back if needed)..."
+    )
+    years = list(range(args.year, 2019, -1))
+    newest = probe_census_years(args.state_fips, years, cache=cache)
+    if newest is not None:
+        # Still fall back to older vintages if the download itself fails
+        years = [y for y in years if y <= newest]
+
+    for y in years:
+        try:
+            census_gdf = fetch_census_places(
+                state_fips=args.state_fips, year=y, cache=cache
+            )
+            census_gdf.attrs["tiger_year"] = y
+            logger.info(
+                f"Census TIGER places loaded (year {y}): {len(census_gdf)} features"
+            )
+            return census_gdf
+        except Exception as e:
+            logger.warning(f"Failed to fetch Census TIGER places for {y}: {e}")
+    return None
+
+
+async def fetch_osm_for_state_async(fetcher, args, cache=None):
+    """fetch_osm_for_state on an ``async_fetch.AsyncFetcher``."""
+    with run_metrics.stage("fetch_osm") as st:
+        state = await fetch_state_polygon_async(fetcher, args.state, cache=cache)
+        poly_geojson = state["geojson"]
+        state_geom = shape(poly_geojson)
+        if args.osm_tiles:
+            checkpoint_dir = Path(
+                args.checkpoint_dir or Path(args.output_dir) / ".overpass_tiles"
+            )
+            osm_gdf = await fetch_osm_places_tiled_async(
+                fetcher,
+                state_geom.bounds,
+                checkpoint_dir,
+                area=state_geom,
+                grid=args.osm_tiles,
+                max_concurrent=args.tile_workers,
+                cache=cache,
+            )
+        elif args.osm_area == "polygon":
+            polys = overpass_area.overpass_polys_from_geojson(
+                poly_geojson, max_vertices=args.poly_max_vertices
+            )
+            osm_gdf = await fetch_osm_places_async(fetcher, polys, cache=cache)
+        else:
+            bbox = geojson_to_overpass_bbox(poly_geojson)
+            osm_gdf = await fetch_osm_places_async(fetcher, cache=cache, bbox=bbox)
+        osm_gdf = overpass_area.clip_to_polygon(osm_gdf, state_geom)
+        st.rows_out = len(osm_gdf)
+        return osm_gdf
+
+
+async def fetch_census_for_state_async(fetcher, args, cache=None):
+    """fetch_census_for_state on an ``async_fetch.AsyncFetcher``."""
+    with run_metrics.stage("fetch_census") as st:
+        years = list(range(args.year, 2019, -1))
+        newest = await probe_census_years_async(
+            fetcher, args.state_fips, years, cache=cache
+        )
+        if newest is not None:
+            years = [y for y in years if y <= newest]
+
+        for y in years:
+            try:
+                census_gdf = await fetch_census_places_async(
+                    fetcher, state_fips=args.state_fips, year=y, cache=cache
+                )
+            except Exception as e:
+                logger.warning(f"Failed to fetch Census TIGER places for {y}: {e}")
+                continue
+            census_gdf.attrs["tiger_year"] = y
+            logger.info(
+                f"Census TIGER places loaded (year {y}): {len(census_gdf)} features"
+            )
+            st.rows_out = len(census_gdf)
+            return census_gdf
+        return None
+
+
+async def fetch_osm_and_census_async(args, cache=None):
+    """Fetch the OSM places and the TIGER places of ``args.state`` on one event loop.
+
+    Every request shares one ``AsyncFetcher``; Overpass gets at most
+    ``args.tile_workers`` concurrent requests, each sent once a slot is free.
+    """
+    overpass_host = urlsplit(OVERPASS_URL).hostname
+    async with async_fetch.AsyncFetcher(
+        headers=HEADERS, concurrency={overpass_host: max(1, args.tile_workers)}
+    ) as fetcher:
+        fetcher.watch_overpass(OVERPASS_URL)
+        if args.osm_pbf:
+            osm = asyncio.to_thread(load_osm_places_from_pbf, args.osm_pbf)
+        else:
+            osm = fetch_osm_for_state_async(fetcher, args, cache)
+        census = fetch_census_for_state_async(fetcher, args, cache)
+        osm_gdf, census_gdf = await asyncio.gather(osm, census)
+    return osm_gdf, census_gdf
+
+
 def get_osm_and_census(args, outdir: Path):
     """Return (osm_gdf, census_gdf), handling sample mode and downloads."""
     osm_gdf = None
     census_gdf = None
+    cache = make_response_cache(args)
     if args.use_sample:
         logger.info("Using sample data for quick local testing...")
         # If geopandas is available, construct a GeoDataFrame; otherwise write minimal output files directly.
@@ -351,175 +1263,558 @@ def get_osm_and_census(args, outdir: Path):
             # Create minimal in-memory placeholders so merge_and_export can proceed if needed
             osm_gdf = None
             census_gdf = None
-    else:
-        logger.info("Fetching state polygon from Nominatim...")
+    elif args.async_fetch:
         try:
-            state = fetch_state_polygon(args.state)
-            poly_geojson = state["geojson"]
-            poly_str = polygon_to_overpass_poly(poly_geojson)
-            logger.info(
-                "Querying Overpass for place nodes/ways/relations in the state polygon..."
-            )
-            osm_gdf = fetch_osm_places(poly_str)
+            osm_gdf, census_gdf = asyncio.run(fetch_osm_and_census_async(args, cache))
         except Exception as e:
             logger.error(f"Failed to fetch OSM data: {e}")
             return None, None
-
-    # If not sample mode, try fetching census
-    if not args.use_sample:
-        logger.info(
-            "Downloading Census TIGER place shapefile (attempting the requested year, falling back if needed)..."
-        )
-        census_gdf = None
-        for y in range(args.year, 2019, -1):
+        if census_gdf is None:
+            census_gdf = empty_census_gdf()
+    else:
+        # Overpass and TIGER are independent; run them side by side so the
+        # wall-clock cost is roughly that of the slower fetch.
+        pool = ThreadPoolExecutor(max_workers=2)
+        try:
+            if args.osm_pbf:
+                osm_future = pool.submit(load_osm_places_from_pbf, args.osm_pbf)
+            else:
+                osm_future = pool.submit(fetch_osm_for_state, args, cache)
+            census_future = pool.submit(fetch_census_for_state, args, cache)
             try:
-                census_gdf = fetch_census_places(state_fips=args.state_fips, year=y)
-                logger.info(
-                    f"Census TIGER places loaded (year {y}): {len(census_gdf)} features"
-                )
-                break
+                osm_gdf = osm_future.result()
             except Exception as e:
-                logger.warning(f"Failed to fetch Census TIGER places for {y}: {e}")
-                census_gdf = None
-    else:
-        census_gdf = None
+                logger.error(f"Failed to fetch OSM data: {e}")
+                return None, None
+            census_gdf = census_future.result()
+        finally:
+            pool.shutdown(wait=False, cancel_futures=True)
 
-    if census_gdf is None and not args.use_sample:
-        logger.warning(
-            "No Census TIGER place shapefile could be fetched. Continuing with OSM points only."
-        )
-        if gpd is not None:
-            census_gdf = gpd.GeoDataFrame(
-                columns=["GEOID", "NAME", "geometry"],
-                geometry="geometry",
-                crs="EPSG:4326",
+        if census_gdf is None:
+            census_gdf = empty_census_gdf()
+
+    return osm_gdf, census_gdf
+
+
+def census_signature(args, census_gdf):
+    """Identify the census vintage a snapshot's joined rows were built against."""
+    if census_gdf is None or census_gdf.empty:
+        return f"{args.state_fips}:none"
+    return f"{args.state_fips}:{census_gdf.attrs.get('tiger_year')}:{len(census_gdf)}"
+
+
+def join_census(osm_gdf, census_gdf, simplify_tolerance=None):
+    """Attach census GEOID/place names to OSM places (rows in OUT_COLUMNS, not deduplicated).
+
+    Each place gets the first census polygon containing it (see census_join).
+    """
+    with run_metrics.stage("census_join", rows_in=len(osm_gdf)) as st:
+        if census_gdf is not None and not census_gdf.empty:
+            index = census_join.CensusIndex.for_census(
+                census_gdf, simplify_tolerance=simplify_tolerance
+            )
+            joined = osm_gdf.to_crs("EPSG:4326")
+            hit = index.lookup(joined.geometry.x.values, joined.geometry.y.values)
+            matched = hit >= 0
+            geoid = np.full(len(joined), None, dtype=object)
+            place_name = np.full(len(joined), None, dtype=object)
+            geoid[matched] = index.geoid[hit[matched]]
+            place_name[matched] = index.name[hit[matched]]
+            joined["geoid"] = geoid
+            joined["final_name"] = (
+                joined["name"]
+                .str.strip()
+                .fillna(pd.Series(place_name, index=joined.index))
             )
         else:
-            census_gdf = None
+            # Fallback if no census data
+            joined = osm_gdf.copy()
+            joined["final_name"] = joined["name"]
+            joined["geoid"] = None
+        joined = joined[OUT_COLUMNS]
+        st.rows_out = len(joined)
+    return joined
 
-    return osm_gdf, census_gdf
+
+def population_values(population):
+    """Parse OSM population tags ("1,234", " 500", None, ...) to float64; NaN if unknown.
+
+    Each distinct tag value is parsed once.
+    """
+    codes, uniques = pd.factorize(pd.Series(population, copy=False))
+    uniques = pd.Series(uniques)
+    if uniques.dtype == object or pd.api.types.is_string_dtype(uniques.dtype):
+        uniques = uniques.astype("string").str.replace(r"[,\s]", "", regex=True)
+    parsed = pd.to_numeric(uniques, errors="coerce").to_numpy(
+        dtype=np.float64, na_value=np.nan
+    )
+    # factorize codes missing values as -1; the appended NaN covers them
+    return np.append(parsed, np.nan)[codes]
+
+
+def coordinate_keys(x, y, decimals=6):
+    """Pack coordinates quantised to ``decimals`` places into one int64 per point."""
+    scale = 10.0**decimals
+    qx = np.rint(np.asarray(x, dtype=np.float64) * scale).astype(np.int64)
+    qy = np.rint(np.asarray(y, dtype=np.float64) * scale).astype(np.int64)
+    # Longitude in the high bits, latitude (offset to be non-negative) in the low 32
+    return (qx << 32) | (qy + int(90 * scale))
 
 
-def prepare_out_geo(osm_gdf, census_gdf):
+def name_hashes(names):
+    """uint64 hash of each name, normalised for case and whitespace."""
+    codes, uniques = pd.factorize(pd.Series(names, copy=False))
+    norm = (
+        pd.Series(uniques, dtype=object)
+        .astype(str)
+        .str.strip()
+        .str.casefold()
+        .str.replace(r"\s+", " ", regex=True)
+    )
+    hashes = pd.util.hash_array(np.append(norm.to_numpy(dtype=object), ""))
+    return hashes[codes]
+
+
+def dedupe_localities(out_geo):
+    """Drop rows sharing coordinates and name, keeping the most populous.
+
+    Rows are keyed by their coordinates quantised to 6 decimals and a hash of the
+    normalised name. Kept rows stay in their original order.
+    """
+    if out_geo.empty:
+        return out_geo
+    with run_metrics.stage("dedupe", rows_in=len(out_geo)) as st:
+        xy = coordinate_keys(out_geo.geometry.x.values, out_geo.geometry.y.values)
+        name = name_hashes(out_geo["final_name"])
+        population = population_values(out_geo["population"])
+        # Most populous first within each key; unknown population last; stable on ties
+        rank = np.where(np.isnan(population), np.inf, -population)
+        order = np.lexsort((rank, name, xy))
+        xy_sorted, name_sorted = xy[order], name[order]
+        first = np.ones(len(order), dtype=bool)
+        first[1:] = (xy_sorted[1:] != xy_sorted[:-1]) | (
+            name_sorted[1:] != name_sorted[:-1]
+        )
+        keep = np.sort(order[first])
+        st.rows_out = len(keep)
+    return out_geo.iloc[keep]
+
+
+def prepare_out_geo(osm_gdf, census_gdf, simplify_tolerance=None):
     """Prepare final out_geo GeoDataFrame used for export and mapping."""
     if osm_gdf is None:
         return None
-        
+
     logger.info("Preparing final output data...")
-    if census_gdf is not None and not census_gdf.empty:
-        census_gdf = census_gdf.to_crs("EPSG:4326")
-        census_gdf = census_gdf[["GEOID", "NAME", "geometry"]].rename(
-            columns={"NAME": "place_name", "GEOID": "geoid"}
+    return dedupe_localities(join_census(osm_gdf, census_gdf, simplify_tolerance))
+
+
+def refresh_from_snapshot(args, outdir: Path):
+    """Build out_geo from the stored OSM snapshot, fetching only what changed.
+
+    Falls back to a full fetch when there is no snapshot, ``--full-refresh`` is
+    given, or the census vintage differs from the one the snapshot was joined with.
+    The snapshot's timestamp is the Overpass database time of the places fetched.
+    """
+    store = osm_snapshot.SnapshotStore(
+        Path(args.snapshot_dir), f"state_{args.state_fips}"
+    )
+    snapshot = None if args.full_refresh else store.load()
+    started = osm_snapshot.utc_timestamp()
+    cache = make_response_cache(args)
+
+    census_gdf = fetch_census_for_state(args, cache)
+    if census_gdf is None:
+        census_gdf = empty_census_gdf()
+    signature = census_signature(args, census_gdf)
+
+    if snapshot is not None and snapshot.census_signature == signature:
+        changed, current_keys = fetch_osm_changes_for_state(
+            args, snapshot.timestamp, cache=cache
         )
-        osm_gdf = osm_gdf.to_crs("EPSG:4326")
-        osm_gdf["name_norm"] = osm_gdf["name"].str.strip()
-        joined = gpd.sjoin(osm_gdf, census_gdf, how="left", predicate="within")
-        joined["final_name"] = joined["name_norm"].fillna(joined["place_name"])
+        osm_base = changed.attrs.get("osm_base")
+        osm_gdf, affected = osm_snapshot.apply_changes(
+            snapshot.osm, changed, current_keys
+        )
+        joined = osm_snapshot.drop_elements(snapshot.joined, affected)
+        if not changed.empty:
+            logger.info(
+                f"Re-joining {len(changed)} changed places against census polygons"
+            )
+            joined = pd.concat(
+                [joined, join_census(changed, census_gdf, args.join_simplify)],
+                ignore_index=True,
+            )
     else:
-        # Fallback if no census data
-        joined = osm_gdf.copy()
-        joined["final_name"] = joined["name"]
-        joined["geoid"] = None
-
-    out_geo = joined[
-        ["osm_id", "osm_type", "final_name", "place", "population", "geoid", "geometry"]
-    ]
-    out_geo["x_round"] = out_geo.geometry.x.round(6)
-    out_geo["y_round"] = out_geo.geometry.y.round(6)
-    out_geo["dup_key"] = (
-        out_geo["x_round"].astype(str)
-        + ","
-        + out_geo["y_round"].astype(str)
-        + ","
-        + out_geo["final_name"].fillna("")
-    )
-    out_geo = out_geo.sort_values(by=["population"], ascending=False)
-    out_geo = out_geo.drop_duplicates(subset=["dup_key"])
-    out_geo = out_geo.drop(columns=["x_round", "y_round", "dup_key"])
-    return out_geo
+        if snapshot is not None:
+            logger.info(
+                "Census vintage changed since the snapshot; running a full refresh"
+            )
+        osm_gdf = fetch_osm_for_state(args, cache)
+        osm_base = osm_gdf.attrs.get("osm_base")
+        joined = join_census(osm_gdf, census_gdf, args.join_simplify)
+
+    if not osm_base:
+        logger.warning(
+            "Overpass did not report its database time; using the local clock"
+        )
+        osm_base = started
+    store.save(osm_snapshot.Snapshot(osm_base, osm_gdf, joined, signature))
+    logger.info("Preparing final output data...")
+    return dedupe_localities(joined)
+
+
+def write_geojson(out_geo, path: Path, precision=None):
+    """Write a GeoJSON FeatureCollection, or NDJSON for a ``.geojsonl`` path."""
+    if precision is None:
+        precision = geojson_writer.DEFAULT_PRECISION
+    return geojson_writer.write_points_gdf(out_geo, path, precision=precision)
+
 
+def write_csv(out_geo, path: Path):
+    out_geo.drop(columns="geometry").to_csv(path, index=False)
+    return path
 
-def write_exports_and_map(out_geo, outdir: Path):
+
+def write_parquet(out_geo, path: Path):
+    if not geoparquet_io.available():
+        logger.warning("pyarrow not installed; skipping GeoParquet export")
+        return None
+    geoparquet_io.write_geoparquet(out_geo, path)
+    return path
+
+
+def write_shapefile(out_geo, path: Path):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    out_geo.to_file(str(path))
+    return path
+
+
+def write_vector_tiles(out_geo, path: Path):
+    lon, lat, properties = geojson_writer.gdf_columns(out_geo)
+    priority = vector_tiles.place_priority(
+        properties["place"], properties["population"]
+    )
+    return vector_tiles.build_pmtiles(path, lon, lat, properties, priority=priority)
+
+
+def write_folium_map(out_geo, path: Path):
+    if web_map.folium is None:
+        logger.warning("folium not installed; skipping HTML map")
+        return None
+
+    lon, lat, properties = geojson_writer.gdf_columns(out_geo)
+    m = web_map.point_map(
+        lon,
+        lat,
+        properties,
+        popup_fields=[
+            ("Place", "place"),
+            ("Population", "population"),
+            ("OSM ID", "osm_id"),
+        ],
+        page_dir=path.parent,
+        data_name=path.stem.removesuffix("_map"),
+    )
+    # stable element ids, so an unchanged map keeps its bytes (and the site copy)
+    build_manifest.write_if_changed(path, web_map.render_html(m))
+    return path
+
+
+# format -> (output path relative to outdir, writer, site copy relative to site/)
+EXPORT_FORMATS = {
+    "geojson": ("{prefix}.geojson", write_geojson, "data/{prefix}.geojson"),
+    "ndjson": ("{prefix}.geojsonl", write_geojson, None),
+    "csv": ("{prefix}.csv", write_csv, "data/{prefix}.csv"),
+    "parquet": ("{prefix}.parquet", write_parquet, None),
+    "shp": ("{prefix}_shp/{prefix}.shp", write_shapefile, None),
+    "pmtiles": ("{prefix}.pmtiles", write_vector_tiles, "data/{prefix}.pmtiles"),
+    "html": ("{prefix}_map.html", write_folium_map, "map.html"),
+}
+
+
+DEFAULT_FORMATS = ["geojson", "csv", "parquet", "shp", "html"]
+GEOJSON_FORMATS = ("geojson", "ndjson")
+
+
+def parse_formats(value):
+    """Parse a comma-separated ``--formats`` value; raises ValueError on unknown names."""
+    if not value:
+        return list(DEFAULT_FORMATS)
+    if value == "all":
+        return list(EXPORT_FORMATS)
+    formats = [f.strip().lower() for f in value.split(",") if f.strip()]
+    unknown = [f for f in formats if f not in EXPORT_FORMATS]
+    if unknown:
+        raise ValueError(
+            f"Unknown export format(s): {', '.join(unknown)} "
+            f"(choose from {', '.join(EXPORT_FORMATS)})"
+        )
+    return formats
+
+
+def run_export(fmt, writer, out_geo, path: Path, **options):
+    """Run one export writer as an ``export:<fmt>`` metrics stage."""
+    with run_metrics.stage(f"export:{fmt}", rows_in=len(out_geo)) as st:
+        written = writer(out_geo, path, **options)
+        if written is not None:
+            # the shapefile writer produces a directory of sidecar files
+            st.bytes_written = run_metrics.path_size(
+                written.parent if fmt == "shp" else written
+            )
+    return written
+
+
+def write_exports_and_map(
+    out_geo,
+    outdir: Path,
+    prefix="nc_localities",
+    update_site=True,
+    formats=None,
+    geojson_precision=None,
+):
+    """Write ``out_geo`` in each requested format concurrently; returns {format: path}.
+
+    ``formats`` defaults to DEFAULT_FORMATS. The writers only read ``out_geo``.
+    Site copies are byte copies of the files just written (for the HTML map,
+    together with the hashed data files it loads).
+    """
     if out_geo is None:
         logger.warning("No data to export.")
-        return
-
-    logger.info(f"Writing exports to {outdir}...")
-    geojson_path = outdir / "nc_localities.geojson"
-    csv_path = outdir / "nc_localities.csv"
-    shp_dir = outdir / "nc_localities_shp"
-    html_path = outdir / "nc_localities_map.html"
-    
-    out_geo.to_file(geojson_path, driver="GeoJSON")
-    out_geo.drop(columns="geometry").to_csv(csv_path, index=False)
-    shp_dir.mkdir(parents=True, exist_ok=True)
-    out_geo.to_file(str(shp_dir / "nc_localities.shp"))
-    
-    try:
-        import folium
-    except ImportError:
-        logger.warning("folium not installed; skipping HTML map")
-        return
-
-    center = [35.5, -79.0]
-    m = folium.Map(location=center, zoom_start=7, tiles="OpenStreetMap")
-    for _, row in out_geo.iterrows():
-        coords = (row.geometry.y, row.geometry.x)
-        popup_content = f"<b>{row.final_name}</b><br>Place: {row.place}<br>Population: {row.population}<br>OSM ID: {row.osm_id}"
-        popup = folium.Popup(html=popup_content)
-        folium.CircleMarker(
-            coords, radius=3, color="blue", fill=True, popup=popup
-        ).add_to(m)
-    m.save(html_path)
-    
+        return {}
+
+    formats = formats or list(DEFAULT_FORMATS)
+    logger.info(f"Writing {', '.join(formats)} exports to {outdir}...")
     site_dir = Path(__file__).resolve().parents[1] / "site"
-    if site_dir.exists():
-        data_dir = site_dir / "data"
-        data_dir.mkdir(parents=True, exist_ok=True)
-        geojson_out = data_dir / "nc_localities.geojson"
-        csv_out = data_dir / "nc_localities.csv"
-        html_out = site_dir / "map.html"
-        import shutil
-
-        out_geo.to_file(geojson_out, driver="GeoJSON")
-        out_geo.drop(columns="geometry").to_csv(csv_out, index=False)
-        try:
-            shutil.copyfile(str(html_path), str(html_out))
-        except Exception as e:
-            logger.warning(f"Failed to copy map.html to site path: {e}")
+    copy_to_site = update_site and site_dir.exists()
+
+    written = {}
+    with ThreadPoolExecutor(max_workers=len(formats)) as pool:
+        futures = {}
+        for fmt in formats:
+            rel_path, writer, _ = EXPORT_FORMATS[fmt]
+            path = outdir / rel_path.format(prefix=prefix)
+            options = {"precision": geojson_precision} if fmt in GEOJSON_FORMATS else {}
+            futures[pool.submit(run_export, fmt, writer, out_geo, path, **options)] = (
+                fmt
+            )
+        for fut in as_completed(futures):
+            fmt = futures[fut]
+            path = fut.result()
+            if path is None:
+                continue
+            written[fmt] = path
+            site_rel = EXPORT_FORMATS[fmt][2]
+            if copy_to_site and site_rel:
+                site_path = site_dir / site_rel.format(prefix=prefix)
+                try:
+                    site_path.parent.mkdir(parents=True, exist_ok=True)
+                    if site_path.suffix == ".html":
+                        # the page loads its data from hashed files next to it
+                        map_assets.copy_page(path, site_path)
+                    else:
+                        shutil.copyfile(path, site_path)
+                except OSError as e:
+                    logger.warning(f"Failed to copy {path.name} to {site_path}: {e}")
+    return written
+
+
+def build_state_dataset(args, outdir: Path):
+    """Fetch, join and dedupe one state's localities; returns out_geo or None."""
+    if args.snapshot_dir and not args.use_sample and not args.osm_pbf:
+        out_geo = refresh_from_snapshot(args, outdir)
+    else:
+        osm_gdf, census_gdf = get_osm_and_census(args, outdir)
+        # After this point, osm_gdf and census_gdf are set (or sample mode created outputs)
+        if osm_gdf is None:
+            return None
+        logger.info(f"Fetched {len(osm_gdf)} OSM place elements")
+
+        # get_osm_and_census() already handles census_gdf fetching and fallbacks
+        out_geo = prepare_out_geo(osm_gdf, census_gdf, args.join_simplify)
+
+    # The mineral localities CSV only covers North Carolina
+    if args.state_fips == "37":
+        mineral_csv_path = (
+            Path(__file__).resolve().parents[1] / "data" / "mineral_localities.csv"
+        )
+        mineral_gdf = load_mineral_localities_from_csv(mineral_csv_path)
+        if mineral_gdf is not None and not mineral_gdf.empty:
+            logger.info(f"Merging {len(mineral_gdf)} mineral localities into dataset")
+            # Select only the columns that match out_geo structure
+            mineral_subset = mineral_gdf[OUT_COLUMNS]
+            out_geo = pd.concat([out_geo, mineral_subset], ignore_index=True)
+            logger.info(f"Total localities after merge: {len(out_geo)}")
+
+    if args.dedupe_radius > 0:
+        with run_metrics.stage("fuzzy_dedupe", rows_in=len(out_geo)) as st:
+            out_geo = fuzzy_dedupe.fuzzy_dedupe(
+                out_geo,
+                radius_m=args.dedupe_radius,
+                min_similarity=args.name_similarity,
+                population=population_values(out_geo["population"]),
+            )
+            st.rows_out = len(out_geo)
+    return out_geo
+
+
+def state_prefix(code):
+    return f"{code.lower()}_localities"
+
+
+def run_state_job(code, args, outdir: Path):
+    """Batch worker: build and export one state.
+
+    Returns ``(code, geojson_path, error)``; errors are reported rather than
+    raised so one bad state cannot take down the batch.
+    """
+    name, fips = us_states.STATES[code]
+    state_args = argparse.Namespace(
+        **{**vars(args), "state": name, "state_fips": fips, "states": None}
+    )
+    logger.info(f"[{code}] Building localities for {name} (FIPS {fips})")
+    try:
+        out_geo = build_state_dataset(state_args, outdir)
+        if out_geo is None:
+            return code, None, "no OSM data fetched"
+        write_exports_and_map(
+            out_geo,
+            outdir,
+            prefix=state_prefix(code),
+            update_site=False,
+            formats=args.formats,
+            geojson_precision=args.geojson_precision,
+        )
+        return code, str(outdir / f"{state_prefix(code)}.geojson"), None
+    except Exception as e:
+        logger.error(f"[{code}] Failed: {e}", exc_info=True)
+        return code, None, str(e)
+
+
+def read_state_output(geojson_path):
+    """Load one state's export, preferring its GeoParquet sibling when present."""
+    parquet_path = Path(geojson_path).with_suffix(".parquet")
+    if geoparquet_io.available() and parquet_path.exists():
+        return geoparquet_io.read_geoparquet(parquet_path)
+    return gpd.read_file(geojson_path)
+
+
+def merge_state_outputs(geojson_paths):
+    """Concatenate per-state exports, dropping places returned for several states."""
+    frames = [read_state_output(p) for p in geojson_paths]
+    merged = gpd.GeoDataFrame(pd.concat(frames, ignore_index=True), crs="EPSG:4326")
+    return merged.drop_duplicates(subset=["osm_type", "osm_id"]).reset_index(drop=True)
+
+
+def run_batch(args, outdir: Path):
+    """Run several states in worker processes; returns {code: error} for failures."""
+    codes = us_states.parse_state_list(args.states)
+    results = {}
+    pending = list(codes)
+    # A worker that dies (e.g. OOM-killed) breaks the whole pool; the states it
+    # took down with it are retried once in a fresh pool.
+    for attempt in range(2):
+        if not pending:
+            break
+        workers = max(1, min(args.max_workers, len(pending)))
+        if attempt:
+            logger.warning(
+                f"Retrying {len(pending)} state(s) lost with a dead worker in a fresh pool"
+            )
+        logger.info(f"Processing {len(pending)} state(s) with {workers} worker(s)...")
+        broken = []
+        # the workers share one rate-limit budget per host (see http_session)
+        with (
+            http_session.shared_limits(),
+            ProcessPoolExecutor(max_workers=workers) as pool,
+        ):
+            futures = {
+                pool.submit(
+                    run_metrics.collect,
+                    run_state_job,
+                    c,
+                    args,
+                    outdir,
+                    profile_dir=(outdir / "profiles" / c) if args.profile else None,
+                ): c
+                for c in pending
+            }
+            for fut in as_completed(futures):
+                code = futures[fut]
+                try:
+                    (_, path, error), records = fut.result()
+                    if run_metrics.active() is not None:
+                        run_metrics.active().merge(records, prefix=f"{code}/")
+                except BrokenProcessPool as e:
+                    broken.append(code)
+                    path, error = None, f"worker process died: {e}"
+                except Exception as e:
+                    path, error = None, str(e)
+                results[code] = (path, error)
+        pending = broken
+
+    failed = {c: err for c, (path, err) in results.items() if path is None}
+    succeeded = [c for c in codes if results.get(c, (None, None))[0] is not None]
+    for code, err in failed.items():
+        logger.error(f"[{code}] State failed: {err}")
+    logger.info(f"Batch finished: {len(succeeded)} succeeded, {len(failed)} failed")
+
+    if args.merge_states and succeeded:
+        merged = merge_state_outputs([results[c][0] for c in succeeded])
+        logger.info(
+            f"Writing merged output for {len(succeeded)} state(s): {len(merged)} localities"
+        )
+        write_exports_and_map(
+            merged,
+            outdir,
+            prefix="merged_localities",
+            update_site=False,
+            formats=args.formats,
+            geojson_precision=args.geojson_precision,
+        )
+    return failed
 
 
 def main(argv=None):
-    # Entry point wrapper: parse args and run the pipeline
+    # Entry point wrapper: parse args, run the pipeline and write run_metrics.json
     args = parse_args(argv)
     outdir = Path(args.output_dir)
     outdir.mkdir(parents=True, exist_ok=True)
-    
+    recorder = run_metrics.Recorder(outdir / "profiles" if args.profile else None)
+    previous = run_metrics.activate(recorder)
+    status = "error"
     try:
-        osm_gdf, census_gdf = get_osm_and_census(args, outdir)
-        # After this point, osm_gdf and census_gdf are set (or sample mode created outputs)
-        if osm_gdf is not None:
-            logger.info(f"Fetched {len(osm_gdf)} OSM place elements")
-        
-        # Load mineral localities from CSV
-        mineral_csv_path = Path(__file__).resolve().parents[1] / "data" / "mineral_localities.csv"
-        mineral_gdf = load_mineral_localities_from_csv(mineral_csv_path)
-        
-        # get_osm_and_census() already handles census_gdf fetching and fallbacks
-        if osm_gdf is not None:
-            out_geo = prepare_out_geo(osm_gdf, census_gdf)
-            
-            # Merge mineral localities if available
-            if mineral_gdf is not None and not mineral_gdf.empty:
-                logger.info(f"Merging {len(mineral_gdf)} mineral localities into dataset")
-                # Select only the columns that match out_geo structure
-                mineral_subset = mineral_gdf[["osm_id", "osm_type", "final_name", "place", "population", "geoid", "geometry"]]
-                out_geo = pd.concat([out_geo, mineral_subset], ignore_index=True)
-                logger.info(f"Total localities after merge: {len(out_geo)}")
-            
-            write_exports_and_map(out_geo, outdir)
+        run_pipeline(args, outdir)
+        status = "ok"
+    finally:
+        run_metrics.activate(previous)
+        try:
+            path = recorder.write(
+                outdir / run_metrics.METRICS_FILE, argv=argv, status=status
+            )
+            logger.info(f"Stage metrics written to {path}:\n{recorder.summary()}")
+        except OSError as e:
+            logger.warning(f"Failed to write run metrics: {e}")
+
+
+def run_pipeline(args, outdir: Path):
+    """Build, export and optionally package the localities for ``args``."""
+    try:
+        if args.states:
+            failed = run_batch(args, outdir)
+            if failed and len(failed) == len(us_states.parse_state_list(args.states)):
+                logger.error("Every state in the batch failed. Pipeline aborted.")
+                sys.exit(1)
         else:
-            if args.use_sample:
+            out_geo = build_state_dataset(args, outdir)
+            if out_geo is not None:
+                write_exports_and_map(
+                    out_geo,
+                    outdir,
+                    formats=args.formats,
+                    geojson_precision=args.geojson_precision,
+                )
+            elif args.use_sample:
                 logger.info("Sample mode created pre-built outputs; skipping merge/export step.")
             else:
                 logger.error("Failed to fetch OSM data. Pipeline aborted.")
@@ -530,17 +1825,20 @@ def main(argv=None):
                 import zipfile
 
                 zip_path = outdir.parent / f"nc_localities_output_{args.year}.zip"
-                with zipfile.ZipFile(zip_path, "w", zipfile.ZIP_DEFLATED) as zf:
-                    for root, _, files in os.walk(outdir):
-                        for f in files:
-                            file_path = Path(root) / f
-                            zf.write(
-                                file_path, arcname=str(file_path.relative_to(outdir.parent))
-                            )
+                with run_metrics.stage("pack_output") as st:
+                    with zipfile.ZipFile(zip_path, "w", zipfile.ZIP_DEFLATED) as zf:
+                        for root, _, files in os.walk(outdir):
+                            for f in files:
+                                file_path = Path(root) / f
+                                zf.write(
+                                    file_path,
+                                    arcname=str(file_path.relative_to(outdir.parent)),
+                                )
+                    st.bytes_written = run_metrics.path_size(zip_path)
                 logger.info(f"Packaged output to {zip_path}")
             except Exception as e:
                 logger.error(f"Failed to package output: {e}")
-                
+
     except Exception as e:
         logger.critical(f"An unexpected error occurred: {e}", exc_info=True)
         raise
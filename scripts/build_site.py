@@ -12,10 +12,31 @@ Usage:
 from __future__ import annotations
 
 import argparse
+import json
 import logging
-import shutil
+import sys
+import tempfile
 from pathlib import Path
 
+import numpy as np
+
+try:
+    from scripts import (
+        build_manifest,
+        columnar_points,
+        geojson_writer,
+        map_assets,
+        vector_tiles,
+        web_map,
+    )
+except ImportError:  # executed as ``python scripts/build_site.py``
+    import build_manifest
+    import columnar_points
+    import geojson_writer
+    import map_assets
+    import vector_tiles
+    import web_map
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -26,31 +47,30 @@ logger = logging.getLogger(__name__)
 
 
 def copy_data(output_dir: Path, site_dir: Path):
+    """Copy the GeoJSON/CSV exports into site/data; identical files are not rewritten."""
     data_dir = site_dir / "data"
     data_dir.mkdir(parents=True, exist_ok=True)
-    geojson_src = output_dir / "nc_localities.geojson"
-    csv_src = output_dir / "nc_localities.csv"
-
-    if not geojson_src.exists():
-        logger.warning(f"{geojson_src} not found. No data copied.")
-    else:
+    for name, label in (
+        ("nc_localities.geojson", "data"),
+        ("nc_localities.csv", "CSV"),
+    ):
+        src = output_dir / name
+        if not src.exists():
+            logger.warning(f"{src} not found. No {label} copied.")
+            continue
         try:
-            shutil.copy2(geojson_src, data_dir / "nc_localities.geojson")
-            logger.info(f"Copied {geojson_src} -> {data_dir / 'nc_localities.geojson'}")
+            if build_manifest.copy_if_changed(src, data_dir / name):
+                logger.info(f"Copied {src} -> {data_dir / name}")
+            else:
+                logger.info(f"{data_dir / name} is up to date")
         except Exception as e:
-            logger.error(f"Failed to copy {geojson_src}: {e}")
-
-    if not csv_src.exists():
-        logger.warning(f"{csv_src} not found. No CSV copied.")
-    else:
-        try:
-            shutil.copy2(csv_src, data_dir / "nc_localities.csv")
-            logger.info(f"Copied {csv_src} -> {data_dir / 'nc_localities.csv'}")
-        except Exception as e:
-            logger.error(f"Failed to copy {csv_src}: {e}")
+            logger.error(f"Failed to copy {src}: {e}")
 
 
-def create_map(site_dir: Path, geojson_path: Path | None):
+def create_map(site_dir: Path, geojson_path: Path | None, payload="columnar"):
+    """Write site/map.html; its data goes to a hashed file under site/data in the
+    ``payload`` format ("columnar" or "geojson"). Returns the files written, or
+    None when no map could be built."""
     # Try folium
     try:
         import folium
@@ -62,19 +82,26 @@ def create_map(site_dir: Path, geojson_path: Path | None):
         logger.info(
             "Folium not available or no geojson present; writing responsive Leaflet placeholder map.html"
         )
-        
-        geojson_content = "{}"
+
+        data_url = None
         if geojson_path and geojson_path.exists():
             try:
-                with open(geojson_path, "r", encoding="utf8") as f:
-                    geojson_content = f.read()
+                data = geojson_path.read_bytes()
+                if payload == "columnar":
+                    data = columnar_points.dumps_points(
+                        *geojson_writer.read_points(geojson_path)
+                    )
+                data_file = map_assets.write_hashed(
+                    data, site_dir / map_assets.DATA_DIR, "localities"
+                )
+                data_url = f"{map_assets.DATA_DIR}/{data_file.name}"
             except Exception as e:
-                logger.error(f"Failed to read geojson for embedding: {e}")
+                logger.error(f"Failed to write map data: {e}")
 
         try:
-            with open(map_html, "w", encoding="utf8") as f:
-                f.write(
-                    f"""<!doctype html>
+            build_manifest.write_if_changed(
+                map_html,
+                f"""<!doctype html>
 <html lang="en">
 <head>
 <meta charset="utf-8">
@@ -86,12 +113,16 @@ def create_map(site_dir: Path, geojson_path: Path | None):
 <body>
 <div id="map"></div>
 <script src="https://unpkg.com/leaflet@1.9.4/dist/leaflet.js"></script>
-<script>
-const data = {geojson_content};
+<script>{columnar_points.DECODER_JS}
+const dataUrl = {json.dumps(data_url)};
 const map = L.map('map').setView([35.5,-79.0], 7);
 L.tileLayer('https://{{s}}.tile.openstreetmap.org/{{z}}/{{x}}/{{y}}.png',{{maxZoom:19,attribution:'&copy; OpenStreetMap contributors'}}).addTo(map);
 
-if (data && data.features && data.features.length > 0) {{
+function addData(data) {{
+    if (!(data && data.features && data.features.length > 0)) {{
+        console.warn("No features in map data");
+        return;
+    }}
     const layer = L.geoJSON(data, {{
         pointToLayer: (feature, latlng) => {{
             return L.circleMarker(latlng, {{
@@ -112,61 +143,178 @@ if (data && data.features && data.features.length > 0) {{
         }}
     }}).addTo(map);
     map.fitBounds(layer.getBounds(), {{maxZoom: 12}});
+}}
+
+if (dataUrl) {{
+    fetch(dataUrl).then((r) => r.json()).then((p) => addData(loadPoints(p)));
 }} else {{
-    console.warn("No features in embedded data");
+    console.warn("No map data");
 }}
 </script>
 </body>
-</html>"""
-                )
+</html>""",
+            )
         except Exception as e:
             logger.error(f"Failed to write placeholder map: {e}")
-        return
+            return None
+        return [map_html] + ([data_file] if data_url else [])
 
-    # Build a simple folium map with markers
+    # Build a folium map with all points in a single GeoJSON layer
     try:
-        import geopandas as gpd
-        gdf = gpd.read_file(str(geojson_path))
+        lngs, lats, props = geojson_writer.read_points(geojson_path)
     except Exception as e:
-        logger.error(f"Failed to read GeoJSON with geopandas: {e}")
-        return
+        logger.error(f"Failed to read GeoJSON: {e}")
+        return None
 
-    if gdf.empty:
+    if not len(lngs):
         logger.warning("GeoJSON present but empty; writing placeholder map.html")
         try:
-            with open(map_html, "w", encoding="utf8") as f:
-                f.write(
-                    "<!doctype html>\n<html><body>\n<h1>NC Localities Map</h1>\n<p>No features found in GeoJSON.</p>\n</body></html>"
-                )
+            build_manifest.write_if_changed(
+                map_html,
+                "<!doctype html>\n<html><body>\n<h1>NC Localities Map</h1>\n<p>No features found in GeoJSON.</p>\n</body></html>",
+            )
         except Exception as e:
             logger.error(f"Failed to write empty placeholder map: {e}")
-        return
+            return None
+        return [map_html]
 
     # Create a center from the median coordinate or fallback to NC
-    lats = gdf.geometry.y
-    lngs = gdf.geometry.x
+    valid = ~(np.isnan(lats) | np.isnan(lngs))
     center = [
-        float(lats.median()) if not lats.isnull().all() else 35.5,
-        float(lngs.median()) if not lngs.isnull().all() else -79.0,
+        float(np.median(lats[valid])) if valid.any() else 35.5,
+        float(np.median(lngs[valid])) if valid.any() else -79.0,
     ]
 
     try:
-        m = folium.Map(location=center, zoom_start=7, tiles="OpenStreetMap")
-        for _, row in gdf.iterrows():
-            if row.geometry is None:
-                continue
-            lat = float(row.geometry.y)
-            lon = float(row.geometry.x)
-            popup_content = f"<b>{row.get('final_name', row.get('NAME', row.get('name', '')))}</b>"
-            popup = folium.Popup(html=popup_content)
-            folium.CircleMarker(
-                location=(lat, lon), radius=3, color="blue", fill=True, popup=popup
-            ).add_to(m)
-
-        m.save(str(map_html))
-        logger.info(f"Written interactive map: {map_html}")
+        m = web_map.point_map(
+            lngs,
+            lats,
+            props,
+            title_fields=("final_name", "NAME", "name"),
+            center=center,
+            page_dir=site_dir,
+            payload=payload,
+        )
+        html = web_map.render_html(m)
+        if build_manifest.write_if_changed(map_html, html):
+            logger.info(f"Written interactive map: {map_html}")
+        else:
+            logger.info(f"{map_html} is up to date")
     except Exception as e:
         logger.error(f"Failed to create/save folium map: {e}")
+        return None
+    return [map_html] + [site_dir / rel for rel in map_assets.referenced_assets(html)]
+
+
+TILED_MAP_TEMPLATE = """<!doctype html>
+<html lang="en">
+<head>
+<meta charset="utf-8">
+<meta name="viewport" content="width=device-width, initial-scale=1">
+<title>NC Localities Map</title>
+<link rel="stylesheet" href="https://unpkg.com/maplibre-gl@4.7.1/dist/maplibre-gl.css" crossorigin=""/>
+<style>html,body,#map{{height:100%;margin:0;padding:0}}#map{{height:100vh}}</style>
+</head>
+<body>
+<div id="map"></div>
+<script src="https://unpkg.com/maplibre-gl@4.7.1/dist/maplibre-gl.js"></script>
+<script src="https://unpkg.com/pmtiles@3.2.1/dist/pmtiles.js"></script>
+<script>
+const protocol = new pmtiles.Protocol();
+maplibregl.addProtocol("pmtiles", protocol.tile);
+const map = new maplibregl.Map({{
+    container: "map",
+    style: {{
+        version: 8,
+        sources: {{
+            osm: {{
+                type: "raster",
+                tiles: ["https://tile.openstreetmap.org/{{z}}/{{x}}/{{y}}.png"],
+                tileSize: 256,
+                maxzoom: 19,
+                attribution: "&copy; OpenStreetMap contributors"
+            }},
+            localities: {{
+                type: "vector",
+                url: "pmtiles://" + new URL({tiles_url}, location.href).href
+            }}
+        }},
+        layers: [
+            {{id: "osm", type: "raster", source: "osm"}},
+            {{
+                id: "localities",
+                type: "circle",
+                source: "localities",
+                "source-layer": {layer},
+                paint: {{
+                    "circle-radius": ["interpolate", ["linear"], ["zoom"], 5, 2, 12, 6],
+                    "circle-color": "#ff7800",
+                    "circle-stroke-color": "#000",
+                    "circle-stroke-width": 1
+                }}
+            }}
+        ]
+    }},
+    bounds: {bounds},
+    fitBoundsOptions: {{padding: 20}}
+}});
+map.on("click", "localities", (e) => {{
+    const p = e.features[0].properties;
+    const div = document.createElement("div");
+    const title = document.createElement("b");
+    title.textContent = p.final_name || p.name || "";
+    div.appendChild(title);
+    for (const [label, key] of [["Place", "place"], ["Population", "population"]]) {{
+        if (p[key]) div.append(document.createElement("br"), label + ": " + p[key]);
+    }}
+    new maplibregl.Popup().setLngLat(e.lngLat).setDOMContent(div).addTo(map);
+}});
+map.on("mouseenter", "localities", () => {{ map.getCanvas().style.cursor = "pointer"; }});
+map.on("mouseleave", "localities", () => {{ map.getCanvas().style.cursor = ""; }});
+</script>
+</body>
+</html>"""
+
+
+def create_tiled_map(
+    site_dir: Path, geojson_path: Path, max_zoom=vector_tiles.DEFAULT_MAX_ZOOM
+):
+    """Cut the localities into site/data/nc_localities.pmtiles and write a map.html
+    that loads only the vector tiles in view. Returns the files written."""
+    lngs, lats, props = geojson_writer.read_points(geojson_path)
+    data_dir = site_dir / "data"
+    data_dir.mkdir(parents=True, exist_ok=True)
+    tiles_path = data_dir / "nc_localities.pmtiles"
+    priority = vector_tiles.place_priority(
+        props.get("place", [None] * len(lngs)), props.get("population")
+    )
+    # build next to the target and only replace it when the archive changed
+    with tempfile.TemporaryDirectory(dir=data_dir) as tmp:
+        built = Path(tmp) / tiles_path.name
+        vector_tiles.build_pmtiles(
+            built, lngs, lats, props, priority=priority, max_zoom=max_zoom
+        )
+        build_manifest.copy_if_changed(built, tiles_path)
+
+    valid = ~(np.isnan(lngs) | np.isnan(lats))
+    if valid.any():
+        bounds = [
+            [float(lngs[valid].min()), float(lats[valid].min())],
+            [float(lngs[valid].max()), float(lats[valid].max())],
+        ]
+    else:
+        bounds = [[-84.3, 33.8], [-75.4, 36.6]]
+    map_html = site_dir / "map.html"
+    build_manifest.write_if_changed(
+        map_html,
+        TILED_MAP_TEMPLATE.format(
+            tiles_url=json.dumps(f"data/{tiles_path.name}"),
+            layer=json.dumps(vector_tiles.DEFAULT_LAYER),
+            bounds=json.dumps(bounds),
+        ),
+    )
+    logger.info(f"Written vector-tile map: {map_html} ({tiles_path.name})")
+    return [map_html, tiles_path]
 
 
 def main(argv=None):
@@ -184,6 +332,22 @@ def main(argv=None):
         default=None,
         help="Optional year argument (ignored) to stay compatible with older scripts",
     )
+    parser.add_argument(
+        "--tiles",
+        action="store_true",
+        help="Serve the localities as PMTiles vector tiles instead of inlining the GeoJSON",
+    )
+    parser.add_argument(
+        "--payload",
+        choices=web_map.PAYLOADS,
+        default="columnar",
+        help="Format of the map's data file: compact columnar (default) or GeoJSON",
+    )
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="Rebuild the map even if the build manifest says it is up to date",
+    )
     args = parser.parse_args(argv)
 
     outdir = Path(args.output_dir).resolve()
@@ -192,7 +356,26 @@ def main(argv=None):
     copy_data(outdir, sdir)
     geojson_path = outdir / "nc_localities.geojson"
     if geojson_path.exists():
-        create_map(sdir, geojson_path)
+        manifest = build_manifest.BuildManifest(sdir, force=args.force)
+        inputs = {"geojson": geojson_path}
+        script = build_manifest.script_version(
+            sys.modules[__name__],
+            web_map,
+            columnar_points,
+            map_assets,
+            geojson_writer,
+            vector_tiles,
+        )
+        params = {"tiles": args.tiles, "payload": args.payload}
+        if manifest.up_to_date("map", inputs, script, params):
+            logger.info("map.html is up to date; skipping (use --force to rebuild)")
+            return
+        if args.tiles:
+            outputs = create_tiled_map(sdir, geojson_path)
+        else:
+            outputs = create_map(sdir, geojson_path, payload=args.payload)
+        if outputs:
+            manifest.record("map", inputs, script, outputs, params)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,200 @@
+"""
+Point-in-polygon join of OSM places against Census TIGER place polygons.
+
+``CensusIndex`` holds the TIGER polygons (EPSG:4326) with an STRtree over their
+bounding boxes. A lookup first asks the tree for bbox candidates, which rejects
+most point/polygon pairs without touching polygon vertices, and then runs the
+exact "within" test on prepared polygons for the remaining pairs, vectorised.
+
+With a ``simplify_tolerance`` the index also keeps, per polygon, a simplified
+inner core (certainly inside) and outer hull (anything outside is certainly
+outside). Only points in the band between the two need the exact test against
+the full-resolution polygon.
+
+For a cached TIGER zip the bands, the costly part to build, are persisted next
+to it as ``<zip>.census-bands.npz`` (WKB, no pickles) and reused while the zip
+and the tolerance are unchanged.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import time
+from pathlib import Path
+
+import numpy as np
+
+try:
+    import shapely
+except ImportError:
+    shapely = None
+
+logger = logging.getLogger(__name__)
+
+INDEX_VERSION = 2
+INDEX_SUFFIX = ".census-bands.npz"
+
+
+class CensusIndex:
+    """TIGER place polygons with an STRtree, ready for bulk point lookups."""
+
+    def __init__(
+        self, polygons, geoid, name, simplify_tolerance=None, inner=None, outer=None
+    ):
+        self.polygons = np.asarray(polygons, dtype=object)
+        self.geoid = np.asarray(geoid, dtype=object)
+        self.name = np.asarray(name, dtype=object)
+        self.simplify_tolerance = simplify_tolerance
+        self.inner = inner
+        self.outer = outer
+        if simplify_tolerance and (inner is None or outer is None):
+            self.inner, self.outer = self._bands(self.polygons, simplify_tolerance)
+        self.tree = shapely.STRtree(
+            self.outer if self.outer is not None else self.polygons
+        )
+        shapely.prepare(self.polygons)
+        if self.inner is not None:
+            shapely.prepare(self.inner)
+            shapely.prepare(self.outer)
+
+    @staticmethod
+    def _bands(polygons, tol):
+        # Simplification moves edges by at most ``tol``, so a 2*tol buffer keeps
+        # the inner core inside and the outer hull around the original polygon.
+        inner = shapely.simplify(shapely.buffer(polygons, -2 * tol), tol)
+        outer = shapely.simplify(shapely.buffer(polygons, 2 * tol), tol)
+        return inner, outer
+
+    @classmethod
+    def from_gdf(cls, census_gdf, simplify_tolerance=None):
+        census_gdf = census_gdf.to_crs("EPSG:4326")
+        return cls(
+            census_gdf.geometry.values,
+            census_gdf["GEOID"].values,
+            census_gdf["NAME"].values,
+            simplify_tolerance=simplify_tolerance,
+        )
+
+    @classmethod
+    def for_census(cls, census_gdf, simplify_tolerance=None):
+        """Build the index, with the bands persisted for a cached TIGER zip."""
+        source = census_gdf.attrs.get("source_path")
+        if not source or not simplify_tolerance:
+            return cls.from_gdf(census_gdf, simplify_tolerance)
+
+        census_gdf = census_gdf.to_crs("EPSG:4326")
+        polygons = census_gdf.geometry.values
+        bands_path = Path(str(source) + INDEX_SUFFIX)
+        bands = load_bands(bands_path, source, simplify_tolerance, len(polygons))
+        if bands is not None:
+            logger.info(f"Loaded census join bands from {bands_path}")
+        else:
+            bands = cls._bands(np.asarray(polygons, dtype=object), simplify_tolerance)
+            try:
+                save_bands(bands_path, simplify_tolerance, *bands)
+            except OSError as e:
+                logger.warning(f"Could not persist census join bands: {e}")
+        return cls(
+            polygons,
+            census_gdf["GEOID"].values,
+            census_gdf["NAME"].values,
+            simplify_tolerance=simplify_tolerance,
+            inner=bands[0],
+            outer=bands[1],
+        )
+
+    def lookup(self, x, y):
+        """Return, per point, the index of the polygon containing it or -1."""
+        x = np.asarray(x, dtype=np.float64)
+        y = np.asarray(y, dtype=np.float64)
+        result = np.full(len(x), -1, dtype=np.intp)
+        if not len(x) or not len(self.polygons):
+            return result
+
+        start = time.perf_counter()
+        # Bbox prefilter: candidate (point, polygon) pairs from the STRtree
+        pt_idx, poly_idx = self.tree.query(shapely.points(x, y))
+        n_candidates = len(pt_idx)
+
+        if self.inner is not None and n_candidates:
+            px, py = x[pt_idx], y[pt_idx]
+            in_core = shapely.contains_xy(self.inner[poly_idx], px, py)
+            in_hull = shapely.contains_xy(self.outer[poly_idx], px, py)
+            band = in_hull & ~in_core
+            exact = np.zeros(n_candidates, dtype=bool)
+            exact[band] = shapely.contains_xy(
+                self.polygons[poly_idx[band]], px[band], py[band]
+            )
+            hit = in_core | exact
+            n_exact = int(band.sum())
+        else:
+            hit = shapely.contains_xy(self.polygons[poly_idx], x[pt_idx], y[pt_idx])
+            n_exact = n_candidates
+
+        # Keep the first containing polygon for each point
+        pt_hit, poly_hit = pt_idx[hit], poly_idx[hit]
+        order = np.lexsort((poly_hit, pt_hit))
+        pt_hit, poly_hit = pt_hit[order], poly_hit[order]
+        first = np.unique(pt_hit, return_index=True)[1]
+        result[pt_hit[first]] = poly_hit[first]
+
+        elapsed = time.perf_counter() - start
+        logger.info(
+            f"Census join: {len(x)} points x {len(self.polygons)} polygons in "
+            f"{elapsed:.3f}s ({n_candidates} bbox candidates, {n_exact} exact tests)"
+        )
+        return result
+
+
+def _pack(geoms):
+    wkb = shapely.to_wkb(geoms)
+    offsets = np.zeros(len(wkb) + 1, dtype=np.int64)
+    np.cumsum([len(w) for w in wkb], out=offsets[1:])
+    return np.frombuffer(b"".join(wkb), dtype=np.uint8), offsets
+
+
+def _unpack(data, offsets):
+    raw = data.tobytes()
+    return shapely.from_wkb(
+        [raw[a:b] for a, b in zip(offsets[:-1], offsets[1:], strict=True)]
+    )
+
+
+def save_bands(path: Path, simplify_tolerance, inner, outer):
+    """Write a CensusIndex's inner/outer bands as WKB arrays (``.npz``)."""
+    inner_wkb, inner_offsets = _pack(inner)
+    outer_wkb, outer_offsets = _pack(outer)
+    tmp = Path(str(path) + ".tmp")
+    with open(tmp, "wb") as fh:
+        np.savez(
+            fh,
+            version=INDEX_VERSION,
+            simplify_tolerance=float(simplify_tolerance),
+            inner_wkb=inner_wkb,
+            inner_offsets=inner_offsets,
+            outer_wkb=outer_wkb,
+            outer_offsets=outer_offsets,
+        )
+    os.replace(tmp, path)
+
+
+def load_bands(path: Path, source, simplify_tolerance, count):
+    """``(inner, outer)`` saved by save_bands, or None if missing or out of date."""
+    try:
+        if os.path.getmtime(path) < os.path.getmtime(source):
+            return None
+        with np.load(path, allow_pickle=False) as data:
+            if int(data["version"]) != INDEX_VERSION:
+                return None
+            if float(data["simplify_tolerance"]) != simplify_tolerance:
+                return None
+            bands = (
+                _unpack(data["inner_wkb"], data["inner_offsets"]),
+                _unpack(data["outer_wkb"], data["outer_offsets"]),
+            )
+    except Exception:
+        return None
+    if any(len(band) != count for band in bands):
+        return None
+    return bands
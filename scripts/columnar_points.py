@@ -0,0 +1,214 @@
+"""
+Compact columnar payload for the map pages' point data.
+
+GeoJSON repeats ``"type":"Feature"``, ``"properties"`` and ``"geometry"`` (and
+every property key) for each point. This format stores each column once:
+
+    {
+      "format": "columnar-points", "version": 1, "count": 3, "scale": 100000,
+      "x": [-7940000, 120, -35],          # delta-encoded quantised longitude
+      "y": [3585330, -45, 210],           # delta-encoded quantised latitude
+      "strings": ["city", "town", "Apex", ...],
+      "columns": {
+        "place": {"kind": "dict", "dict": [0, 1], "codes": [0, 1, -1]},
+        "name": {"kind": "str", "values": [2, 3, 4]},
+        "population": {"kind": "num", "values": [1200, null, 35]},
+        "tags": {"kind": "raw", "values": [{...}, null, {...}]}
+      }
+    }
+
+Coordinates are multiplied by ``scale`` (10**precision), rounded, and stored as
+differences from the previous point; rows are ordered in narrow latitude bands
+so the deltas stay small and the arrays fit ``Int32Array``. String columns index
+a shared string table; low-cardinality ones (``place``, ``mineral_type``) are
+dictionary-encoded so their codes are small integers. ``-1``/``null`` marks
+missing values. Rows without coordinates are dropped.
+
+``DECODER_JS`` is the browser-side decoder; the pages include it and call
+``loadPoints(payload)``, which accepts either this format or plain GeoJSON.
+"""
+
+from __future__ import annotations
+
+import json
+
+import numpy as np
+
+try:
+    from scripts import geojson_writer
+except ImportError:  # executed from inside ``scripts/``
+    import geojson_writer
+
+FORMAT = "columnar-points"
+VERSION = 1
+DEFAULT_PRECISION = 5  # ~1 m
+BAND_DEGREES = 0.05  # latitude band height used to order the rows
+# object columns with at most this many distinct values (and fewer than half the
+# rows) are dictionary-encoded
+MAX_DICT_SIZE = 256
+
+DECODER_JS = """
+function decodeColumn(c, strings) {
+    if (c.kind === "dict") {
+        const dict = c.dict.map((k) => strings[k]);
+        return c.codes.map((k) => (k < 0 ? null : dict[k]));
+    }
+    if (c.kind === "str") return c.values.map((k) => (k < 0 ? null : strings[k]));
+    return c.values;
+}
+
+function columnarToGeoJSON(p) {
+    const n = p.count, scale = p.scale;
+    const xs = Int32Array.from(p.x), ys = Int32Array.from(p.y);
+    const cols = Object.entries(p.columns).map(([key, c]) => [key, decodeColumn(c, p.strings)]);
+    const features = new Array(n);
+    let x = 0, y = 0;
+    for (let i = 0; i < n; i++) {
+        x += xs[i];
+        y += ys[i];
+        const properties = {};
+        for (const [key, values] of cols) properties[key] = values[i];
+        features[i] = {
+            type: "Feature",
+            properties,
+            geometry: {type: "Point", coordinates: [x / scale, y / scale]}
+        };
+    }
+    return {type: "FeatureCollection", features};
+}
+
+function loadPoints(payload) {
+    return payload && payload.format === "columnar-points" ? columnarToGeoJSON(payload) : payload;
+}
+"""
+
+
+class _StringTable:
+    def __init__(self):
+        self.strings = []
+        self._index = {}
+
+    def add(self, s: str) -> int:
+        n = self._index.get(s)
+        if n is None:
+            n = self._index[s] = len(self.strings)
+            self.strings.append(s)
+        return n
+
+
+def _is_missing(v):
+    try:
+        return v is None or bool(v != v)
+    except (TypeError, ValueError):
+        return False
+
+
+def _is_string_column(values):
+    return all(v is None or isinstance(v, str) for v in values)
+
+
+def _encode_column(values, strings: _StringTable, categorical):
+    arr = np.asarray(values)
+    if arr.dtype.kind in "iub":
+        return {"kind": "num", "values": arr.tolist()}
+    if arr.dtype.kind == "f":
+        return {"kind": "num", "values": [None if v != v else v for v in arr.tolist()]}
+
+    values = [None if _is_missing(v) else v for v in arr.tolist()]
+    if not _is_string_column(values):
+        # numbers stored as objects, dicts, mixed: plain JSON values
+        column = np.empty(len(values), dtype=object)
+        column[:] = values
+        encoded = geojson_writer.encode_column(column)
+        return {"kind": "raw", "values": json.loads("[" + ",".join(encoded) + "]")}
+
+    present = [v for v in values if v is not None]
+    distinct = dict.fromkeys(present)
+    if categorical is None:
+        categorical = len(distinct) <= MAX_DICT_SIZE and len(distinct) * 2 < len(values)
+    if categorical:
+        codes = {s: n for n, s in enumerate(distinct)}
+        return {
+            "kind": "dict",
+            "dict": [strings.add(s) for s in distinct],
+            "codes": [-1 if v is None else codes[v] for v in values],
+        }
+    return {
+        "kind": "str",
+        "values": [-1 if v is None else strings.add(v) for v in values],
+    }
+
+
+def encode_points(
+    lon, lat, properties=None, precision=DEFAULT_PRECISION, categorical=None
+):
+    """Encode points and their property columns as a columnar payload dict.
+
+    ``categorical`` optionally lists the columns to dictionary-encode; by default
+    string columns with few distinct values are.
+    """
+    properties = properties or {}
+    lon = np.asarray(lon, dtype=np.float64)
+    lat = np.asarray(lat, dtype=np.float64)
+    scale = 10**precision
+    keep = np.flatnonzero(~(np.isnan(lon) | np.isnan(lat)))
+    qx = np.round(lon[keep] * scale).astype(np.int64)
+    qy = np.round(lat[keep] * scale).astype(np.int64)
+    order = np.lexsort((qx, qy // max(1, round(BAND_DEGREES * scale))))
+    rows = keep[order]
+    qx, qy = qx[order], qy[order]
+
+    strings = _StringTable()
+    columns = {}
+    for key, values in properties.items():
+        if not hasattr(values, "dtype"):
+            # plain lists (e.g. from geojson_writer.read_points) may hold dicts/lists
+            column = np.empty(len(values), dtype=object)
+            column[:] = list(values)
+            values = column
+        values = np.asarray(values)[rows]
+        is_categorical = None if categorical is None else key in categorical
+        columns[str(key)] = _encode_column(values, strings, is_categorical)
+
+    return {
+        "format": FORMAT,
+        "version": VERSION,
+        "count": int(len(rows)),
+        "scale": scale,
+        "x": np.diff(qx, prepend=0).tolist(),
+        "y": np.diff(qy, prepend=0).tolist(),
+        "strings": strings.strings,
+        "columns": columns,
+    }
+
+
+def dumps_points(
+    lon, lat, properties=None, precision=DEFAULT_PRECISION, categorical=None
+):
+    """Columnar payload as compact JSON text."""
+    payload = encode_points(lon, lat, properties, precision, categorical)
+    return json.dumps(
+        payload, separators=(",", ":"), ensure_ascii=False, allow_nan=False
+    )
+
+
+def decode_points(payload):
+    """Inverse of ``encode_points``: ``(lon, lat, properties)`` in payload order."""
+    if isinstance(payload, (str, bytes)):
+        payload = json.loads(payload)
+    if payload.get("format") != FORMAT:
+        raise ValueError(f"not a {FORMAT} payload")
+    scale = payload["scale"]
+    lon = np.cumsum(np.asarray(payload["x"], dtype=np.int64)) / scale
+    lat = np.cumsum(np.asarray(payload["y"], dtype=np.int64)) / scale
+    strings = payload["strings"]
+    properties = {}
+    for key, c in payload["columns"].items():
+        if c["kind"] == "dict":
+            table = [strings[k] for k in c["dict"]]
+            properties[key] = [None if k < 0 else table[k] for k in c["codes"]]
+        elif c["kind"] == "str":
+            properties[key] = [None if k < 0 else strings[k] for k in c["values"]]
+        else:
+            properties[key] = list(c["values"])
+    return lon, lat, properties
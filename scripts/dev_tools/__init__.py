@@ -1,2 +1,2 @@
 # dev_tools package
-__all__ = ["preview_cleanup_local"]
+__all__ = ["benchmark", "http_standin", "preview_cleanup_local", "synthetic_localities"]
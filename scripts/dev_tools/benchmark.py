@@ -0,0 +1,376 @@
+#!/usr/bin/env python3
+"""Offline benchmarks of the pipeline's heavy steps on synthetic data.
+
+Times ``prepare_out_geo`` (census join + dedupe), ``write_exports_and_map``,
+``build_site.create_map`` and ``build_mineral_map`` at each requested size,
+using the generators in ``synthetic_localities`` (no network access). Each
+benchmark runs ``--repeat`` times in a fresh directory; the best and median wall
+times are kept, together with the ``run_metrics`` stages of the best run.
+
+Results go to a JSON file. With a baseline (a results file from an earlier run,
+e.g. saved with ``--save-baseline``) every benchmark whose best time grew by more
+than ``--threshold`` (and by at least ``--min-delta`` seconds, to ignore noise)
+is flagged, and the script exits with status 1.
+
+Usage examples:
+  python scripts/dev_tools/benchmark.py --sizes 1k,10k --save-baseline
+  python scripts/dev_tools/benchmark.py --sizes 1k,10k          # compare against it
+  python scripts/dev_tools/benchmark.py --sizes 100k,1m --benchmarks prepare_out_geo
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from importlib import metadata
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[2]
+if str(ROOT) not in sys.path:  # executed as ``python scripts/dev_tools/benchmark.py``
+    sys.path.insert(0, str(ROOT))
+
+from scripts import (  # noqa: E402
+    build_mineral_map,
+    build_nc_localities,
+    build_site,
+    run_metrics,
+)
+from scripts.dev_tools import synthetic_localities  # noqa: E402
+
+logger = logging.getLogger(__name__)
+
+RESULTS_VERSION = 1
+DEFAULT_SIZES = "1k,10k,100k"
+DEFAULT_OUTPUT = ROOT / "benchmarks" / "results.json"
+DEFAULT_BASELINE = ROOT / "benchmarks" / "baseline.json"
+DEFAULT_THRESHOLD = 0.25
+DEFAULT_MIN_DELTA = 0.05  # seconds
+# OSM places per TIGER place, roughly NC's ratio
+PLACES_PER_POLYGON = 40
+PACKAGES = ("numpy", "pandas", "geopandas", "shapely", "pyogrio", "pyarrow", "folium")
+
+
+class Inputs:
+    """Synthetic inputs of one size, generated on first use."""
+
+    def __init__(self, size, seed, workdir: Path):
+        self.size = size
+        self.seed = seed
+        self.workdir = workdir
+        self._osm = self._census = self._out_geo = None
+        self._geojson = self._mineral_csv = None
+
+    @property
+    def osm(self):
+        if self._osm is None:
+            self._osm = synthetic_localities.osm_places(self.size, seed=self.seed)
+        return self._osm
+
+    @property
+    def census(self):
+        if self._census is None:
+            self._census = synthetic_localities.census_places(
+                max(1, self.size // PLACES_PER_POLYGON), seed=self.seed
+            )
+        return self._census
+
+    @property
+    def out_geo(self):
+        if self._out_geo is None:
+            self._out_geo = build_nc_localities.prepare_out_geo(self.osm, self.census)
+        return self._out_geo
+
+    @property
+    def geojson(self):
+        if self._geojson is None:
+            self._geojson = self.workdir / "localities.geojson"
+            build_nc_localities.write_geojson(self.out_geo, self._geojson)
+        return self._geojson
+
+    @property
+    def mineral_csv(self):
+        if self._mineral_csv is None:
+            self._mineral_csv = synthetic_localities.write_mineral_csv(
+                self.workdir / "mineral_localities.csv", self.size, seed=self.seed
+            )
+        return self._mineral_csv
+
+
+def bench_prepare_out_geo(inputs: Inputs, rundir: Path, formats):
+    osm, census = inputs.osm, inputs.census
+    return lambda: build_nc_localities.prepare_out_geo(osm, census)
+
+
+def bench_write_exports_and_map(inputs: Inputs, rundir: Path, formats):
+    out_geo = inputs.out_geo
+    return lambda: build_nc_localities.write_exports_and_map(
+        out_geo, rundir, update_site=False, formats=formats
+    )
+
+
+def bench_create_map(inputs: Inputs, rundir: Path, formats):
+    geojson = inputs.geojson
+    return lambda: build_site.create_map(rundir, geojson)
+
+
+def bench_build_mineral_map(inputs: Inputs, rundir: Path, formats):
+    csv_path = inputs.mineral_csv
+    return lambda: build_mineral_map.build_mineral_map(csv_path, rundir)
+
+
+# name -> setup(inputs, rundir, formats) returning the callable to time
+BENCHMARKS = {
+    "prepare_out_geo": bench_prepare_out_geo,
+    "write_exports_and_map": bench_write_exports_and_map,
+    "create_map": bench_create_map,
+    "build_mineral_map": bench_build_mineral_map,
+}
+
+
+def run_benchmark(name, inputs: Inputs, repeat=3, formats=None):
+    """Time one benchmark; returns its result record."""
+    runs = []
+    best_stages = None
+    for _ in range(repeat):
+        # a fresh directory per run, so nothing is skipped as up to date
+        with tempfile.TemporaryDirectory(dir=inputs.workdir) as rundir:
+            fn = BENCHMARKS[name](inputs, Path(rundir), formats)
+            t0 = time.perf_counter()
+            _, stages = run_metrics.collect(fn)
+            wall = time.perf_counter() - t0
+        if not runs or wall < min(runs):
+            best_stages = stages
+        runs.append(wall)
+    return {
+        "benchmark": name,
+        "size": inputs.size,
+        "runs_s": [round(t, 4) for t in runs],
+        "best_s": round(min(runs), 4),
+        "median_s": round(statistics.median(runs), 4),
+        "peak_rss_bytes": run_metrics.peak_rss(),
+        "stages": [
+            {k: s[k] for k in ("name", "wall_s", "cpu_s", "rows_in", "rows_out")}
+            for s in sorted(best_stages, key=lambda s: s["start_s"])
+        ],
+    }
+
+
+def environment():
+    packages = {}
+    for name in PACKAGES:
+        try:
+            packages[name] = metadata.version(name)
+        except metadata.PackageNotFoundError:
+            packages[name] = None
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "cpu_count": os.cpu_count(),
+        "packages": packages,
+    }
+
+
+def run_benchmarks(
+    sizes, benchmarks=None, repeat=3, seed=0, formats=None, workdir=None
+):
+    """Run ``benchmarks`` (default: all) at each size; returns the results document."""
+    benchmarks = benchmarks or list(BENCHMARKS)
+    results = []
+    with tempfile.TemporaryDirectory(dir=workdir, prefix="bench-") as tmp:
+        for size in sizes:
+            sizedir = Path(tmp) / str(size)
+            sizedir.mkdir()
+            inputs = Inputs(size, seed, sizedir)
+            for name in benchmarks:
+                result = run_benchmark(name, inputs, repeat=repeat, formats=formats)
+                logger.info(
+                    f"{name} @ {size:,}: best {result['best_s']:.3f}s, median {result['median_s']:.3f}s"
+                )
+                results.append(result)
+    return {
+        "version": RESULTS_VERSION,
+        "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "environment": environment(),
+        "seed": seed,
+        "repeat": repeat,
+        "formats": formats or list(build_nc_localities.DEFAULT_FORMATS),
+        "results": results,
+    }
+
+
+def compare(
+    results, baseline, threshold=DEFAULT_THRESHOLD, min_delta=DEFAULT_MIN_DELTA
+):
+    """Annotate ``results`` with their baseline times; returns the regressions.
+
+    A result regresses when its best time exceeds the baseline's by more than
+    ``threshold`` (a fraction) and by at least ``min_delta`` seconds.
+    """
+    previous = {(r["benchmark"], r["size"]): r for r in baseline.get("results", [])}
+    regressions = []
+    for result in results["results"]:
+        base = previous.get((result["benchmark"], result["size"]))
+        if base is None:
+            continue
+        result["baseline_s"] = base["best_s"]
+        result["change"] = (
+            round(result["best_s"] / base["best_s"] - 1, 4) if base["best_s"] else None
+        )
+        result["regression"] = (
+            result["best_s"] > base["best_s"] * (1 + threshold)
+            and result["best_s"] - base["best_s"] >= min_delta
+        )
+        if result["regression"]:
+            regressions.append(result)
+    return regressions
+
+
+def format_table(results) -> str:
+    lines = [
+        f"{'benchmark':<24} {'size':>9} {'best s':>9} {'median s':>9} {'baseline':>9} {'change':>8}"
+    ]
+    for r in results["results"]:
+        baseline = "" if r.get("baseline_s") is None else f"{r['baseline_s']:.3f}"
+        change = "" if r.get("change") is None else f"{r['change']:+.0%}"
+        flag = "  REGRESSION" if r.get("regression") else ""
+        lines.append(
+            f"{r['benchmark']:<24} {r['size']:>9,} {r['best_s']:>9.3f} {r['median_s']:>9.3f} "
+            f"{baseline:>9} {change:>8}{flag}"
+        )
+    return "\n".join(lines)
+
+
+def write_json(data, path: Path):
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(path.suffix + ".tmp")
+    with open(tmp, "w", encoding="utf8") as fh:
+        json.dump(data, fh, indent=2)
+    os.replace(tmp, path)
+    return path
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--sizes",
+        default=DEFAULT_SIZES,
+        help=f"Comma-separated row counts, e.g. 1k,10k,100k,1m (default {DEFAULT_SIZES})",
+    )
+    parser.add_argument(
+        "--benchmarks",
+        default=None,
+        help=f"Comma-separated subset of: {', '.join(BENCHMARKS)} (default all)",
+    )
+    parser.add_argument(
+        "--repeat", type=int, default=3, help="Runs per benchmark (default 3)"
+    )
+    parser.add_argument(
+        "--seed", type=int, default=0, help="Seed of the synthetic data"
+    )
+    parser.add_argument(
+        "--formats",
+        default=None,
+        help="Export formats for write_exports_and_map (same syntax as build_nc_localities --formats)",
+    )
+    parser.add_argument(
+        "--output", default=str(DEFAULT_OUTPUT), help="Where to write the results JSON"
+    )
+    parser.add_argument(
+        "--baseline",
+        default=str(DEFAULT_BASELINE),
+        help="Results JSON to compare against (skipped when missing)",
+    )
+    parser.add_argument(
+        "--save-baseline",
+        action="store_true",
+        help="Also store these results as the baseline",
+    )
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=DEFAULT_THRESHOLD,
+        help=f"Slowdown (fraction of the baseline time) flagged as a regression (default {DEFAULT_THRESHOLD})",
+    )
+    parser.add_argument(
+        "--min-delta",
+        type=float,
+        default=DEFAULT_MIN_DELTA,
+        help=f"Ignore slowdowns smaller than this many seconds (default {DEFAULT_MIN_DELTA})",
+    )
+    parser.add_argument("--workdir", default=None, help="Directory for temporary files")
+    parser.add_argument(
+        "--verbose", action="store_true", help="Show the pipeline's own logging"
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    # the benchmarked code logs every file it writes
+    logging.getLogger().setLevel(logging.INFO if args.verbose else logging.WARNING)
+    logger.setLevel(logging.INFO)
+
+    try:
+        sizes = [
+            synthetic_localities.parse_size(s)
+            for s in args.sizes.split(",")
+            if s.strip()
+        ]
+        formats = (
+            build_nc_localities.parse_formats(args.formats) if args.formats else None
+        )
+    except ValueError as e:
+        raise SystemExit(str(e)) from e
+    benchmarks = (
+        [b.strip() for b in args.benchmarks.split(",")] if args.benchmarks else None
+    )
+    unknown = sorted(set(benchmarks or ()) - set(BENCHMARKS))
+    if unknown:
+        raise SystemExit(
+            f"Unknown benchmark(s): {', '.join(unknown)} (choose from {', '.join(BENCHMARKS)})"
+        )
+
+    results = run_benchmarks(
+        sizes,
+        benchmarks,
+        repeat=args.repeat,
+        seed=args.seed,
+        formats=formats,
+        workdir=args.workdir,
+    )
+
+    regressions = []
+    baseline_path = Path(args.baseline)
+    if baseline_path.exists() and not args.save_baseline:
+        with open(baseline_path, "r", encoding="utf8") as fh:
+            baseline = json.load(fh)
+        regressions = compare(results, baseline, args.threshold, args.min_delta)
+        results["baseline"] = {
+            "path": str(baseline_path),
+            "created_at": baseline.get("created_at"),
+        }
+    results["regressions"] = [f"{r['benchmark']}@{r['size']}" for r in regressions]
+
+    print(format_table(results))
+    logger.info(f"Wrote {write_json(results, args.output)}")
+    if args.save_baseline:
+        logger.info(f"Saved baseline {write_json(results, baseline_path)}")
+    if regressions:
+        logger.error(
+            f"{len(regressions)} regression(s): {', '.join(results['regressions'])}"
+        )
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
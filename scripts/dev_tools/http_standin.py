@@ -0,0 +1,777 @@
+#!/usr/bin/env python3
+"""Local stand-in for Nominatim, Overpass and the Census TIGER server.
+
+Replays recorded responses so the fetch layer (``fetch_state_polygon``,
+``fetch_osm_places``, ``fetch_census_places``) can be benchmarked and load-tested
+offline, with configurable latency, bandwidth throttling and error injection.
+Each service lives under its own path prefix:
+
+    http://127.0.0.1:8765/nominatim/search                 NOMINATIM_URL
+    http://127.0.0.1:8765/overpass/api/interpreter         OVERPASS_URL
+    http://127.0.0.1:8765/census/                          CENSUS_BASE
+
+Point the pipeline at it with the environment variables of the same names (the
+``serve`` command prints them). A fixture directory holds ``fixtures.json`` and
+the response bodies:
+
+    {"fixtures": [
+      {"method": "GET", "path": "/nominatim/search", "query": {"state": "North Carolina", ...},
+       "status": 200, "headers": {"Content-Type": "application/json"}, "body": "bodies/<sha>.json"},
+      {"method": "POST", "path": "/overpass/api/interpreter", "body_contains": "out ids", ...}
+    ]}
+
+The first fixture whose method and path match (and its ``query``, when given,
+equals the request's, and its ``body_contains`` occurs in the request body) is
+served; HEAD is answered from the GET fixture; anything else gets a 404.
+Responses carry an ETag, so the pipeline's ``--cache-dir`` revalidation gets 304s.
+With ``--overpass-slots`` the interpreter emulates Overpass rate limiting: queries
+beyond the free slots get a 429, and ``/overpass/api/status`` reports the slots
+in the format of the real server.
+
+Fixtures come from:
+  record      a recording proxy: requests are forwarded to the real services and
+              their responses saved (run the pipeline against it once, online)
+  synthesize  synthetic responses built from ``synthetic_localities`` (no network)
+
+Usage examples:
+  python scripts/dev_tools/http_standin.py synthesize --fixtures fixtures/nc-10k --size 10k
+  python scripts/dev_tools/http_standin.py record --fixtures fixtures/nc
+  python scripts/dev_tools/http_standin.py serve --fixtures fixtures/nc --latency 0.2 \\
+      --bandwidth 2m --error-rate 0.1 --error-status 429,504
+  python scripts/dev_tools/http_standin.py serve --fixtures fixtures/nc --overpass-slots 2 --slot-cooldown 5
+"""
+from __future__ import annotations
+
+import argparse
+import hashlib
+import io
+import json
+import logging
+import math
+import os
+import random
+import re
+import sys
+import tempfile
+import threading
+import time
+import zipfile
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qsl, urlsplit
+
+try:
+    import requests
+except ImportError:
+    requests = None
+
+logger = logging.getLogger(__name__)
+
+FIXTURES_FILE = "fixtures.json"
+BODIES_DIR = "bodies"
+DEFAULT_PORT = 8765
+DEFAULT_ERROR_STATUSES = (429, 504)
+# path prefix -> (environment override, path appended to the server URL, upstream for ``record``)
+SERVICES = {
+    "/nominatim": (
+        "NOMINATIM_URL",
+        "/nominatim/search",
+        "https://nominatim.openstreetmap.org",
+    ),
+    "/overpass": (
+        "OVERPASS_URL",
+        "/overpass/api/interpreter",
+        "https://overpass-api.de",
+    ),
+    "/census": ("CENSUS_BASE", "/census/", "https://www2.census.gov/geo/tiger"),
+}
+OVERPASS_INTERPRETER_PATH = "/overpass/api/interpreter"
+OVERPASS_STATUS_PATH = "/overpass/api/status"
+# response headers worth keeping from a recorded response
+KEPT_HEADERS = ("Content-Type", "Last-Modified", "Retry-After")
+
+
+def parse_rate(value) -> int | None:
+    """``"500k"``/``"2m"``/``"100000"`` bytes per second -> int; empty/0 -> None."""
+    if value in (None, "", "0"):
+        return None
+    match = re.fullmatch(r"(\d+(?:\.\d+)?)([kKmMgG]?)", str(value).strip())
+    if not match:
+        raise ValueError(f"Invalid rate: {value!r} (e.g. 500k or 2m bytes/s)")
+    scale = {"": 1, "k": 1024, "m": 1024**2, "g": 1024**3}[match.group(2).lower()]
+    return int(float(match.group(1)) * scale) or None
+
+
+class Fixtures:
+    """The recorded responses of one fixture directory."""
+
+    def __init__(self, directory: Path):
+        self.directory = Path(directory)
+        self.entries = []
+        self._lock = threading.Lock()
+        path = self.directory / FIXTURES_FILE
+        if path.exists():
+            with open(path, "r", encoding="utf8") as fh:
+                self.entries = json.load(fh).get("fixtures", [])
+
+    def match(self, method, path, query, body=b""):
+        """The first fixture answering this request, or None."""
+        for entry in self.entries:
+            if entry["method"] != method or entry["path"] != path:
+                continue
+            if "query" in entry and entry["query"] != query:
+                continue
+            needle = entry.get("body_contains")
+            if needle and needle.encode("utf8") not in body:
+                continue
+            return entry
+        return None
+
+    def body(self, entry) -> bytes:
+        return (
+            (self.directory / entry["body"]).read_bytes() if entry.get("body") else b""
+        )
+
+    def add(
+        self,
+        method,
+        path,
+        query,
+        status,
+        headers,
+        body: bytes,
+        body_contains=None,
+        suffix="",
+    ):
+        """Store a response (replacing an earlier one for the same request) and save."""
+        digest = hashlib.sha256(body).hexdigest()[:16]
+        rel = f"{BODIES_DIR}/{digest}{suffix}" if body else None
+        if rel:
+            target = self.directory / rel
+            target.parent.mkdir(parents=True, exist_ok=True)
+            target.write_bytes(body)
+        entry = {"method": method, "path": path}
+        if query:
+            entry["query"] = query
+        if body_contains:
+            entry["body_contains"] = body_contains
+        entry.update({"status": status, "headers": headers, "body": rel})
+        with self._lock:
+            self.entries = [
+                e
+                for e in self.entries
+                if (e["method"], e["path"], e.get("query"), e.get("body_contains"))
+                != (method, path, entry.get("query"), body_contains)
+            ]
+            self.entries.append(entry)
+            self.save()
+        return entry
+
+    def save(self):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        path = self.directory / FIXTURES_FILE
+        tmp = path.with_suffix(".json.tmp")
+        with open(tmp, "w", encoding="utf8") as fh:
+            json.dump({"fixtures": self.entries}, fh, indent=2)
+        os.replace(tmp, path)
+
+
+class StandInServer:
+    """Threaded HTTP server replaying (or, with ``record=True``, recording) fixtures.
+
+    - ``latency``/``jitter``: seconds added before each response (uniform jitter)
+    - ``bandwidth``: bytes per second per response body, or None for unthrottled
+    - ``error_rate``: share of requests answered with one of ``error_statuses``
+      (429s carry ``Retry-After: retry_after``)
+    - ``fail_first``: the first N requests of each path fail the same way, for
+      deterministic retry tests
+    - ``overpass_slots``: emulate Overpass slots: more concurrent interpreter
+      queries than this get a 429, and a finished query keeps its slot for
+      ``slot_cooldown`` seconds. ``/overpass/api/status`` reports the slots
+      (when recording, it is passed through to the real server instead).
+    """
+
+    def __init__(
+        self,
+        fixture_dir: Path,
+        host="127.0.0.1",
+        port=0,
+        latency=0.0,
+        jitter=0.0,
+        bandwidth=None,
+        error_rate=0.0,
+        error_statuses=DEFAULT_ERROR_STATUSES,
+        fail_first=0,
+        retry_after=1,
+        seed=None,
+        record=False,
+        overpass_slots=None,
+        slot_cooldown=0.0,
+    ):
+        if record and requests is None:
+            raise ImportError("requests is required to record fixtures")
+        self.fixtures = Fixtures(fixture_dir)
+        self.latency = latency
+        self.jitter = jitter
+        self.bandwidth = bandwidth
+        self.error_rate = error_rate
+        self.error_statuses = tuple(error_statuses) or DEFAULT_ERROR_STATUSES
+        self.fail_first = fail_first
+        self.retry_after = retry_after
+        self.record = record
+        self.overpass_slots = overpass_slots
+        self.slot_cooldown = slot_cooldown
+        self._overpass_running = 0
+        self._overpass_cooling = []  # monotonic times at which busy slots free up
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._seen = Counter()
+        self._in_flight = 0
+        self._stats = {
+            "requests": 0,
+            "bytes_sent": 0,
+            "max_in_flight": 0,
+            "max_overpass_running": 0,
+            "connections": 0,
+        }
+        self._by_status = Counter()
+        self._by_path = Counter()
+        self._thread = None
+        self.httpd = ThreadingHTTPServer((host, port), _Handler)
+        self.httpd.daemon_threads = True
+        self.httpd.standin = self
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def service_urls(self) -> dict:
+        """{"NOMINATIM_URL": ..., "OVERPASS_URL": ..., "CENSUS_BASE": ...} for this server."""
+        return {env: self.url + path for env, path, _ in SERVICES.values()}
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                **self._stats,
+                "by_status": {str(k): v for k, v in sorted(self._by_status.items())},
+                "by_path": dict(self._by_path),
+            }
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        logger.info(f"Stand-in server listening on {self.url}")
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+        if self._thread is not None:
+            self._thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+        return False
+
+    def _injected_error(self, path):
+        with self._lock:
+            self._seen[path] += 1
+            if self._seen[path] <= self.fail_first:
+                return self.error_statuses[
+                    (self._seen[path] - 1) % len(self.error_statuses)
+                ]
+            if self.error_rate and self._random.random() < self.error_rate:
+                return self._random.choice(self.error_statuses)
+        return None
+
+    def _count_connection(self):
+        with self._lock:
+            self._stats["connections"] += 1
+
+    def _count_request(self, path):
+        with self._lock:
+            self._stats["requests"] += 1
+            self._by_path[path] += 1
+            self._in_flight += 1
+            self._stats["max_in_flight"] = max(
+                self._stats["max_in_flight"], self._in_flight
+            )
+
+    def _request_done(self):
+        with self._lock:
+            self._in_flight -= 1
+
+    def _count_response(self, status, nbytes):
+        with self._lock:
+            self._stats["bytes_sent"] += nbytes
+            self._by_status[status] += 1
+
+    def _take_overpass_slot(self) -> bool:
+        with self._lock:
+            now = time.monotonic()
+            self._overpass_cooling = [t for t in self._overpass_cooling if t > now]
+            busy = self._overpass_running + len(self._overpass_cooling)
+            if self.overpass_slots and busy >= self.overpass_slots:
+                return False
+            self._overpass_running += 1
+            self._stats["max_overpass_running"] = max(
+                self._stats["max_overpass_running"], self._overpass_running
+            )
+            return True
+
+    def _release_overpass_slot(self):
+        with self._lock:
+            self._overpass_running -= 1
+            if self.slot_cooldown:
+                self._overpass_cooling.append(time.monotonic() + self.slot_cooldown)
+
+    def overpass_status(self) -> str:
+        """An ``/api/status`` page in the format of the real Overpass API."""
+        with self._lock:
+            now = time.monotonic()
+            cooling = sorted(t for t in self._overpass_cooling if t > now)
+            running = self._overpass_running
+            free = max(0, (self.overpass_slots or 0) - running - len(cooling))
+        lines = [
+            "Connected as: 2130706433",
+            f"Current time: {time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime())}",
+            "Announced endpoint: none",
+            f"Rate limit: {self.overpass_slots or 0}",
+        ]
+        if self.overpass_slots:
+            lines.append(f"{free} slots available now.")
+            for t in cooling:
+                wall = time.strftime(
+                    "%Y-%m-%dT%H:%M:%SZ", time.gmtime(time.time() + t - now)
+                )
+                lines.append(
+                    f"Slot available after: {wall}, in {math.ceil(t - now)} seconds."
+                )
+        lines.append(
+            "Currently running queries (pid, space limit, time limit, start time):"
+        )
+        started = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+        lines.extend(f"{1000 + n}\t536870912\t180\t{started}" for n in range(running))
+        return "\n".join(lines) + "\n"
+
+    def _delay(self):
+        with self._lock:
+            extra = self._random.uniform(0, self.jitter) if self.jitter else 0.0
+        if self.latency or extra:
+            time.sleep(self.latency + extra)
+
+    def _record(self, method, path, query, body, headers):
+        prefix = "/" + path.lstrip("/").split("/", 1)[0]
+        if prefix not in SERVICES:
+            return None
+        upstream = SERVICES[prefix][2] + path[len(prefix) :]
+        # a HEAD probe is recorded as the full GET, which later answers both
+        method = "GET" if method == "HEAD" else method
+        forwarded = {
+            k: v
+            for k, v in headers.items()
+            if k.lower() in ("content-type", "user-agent")
+        }
+        resp = requests.request(
+            method,
+            upstream,
+            params=query,
+            data=body or None,
+            headers=forwarded,
+            timeout=900,
+        )
+        kept = {k: resp.headers[k] for k in KEPT_HEADERS if k in resp.headers}
+        # POST bodies (Overpass queries) are matched exactly; they are short enough
+        needle = body.decode("utf8", "replace") if body else None
+        suffix = Path(path).suffix or (
+            ".json" if "json" in kept.get("Content-Type", "") else ""
+        )
+        entry = self.fixtures.add(
+            method,
+            path,
+            query,
+            resp.status_code,
+            kept,
+            resp.content,
+            body_contains=needle,
+            suffix=suffix,
+        )
+        logger.info(
+            f"Recorded {method} {path} -> {resp.status_code} ({len(resp.content):,} bytes)"
+        )
+        return entry
+
+
+class _Handler(BaseHTTPRequestHandler):
+    """Request handler of a StandInServer (``self.server.standin``)."""
+
+    protocol_version = "HTTP/1.1"
+
+    @property
+    def standin(self) -> StandInServer:
+        return self.server.standin
+
+    def setup(self):
+        super().setup()
+        self.standin._count_connection()
+
+    def log_message(self, fmt, *args):
+        logger.debug(f"{self.address_string()} {fmt % args}")
+
+    def do_GET(self):
+        self._serve()
+
+    def do_POST(self):
+        self._serve()
+
+    def do_HEAD(self):
+        self._serve()
+
+    def _send(self, status, headers, body=b""):
+        body_len = len(body)
+        if self.command == "HEAD":
+            body = b""
+        if self.path != "/__stats":
+            # counted up front: the client may move on as soon as it has the body
+            self.standin._count_response(status, len(body))
+        self.send_response(status)
+        for k, v in headers.items():
+            self.send_header(k, v)
+        self.send_header("Content-Length", str(body_len))
+        self.end_headers()
+        if body:
+            self._write_throttled(body)
+
+    def _write_throttled(self, body):
+        if not self.standin.bandwidth:
+            self.wfile.write(body)
+            return
+        chunk = max(1024, self.standin.bandwidth // 20)
+        start = time.perf_counter()
+        for offset in range(0, len(body), chunk):
+            self.wfile.write(body[offset : offset + chunk])
+            due = (offset + chunk) / self.standin.bandwidth - (
+                time.perf_counter() - start
+            )
+            if due > 0:
+                time.sleep(due)
+
+    def _serve(self):
+        parts = urlsplit(self.path)
+        path, query = parts.path, dict(parse_qsl(parts.query, keep_blank_values=True))
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length) if length else b""
+        if path == "/__stats":
+            self._send(
+                200,
+                {"Content-Type": "application/json"},
+                json.dumps(self.standin.stats()).encode(),
+            )
+            return
+        self.standin._count_request(path)
+        try:
+            if path == OVERPASS_STATUS_PATH:
+                self._status_page(query)
+            elif path == OVERPASS_INTERPRETER_PATH:
+                self._interpreter(path, query, body)
+            else:
+                self._replay(path, query, body)
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # the client gave up (timeout, cancelled probe)
+        finally:
+            self.standin._request_done()
+
+    def _interpreter(self, path, query, body):
+        if not self.standin._take_overpass_slot():
+            # the real API sends no Retry-After; clients read /api/status
+            self._send(
+                429,
+                {"Content-Type": "text/plain"},
+                b"Too many requests: no free slot\n",
+            )
+            return
+        # the slot is held from receipt, through the processing time
+        try:
+            self._replay(path, query, body)
+        finally:
+            self.standin._release_overpass_slot()
+
+    def _replay(self, path, query, body):
+        self.standin._delay()
+        status = self.standin._injected_error(path)
+        if status is not None:
+            headers = {"Content-Type": "text/plain"}
+            if status == 429:
+                headers["Retry-After"] = str(self.standin.retry_after)
+            self._send(status, headers, f"Injected {status}\n".encode())
+            return
+        self._respond(path, query, body)
+
+    def _status_page(self, query):
+        if self.standin.record:
+            upstream = SERVICES["/overpass"][2] + "/api/status"
+            resp = requests.get(upstream, params=query, timeout=30)
+            self._send(resp.status_code, {"Content-Type": "text/plain"}, resp.content)
+            return
+        self._send(
+            200, {"Content-Type": "text/plain"}, self.standin.overpass_status().encode()
+        )
+
+    def _respond(self, path, query, body):
+        method = "GET" if self.command == "HEAD" else self.command
+        entry = self.standin.fixtures.match(method, path, query, body)
+        if entry is None and self.standin.record:
+            entry = self.standin._record(self.command, path, query, body, self.headers)
+        if entry is None:
+            logger.warning(f"No fixture for {self.command} {self.path}")
+            self._send(404, {"Content-Type": "text/plain"}, b"No fixture\n")
+            return
+        data = self.standin.fixtures.body(entry)
+        headers = dict(entry.get("headers", {}))
+        etag = f'"{hashlib.sha256(data).hexdigest()[:32]}"'
+        headers["ETag"] = etag
+        if (
+            entry.get("status", 200) == 200
+            and self.headers.get("If-None-Match") == etag
+        ):
+            self._send(304, {"ETag": etag})
+            return
+        self._send(entry.get("status", 200), headers, data)
+
+
+def _json_body(data) -> bytes:
+    return json.dumps(data, separators=(",", ":")).encode("utf8")
+
+
+def synthesize(
+    fixture_dir: Path,
+    size=10_000,
+    seed=0,
+    state="North Carolina",
+    state_fips="37",
+    year=2025,
+):
+    """Write fixtures answering the pipeline's fetches with ``synthetic_localities`` data."""
+    try:
+        from scripts.dev_tools import synthetic_localities
+    except ImportError:  # executed as ``python scripts/dev_tools/http_standin.py``
+        import synthetic_localities
+
+    fixtures = Fixtures(fixture_dir)
+    west, south, east, north = synthetic_localities.BBOX
+    ring = [[west, south], [east, south], [east, north], [west, north], [west, south]]
+    nominatim = [
+        {
+            "osm_type": "relation",
+            "osm_id": 224045,
+            "display_name": f"{state}, United States",
+            "category": "boundary",
+            "type": "administrative",
+            "addresstype": "state",
+            "boundingbox": [str(south), str(north), str(west), str(east)],
+            "geojson": {"type": "Polygon", "coordinates": [ring]},
+        }
+    ]
+    json_headers = {"Content-Type": "application/json"}
+    fixtures.add(
+        "GET",
+        "/nominatim/search",
+        None,
+        200,
+        json_headers,
+        _json_body(nominatim),
+        suffix=".json",
+    )
+
+    osm = synthetic_localities.osm_places(size, seed=seed)
+    elements = []
+    for osm_id, osm_type, tags, point in zip(
+        osm["osm_id"], osm["osm_type"], osm["tags"], osm.geometry, strict=True
+    ):
+        tags = dict(tags)
+        element = {"type": osm_type, "id": int(osm_id)}
+        if osm_type == "node":
+            element.update(lat=round(point.y, 7), lon=round(point.x, 7))
+        else:
+            element["center"] = {"lat": round(point.y, 7), "lon": round(point.x, 7)}
+        element["tags"] = tags
+        elements.append(element)
+    overpass = {
+        "version": 0.6,
+        "generator": "http_standin synthesize",
+        "elements": elements,
+    }
+    fixtures.add(
+        "POST",
+        "/overpass/api/interpreter",
+        None,
+        200,
+        json_headers,
+        _json_body(overpass),
+        suffix=".json",
+    )
+
+    census = synthetic_localities.census_places(max(1, size // 40), seed=seed)
+    stem = f"tl_{year}_{state_fips}_place"
+    with tempfile.TemporaryDirectory() as tmp:
+        census.to_file(Path(tmp) / f"{stem}.shp")
+        buf = io.BytesIO()
+        with zipfile.ZipFile(buf, "w", zipfile.ZIP_DEFLATED) as zf:
+            for part in sorted(Path(tmp).iterdir()):
+                zf.write(part, part.name)
+    fixtures.add(
+        "GET",
+        f"/census/TIGER{year}/PLACE/{stem}.zip",
+        None,
+        200,
+        {"Content-Type": "application/zip"},
+        buf.getvalue(),
+        suffix=".zip",
+    )
+    logger.info(
+        f"Wrote synthetic fixtures ({len(elements):,} places, {len(census):,} polygons) to {fixture_dir}"
+    )
+    return fixtures
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    sub = parser.add_subparsers(dest="command", required=True)
+    for name in ("serve", "record"):
+        p = sub.add_parser(
+            name,
+            help=(
+                "Replay fixtures"
+                if name == "serve"
+                else "Record fixtures through a proxy"
+            ),
+        )
+        p.add_argument("--fixtures", required=True, help="Fixture directory")
+        p.add_argument("--host", default="127.0.0.1")
+        p.add_argument("--port", type=int, default=DEFAULT_PORT)
+        p.add_argument(
+            "--latency", type=float, default=0.0, help="Seconds added to every response"
+        )
+        p.add_argument(
+            "--jitter",
+            type=float,
+            default=0.0,
+            help="Up to this many extra seconds, at random",
+        )
+        p.add_argument(
+            "--bandwidth",
+            default=None,
+            help="Bytes/s per response body, e.g. 500k or 2m",
+        )
+        p.add_argument(
+            "--error-rate",
+            type=float,
+            default=0.0,
+            help="Share of requests answered with an error",
+        )
+        p.add_argument(
+            "--error-status",
+            default=",".join(map(str, DEFAULT_ERROR_STATUSES)),
+            help="Comma-separated statuses to inject (default 429,504)",
+        )
+        p.add_argument(
+            "--fail-first",
+            type=int,
+            default=0,
+            help="Fail the first N requests of each path",
+        )
+        p.add_argument(
+            "--retry-after",
+            type=int,
+            default=1,
+            help="Retry-After seconds sent with 429s",
+        )
+        p.add_argument(
+            "--seed", type=int, default=None, help="Seed for jitter and error injection"
+        )
+        p.add_argument(
+            "--overpass-slots",
+            type=int,
+            default=None,
+            help="Emulate Overpass rate limiting with this many query slots (serve only)",
+        )
+        p.add_argument(
+            "--slot-cooldown",
+            type=float,
+            default=0.0,
+            help="Seconds a slot stays busy after its query finished",
+        )
+    p = sub.add_parser("synthesize", help="Write synthetic fixtures (no network)")
+    p.add_argument("--fixtures", required=True, help="Fixture directory")
+    p.add_argument("--size", default="10k", help="OSM places, e.g. 1k, 10k, 100k, 1m")
+    p.add_argument("--seed", type=int, default=0)
+    p.add_argument("--state", default="North Carolina")
+    p.add_argument("--state-fips", default="37")
+    p.add_argument("--year", type=int, default=2025, help="TIGER vintage to publish")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s - %(levelname)s - %(message)s",
+        datefmt="%H:%M:%S",
+    )
+    args = parse_args(argv)
+    if args.command == "synthesize":
+        try:
+            from scripts.dev_tools.synthetic_localities import parse_size
+        except ImportError:  # executed as ``python scripts/dev_tools/http_standin.py``
+            from synthetic_localities import parse_size
+        synthesize(
+            Path(args.fixtures),
+            parse_size(args.size),
+            args.seed,
+            args.state,
+            args.state_fips,
+            args.year,
+        )
+        return 0
+
+    try:
+        bandwidth = parse_rate(args.bandwidth)
+        statuses = [int(s) for s in args.error_status.split(",") if s.strip()]
+    except ValueError as e:
+        raise SystemExit(str(e)) from e
+    server = StandInServer(
+        Path(args.fixtures),
+        host=args.host,
+        port=args.port,
+        latency=args.latency,
+        jitter=args.jitter,
+        bandwidth=bandwidth,
+        error_rate=args.error_rate,
+        error_statuses=statuses,
+        fail_first=args.fail_first,
+        retry_after=args.retry_after,
+        seed=args.seed,
+        record=args.command == "record",
+        overpass_slots=args.overpass_slots,
+        slot_cooldown=args.slot_cooldown,
+    )
+    print("Point the pipeline at the stand-in with:")
+    for env, url in server.service_urls().items():
+        print(f"  export {env}={url}")
+    print(f"Request counts: {server.url}/__stats")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.httpd.server_close()
+        logger.info(f"Served: {json.dumps(server.stats())}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,354 @@
+"""Synthetic, offline stand-ins for the pipeline's inputs (for benchmarks).
+
+- ``osm_places(n)``: an OSM-like places GeoDataFrame in the layout of
+  ``build_nc_localities.OSM_COLUMNS``. Points cluster around "metro" centres,
+  names follow a Zipf-like distribution (a few names such as "Oak Grove" repeat
+  all over the state), population tags are sparse strings (some "12,345"), and a
+  share of rows duplicate another place: the same name and coordinates with
+  different case/whitespace (removed by ``dedupe_localities``) or the same name
+  a few metres away (as a node next to its way; left for ``fuzzy_dedupe``).
+- ``census_places(n)``: TIGER-like place polygons (GEOID/NAME/NAMELSAD, NAD83)
+  around the same centres.
+- ``write_mineral_csv(path, n)``: a ``data/mineral_localities.csv`` lookalike.
+
+Everything is seeded, so a given size always produces the same data.
+"""
+
+from __future__ import annotations
+
+import re
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+try:
+    import geopandas as gpd
+    import shapely
+except ImportError:
+    gpd = None
+    shapely = None
+
+# NC extent (west, south, east, north)
+BBOX = (-84.3, 33.8, -75.4, 36.6)
+STATE_FIPS = "37"
+SIZES = {"1k": 1_000, "10k": 10_000, "100k": 100_000, "1m": 1_000_000}
+
+PREFIXES = [
+    "Oak",
+    "Cedar",
+    "Pine",
+    "Maple",
+    "Poplar",
+    "Walnut",
+    "Holly",
+    "Laurel",
+    "Rock",
+    "Stony",
+    "Spring",
+    "Mill",
+    "Bear",
+    "Fox",
+    "Deer",
+    "Turkey",
+    "Buck",
+    "Beaver",
+    "Shady",
+    "Sandy",
+    "Red",
+    "White",
+    "Green",
+    "Black",
+    "Silver",
+    "Union",
+    "Liberty",
+    "Pleasant",
+    "Fair",
+    "Bethel",
+    "Shiloh",
+    "Salem",
+    "Zion",
+    "Piney",
+    "Mount",
+    "Rich",
+    "Long",
+    "Flat",
+    "Big",
+    "Little",
+]
+SUFFIXES = [
+    "Grove",
+    "Hill",
+    "Springs",
+    "Creek",
+    "Ridge",
+    "Valley",
+    "Point",
+    "Crossroads",
+    "Branch",
+    "Level",
+    "Gap",
+    "Mills",
+    "Ford",
+    "Hollow",
+    "Run",
+    "Chapel",
+    "Church",
+    "Corner",
+    "Store",
+    "ville",
+    "ton",
+    "boro",
+    "wood",
+    "field",
+    "dale",
+    "view",
+]
+MODIFIERS = ["", "", "", "", "", "East ", "West ", "North ", "South ", "New ", "Old "]
+
+# (place, share of rows, log-normal population median, share with a population tag)
+PLACES = [
+    ("hamlet", 0.42, 60, 0.05),
+    ("locality", 0.20, 0, 0.0),
+    ("village", 0.18, 600, 0.35),
+    ("neighbourhood", 0.10, 0, 0.0),
+    ("town", 0.08, 4_000, 0.8),
+    ("suburb", 0.015, 8_000, 0.4),
+    ("city", 0.005, 60_000, 0.95),
+]
+OSM_TYPES = np.array(["node", "way", "relation"], dtype=object)
+
+DUPLICATE_RATE = 0.08  # share of rows that repeat an earlier place
+METRO_COUNT = 40
+METRO_SHARE = 0.7  # share of points clustered around metro centres
+METRO_SPREAD = 0.15  # degrees (1 sigma)
+TIGER_PLACE_COUNT = 750  # incorporated places and CDPs in NC
+
+
+def parse_size(value) -> int:
+    """``"10k"``/``"1m"``/``"2500"`` -> row count."""
+    text = str(value).strip().lower().replace("_", "")
+    if text in SIZES:
+        return SIZES[text]
+    match = re.fullmatch(r"(\d+)([km]?)", text)
+    if not match:
+        raise ValueError(
+            f"Invalid size: {value!r} (e.g. 1k, 10k, 100k, 1m or a number)"
+        )
+    return int(match.group(1)) * {"": 1, "k": 1_000, "m": 1_000_000}[match.group(2)]
+
+
+def _require_geopandas():
+    if gpd is None:
+        raise ImportError("geopandas is required to generate synthetic localities")
+
+
+def name_vocabulary():
+    """All synthetic place names, most "typical" first (Zipf rank order)."""
+    base = [
+        f"{p}{s}" if s[0].islower() else f"{p} {s}" for s in SUFFIXES for p in PREFIXES
+    ]
+    rng = np.random.default_rng(12345)
+    base = [base[k] for k in rng.permutation(len(base))]
+    # "East Oak Grove", "New Salem", ... for the more common names
+    modified = [m + name for m in MODIFIERS if m for name in base[:300]]
+    return np.array(base + modified, dtype=object)
+
+
+def _zipf_choice(rng, n, size, exponent=0.6):
+    weights = 1.0 / np.arange(1, n + 1) ** exponent
+    return rng.choice(n, size=size, p=weights / weights.sum())
+
+
+def _centres(rng, count=METRO_COUNT):
+    west, south, east, north = BBOX
+    return np.column_stack(
+        [rng.uniform(west, east, count), rng.uniform(south, north, count)]
+    )
+
+
+def _coordinates(rng, n, centres):
+    west, south, east, north = BBOX
+    clustered = rng.random(n) < METRO_SHARE
+    # larger metros attract more points
+    metro = _zipf_choice(rng, len(centres), n, exponent=0.8)
+    lon = np.where(
+        clustered,
+        centres[metro, 0] + rng.normal(0, METRO_SPREAD, n),
+        rng.uniform(west, east, n),
+    )
+    lat = np.where(
+        clustered,
+        centres[metro, 1] + rng.normal(0, METRO_SPREAD, n),
+        rng.uniform(south, north, n),
+    )
+    return np.clip(lon, west, east), np.clip(lat, south, north)
+
+
+def _population_tags(rng, place_index):
+    n = len(place_index)
+    population = np.full(n, None, dtype=object)
+    for k, (_, _, median, tagged) in enumerate(PLACES):
+        rows = np.flatnonzero((place_index == k) & (rng.random(n) < tagged))
+        if not len(rows) or not median:
+            continue
+        values = np.rint(median * rng.lognormal(0, 0.9, len(rows))).astype(np.int64)
+        text = values.astype(str).astype(object)
+        # OSM population tags are free text: some use thousands separators
+        commas = rng.random(len(rows)) < 0.1
+        text[commas] = [f"{v:,}" for v in values[commas]]
+        population[rows] = text
+    return population
+
+
+def _respell(rng, names):
+    """Case/whitespace variants of ``names`` (same normalised name)."""
+    style = rng.integers(0, 3, len(names))
+    out = names.copy()
+    for k, fn in enumerate((str.upper, str.lower, lambda s: f" {s}  ")):
+        rows = np.flatnonzero(style == k)
+        out[rows] = [None if v is None else fn(v) for v in names[rows]]
+    return out
+
+
+def osm_places(n, seed=0, duplicate_rate=DUPLICATE_RATE):
+    """OSM-like places GeoDataFrame with ``n`` rows (see module docstring)."""
+    _require_geopandas()
+    rng = np.random.default_rng(seed)
+    vocabulary = name_vocabulary()
+    n_dup = int(n * duplicate_rate)
+    n_base = n - n_dup
+
+    lon, lat = _coordinates(rng, n_base, _centres(np.random.default_rng(seed + 1)))
+    names = vocabulary[_zipf_choice(rng, len(vocabulary), n_base)]  # top name ~2%
+    names[rng.random(n_base) < 0.02] = None  # unnamed places
+    shares = np.array([p[1] for p in PLACES])
+    place_index = rng.choice(len(PLACES), size=n_base, p=shares / shares.sum())
+    osm_type = OSM_TYPES[rng.choice(3, size=n_base, p=[0.93, 0.06, 0.01])]
+
+    # duplicates of randomly chosen places: half exact (respelled), half a few metres off
+    src = rng.integers(0, n_base, n_dup)
+    exact = rng.random(n_dup) < 0.5
+    jitter = np.where(exact, 0.0, rng.normal(0, 0.0003, n_dup))  # ~30 m
+    dup_names = names[src]
+    dup_names[exact] = _respell(rng, dup_names[exact])
+    dup_type = np.where(osm_type[src] == "node", "way", "node").astype(object)
+
+    lon = np.concatenate([lon, lon[src] + jitter])
+    lat = np.concatenate([lat, lat[src] - jitter])
+    names = np.concatenate([names, dup_names])
+    place_index = np.concatenate([place_index, place_index[src]])
+    osm_type = np.concatenate([osm_type, dup_type])
+    order = rng.permutation(n)  # interleave the duplicates
+
+    place = np.array([p[0] for p in PLACES], dtype=object)[place_index]
+    population = _population_tags(rng, place_index)
+    tags = np.empty(n, dtype=object)
+    tags[:] = [
+        {"place": p} if v is None else {"name": v, "place": p}
+        for v, p in zip(names, place, strict=True)
+    ]
+    return gpd.GeoDataFrame(
+        {
+            "osm_id": np.arange(1, n + 1, dtype=np.int64) * 7 + 100_000,
+            "osm_type": osm_type[order],
+            "name": names[order],
+            "place": place[order],
+            "population": population[order],
+            "tags": tags[order],
+        },
+        geometry=gpd.points_from_xy(lon[order], lat[order]),
+        crs="EPSG:4326",
+    )
+
+
+def census_places(n, seed=0, vertices=12):
+    """TIGER-like place polygons (``n`` rows, NAD83) around the same metro centres.
+
+    Outlines shrink as ``n`` grows so that, like NC's ~750 TIGER places, they
+    cover a small share of the state whatever the row count.
+    """
+    _require_geopandas()
+    rng = np.random.default_rng(seed + 2)
+    lon, lat = _coordinates(rng, n, _centres(np.random.default_rng(seed + 1)))
+    # irregular star-shaped outlines, a few km across at NC's place count
+    median = 0.02 * np.sqrt(TIGER_PLACE_COUNT / n)
+    radius = np.clip(median * rng.lognormal(0, 0.7, n), median / 4, median * 8)
+    angles = np.linspace(0, 2 * np.pi, vertices, endpoint=False)
+    r = radius[:, None] * rng.uniform(0.6, 1.0, (n, vertices))
+    ring = np.stack(
+        [lon[:, None] + r * np.cos(angles), lat[:, None] + r * np.sin(angles)], axis=-1
+    )
+    ring = np.concatenate([ring, ring[:, :1]], axis=1)  # close the rings
+    vocabulary = name_vocabulary()
+    names = vocabulary[rng.integers(0, len(vocabulary), n)]
+    lsad = np.where(
+        rng.random(n) < 0.6, " town", np.where(rng.random(n) < 0.5, " city", " CDP")
+    )
+    place_fp = (np.arange(n) * 37 % 99_999).astype(str)
+    return gpd.GeoDataFrame(
+        {
+            "STATEFP": STATE_FIPS,
+            "PLACEFP": np.char.zfill(place_fp, 5),
+            "GEOID": np.char.add(STATE_FIPS, np.char.zfill(place_fp, 5)),
+            "NAME": names,
+            "NAMELSAD": np.char.add(names.astype(str), lsad),
+        },
+        geometry=shapely.polygons(ring),
+        crs="EPSG:4269",
+    )
+
+
+MINERAL_TYPES = [
+    "gems",
+    "other",
+    "gold",
+    "emerald",
+    "garnet",
+    "ruby_sapphire",
+    "hiddenite",
+    "silver",
+    "copper",
+    "uranium",
+    "platinum",
+]
+MINERALS = [
+    "Quartz",
+    "Beryl",
+    "Garnet",
+    "Mica",
+    "Feldspar",
+    "Rutile",
+    "Kyanite",
+    "Corundum",
+    "Pyrite",
+]
+
+
+def write_mineral_csv(path: Path, n, seed=0):
+    """Write a mineral localities CSV with ``n`` rows; returns its path."""
+    rng = np.random.default_rng(seed + 3)
+    lon, lat = _coordinates(rng, n, _centres(np.random.default_rng(seed + 1)))
+    vocabulary = name_vocabulary()
+    names = vocabulary[rng.integers(0, len(vocabulary), n)]
+    kind = rng.choice(["Mine", "Prospect", "Quarry", "Property"], n)
+    minerals = np.array(MINERALS, dtype=object)
+    description = [
+        f"{', '.join(minerals[rng.choice(len(minerals), k, replace=False)])}. {c} County."
+        for k, c in zip(
+            rng.integers(1, 5, n),
+            vocabulary[rng.integers(0, len(vocabulary), n)],
+            strict=True,
+        )
+    ]
+    weights = 1.0 / np.arange(1, len(MINERAL_TYPES) + 1)
+    pd.DataFrame(
+        {
+            "name": [f"{a} {b}" for a, b in zip(names, kind, strict=True)],
+            "latitude": lat.round(4),
+            "longitude": lon.round(4),
+            "mineral_type": rng.choice(MINERAL_TYPES, n, p=weights / weights.sum()),
+            "description": description,
+        }
+    ).to_csv(path, index=False)
+    return Path(path)
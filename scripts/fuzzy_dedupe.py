@@ -0,0 +1,264 @@
+"""
+Proximity-based fuzzy de-duplication of localities.
+
+Exact de-duplication (``dedupe_localities``) only drops rows with identical
+coordinates and names. This stage also merges near-duplicates such as an OSM node
+and a way centre for the same town a few hundred metres apart, "Mt. Airy" vs
+"Mount Airy", or a mineral site repeating an OSM hamlet.
+
+Points are bucketed in a grid whose cell size is the merge radius, so each point
+is only compared with points in its own and adjacent cells. Pairs within the
+radius are scored by the similarity of their normalised names; pairs above the
+threshold are merged (transitively) and each group keeps one row, chosen by a
+precedence rule, with missing population/GEOID filled in from the others.
+"""
+
+from __future__ import annotations
+
+import difflib
+import logging
+import re
+
+import numpy as np
+
+try:
+    import pandas as pd
+except ImportError:
+    pd = None
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_RADIUS_M = 250.0
+DEFAULT_MIN_SIMILARITY = 0.85
+
+_M_PER_DEG_LAT = 110_574.0
+_M_PER_DEG_LON = 111_320.0
+
+ABBREVIATIONS = {
+    "mt": "mount",
+    "mtn": "mountain",
+    "ft": "fort",
+    "pt": "point",
+    "st": "saint",
+    "ste": "sainte",
+    "hts": "heights",
+    "spgs": "springs",
+    "spg": "spring",
+    "jct": "junction",
+    "ctr": "center",
+    "xrds": "crossroads",
+}
+
+# Lower ranks win when choosing the row that represents a group
+PLACE_RANK = {
+    "city": 0,
+    "town": 1,
+    "village": 2,
+    "hamlet": 3,
+    "suburb": 4,
+    "neighbourhood": 5,
+}
+OSM_TYPE_RANK = {"node": 0, "relation": 1, "way": 2}
+_OTHER_TYPE_RANK = 3  # e.g. mineral_site: keep the OSM place when both exist
+
+
+def normalize_name(name) -> str:
+    """Case-fold, drop punctuation and expand common abbreviations."""
+    if not isinstance(name, str):
+        return ""
+    tokens = re.sub(r"[^\w\s]", " ", name.casefold()).split()
+    return " ".join(ABBREVIATIONS.get(t, t) for t in tokens)
+
+
+def names_match(a: str, b: str, min_similarity=DEFAULT_MIN_SIMILARITY) -> bool:
+    """Whether two normalised names are at least ``min_similarity`` alike.
+
+    Uses difflib's cheap upper bounds to reject most pairs before computing the
+    full ratio, as ``difflib.get_close_matches`` does.
+    """
+    if a == b:
+        return True
+    if not a or not b:
+        return False
+    matcher = difflib.SequenceMatcher(None, a, b)
+    return (
+        matcher.real_quick_ratio() >= min_similarity
+        and matcher.quick_ratio() >= min_similarity
+        and matcher.ratio() >= min_similarity
+    )
+
+
+def _project(lon, lat):
+    """Equirectangular metres relative to the batch, for grid bucketing.
+
+    Longitudes are scaled at the most poleward latitude of the batch, so the
+    projection never overstates east-west distances and the grid finds every
+    pair within the radius (and some beyond it; see ``pair_distances``).
+    """
+    lon = np.asarray(lon, dtype=np.float64)
+    lat = np.asarray(lat, dtype=np.float64)
+    lon0 = lon.mean()
+    lat0 = lat.mean()
+    cos_min = np.cos(np.radians(np.abs(lat).max()))
+    x = (lon - lon0) * _M_PER_DEG_LON * cos_min
+    y = (lat - lat0) * _M_PER_DEG_LAT
+    return x, y
+
+
+def pair_distances(lon, lat, i, j):
+    """Metres between points ``i`` and ``j``, scaled at each pair's mid-latitude."""
+    lon = np.asarray(lon, dtype=np.float64)
+    lat = np.asarray(lat, dtype=np.float64)
+    mid = np.radians((lat[i] + lat[j]) / 2)
+    dx = (lon[i] - lon[j]) * _M_PER_DEG_LON * np.cos(mid)
+    dy = (lat[i] - lat[j]) * _M_PER_DEG_LAT
+    return np.hypot(dx, dy)
+
+
+def neighbour_pairs(x, y, radius):
+    """Return index arrays ``(i, j)`` of all point pairs at most ``radius`` apart.
+
+    Points are sorted by grid cell; each point is matched against later points in
+    its own cell and against four of its eight neighbouring cells, so every pair
+    is produced once.
+    """
+    n = len(x)
+    if n < 2:
+        return np.empty(0, dtype=np.intp), np.empty(0, dtype=np.intp)
+    cx = np.floor(x / radius).astype(np.int64)
+    cy = np.floor(y / radius).astype(np.int64)
+    offset = np.int64(1 << 31)
+    key = (cx << 32) + (cy + offset)
+    order = np.argsort(key, kind="stable")
+    skey, scx, scy = key[order], cx[order], cy[order]
+    positions = np.arange(n)
+
+    left, right = [], []
+    for dx, dy in ((0, 0), (1, -1), (1, 0), (1, 1), (0, 1)):
+        target = ((scx + dx) << 32) + (scy + dy + offset)
+        hi = np.searchsorted(skey, target, side="right")
+        if dx == 0 and dy == 0:
+            lo = positions + 1
+        else:
+            lo = np.searchsorted(skey, target, side="left")
+        counts = np.maximum(hi - lo, 0)
+        total = int(counts.sum())
+        if not total:
+            continue
+        src = np.repeat(positions, counts)
+        starts = np.cumsum(counts) - counts
+        dst = lo[src] + (np.arange(total) - starts[src])
+        left.append(order[src])
+        right.append(order[dst])
+
+    if not left:
+        return np.empty(0, dtype=np.intp), np.empty(0, dtype=np.intp)
+    i = np.concatenate(left)
+    j = np.concatenate(right)
+    close = np.hypot(x[i] - x[j], y[i] - y[j]) <= radius
+    return i[close], j[close]
+
+
+def _components(n, i, j):
+    """Connected-component label (smallest member index) for each of ``n`` rows."""
+    parent = {}
+
+    def find(a):
+        root = a
+        while parent.get(root, root) != root:
+            root = parent[root]
+        while a != root:
+            parent[a], a = root, parent.get(a, a)
+        return root
+
+    for a, b in zip(i.tolist(), j.tolist(), strict=True):
+        ra, rb = find(a), find(b)
+        if ra != rb:
+            parent[max(ra, rb)] = min(ra, rb)
+    labels = np.arange(n)
+    for a in parent:
+        labels[a] = find(a)
+    return labels
+
+
+def _is_blank(series):
+    return series.isna().to_numpy() | (series.astype(str).str.strip() == "").to_numpy()
+
+
+def fuzzy_dedupe(
+    out_geo,
+    radius_m=DEFAULT_RADIUS_M,
+    min_similarity=DEFAULT_MIN_SIMILARITY,
+    population=None,
+):
+    """Merge near-duplicate localities in ``out_geo`` (EPSG:4326 points).
+
+    ``population`` is the numeric population per row (NaN when unknown), used to
+    break ties between otherwise equal candidates. A group keeps the row with, in
+    order: an OSM (rather than e.g. mineral) source, the highest place rank, the
+    largest population, node over relation over way, and the earliest position.
+    """
+    n = len(out_geo)
+    if n < 2 or not radius_m:
+        return out_geo
+
+    lon, lat = out_geo.geometry.x.values, out_geo.geometry.y.values
+    i, j = neighbour_pairs(*_project(lon, lat), radius_m)
+    close = pair_distances(lon, lat, i, j) <= radius_m
+    i, j = i[close], j[close]
+    if len(i):
+        # Normalise each distinct name once; unnamed rows (code -1) never merge
+        raw_codes, raw_names = pd.factorize(out_geo["final_name"])
+        norm = np.array([normalize_name(v) for v in raw_names] + [""], dtype=object)
+        codes, uniques = pd.factorize(pd.Series(norm[raw_codes]).replace("", np.nan))
+        named = (codes[i] >= 0) & (codes[j] >= 0)
+        same = named & (codes[i] == codes[j])
+        matches = {}
+        keep = same.copy()
+        for k in np.flatnonzero(named & ~same):
+            pair = (codes[i[k]], codes[j[k]])
+            if pair not in matches:
+                matches[pair] = names_match(
+                    uniques[pair[0]], uniques[pair[1]], min_similarity
+                )
+            keep[k] = matches[pair]
+        i, j = i[keep], j[keep]
+    if not len(i):
+        return out_geo
+
+    labels = _components(n, i, j)
+    if population is None:
+        population = np.full(n, np.nan)
+    osm_type_rank = (
+        out_geo["osm_type"].map(OSM_TYPE_RANK).fillna(_OTHER_TYPE_RANK).to_numpy()
+    )
+    place_rank = out_geo["place"].map(PLACE_RANK).fillna(len(PLACE_RANK)).to_numpy()
+    pop_rank = np.where(np.isnan(population), np.inf, -np.asarray(population))
+    source_rank = osm_type_rank == _OTHER_TYPE_RANK
+    order = np.lexsort(
+        (np.arange(n), osm_type_rank, pop_rank, place_rank, source_rank, labels)
+    )
+
+    sorted_labels = labels[order]
+    first = np.unique(sorted_labels, return_index=True)[1]
+    reps = order[first]
+    merged = out_geo.iloc[reps].copy()
+
+    # Fill missing attributes of the kept row from the group, in precedence order
+    for col in ("population", "geoid"):
+        if col not in out_geo.columns:
+            continue
+        values = out_geo[col].to_numpy()
+        donors = order[~_is_blank(out_geo[col])[order]]
+        groups, first_donor = np.unique(labels[donors], return_index=True)
+        donor = np.full(n, -1)
+        donor[groups] = donors[first_donor]
+        d = donor[labels[reps]]
+        merged[col] = np.where(d >= 0, values[np.maximum(d, 0)], merged[col].to_numpy())
+
+    merged = merged.iloc[np.argsort(reps, kind="stable")]
+    logger.info(
+        f"Fuzzy de-duplication merged {n - len(merged)} of {n} localities "
+        f"(radius {radius_m:g} m, similarity >= {min_similarity:g})"
+    )
+    return merged
@@ -0,0 +1,178 @@
+"""
+Streaming GeoJSON writer for point layers.
+
+Features are formatted straight from coordinate arrays and property columns:
+coordinates are rounded once with NumPy (6 decimals is ~10 cm) and written in
+their shortest form, property values are JSON-encoded column by column, and the
+output is written in chunks without building feature dicts. Newline-delimited
+GeoJSON (one feature per line) is supported for streaming consumers.
+
+    write_points_gdf(out_geo, "nc_localities.geojson", precision=6)
+    text = dumps_points(lon, lat, {"name": names}, precision=5)
+"""
+
+from __future__ import annotations
+
+import json
+import math
+import os
+import tempfile
+from json.encoder import encode_basestring
+from pathlib import Path
+
+import numpy as np
+
+DEFAULT_PRECISION = 6
+CHUNK_SIZE = 10_000
+NDJSON_SUFFIXES = (".geojsonl", ".geojsons", ".ndjson")
+
+
+def _encode_value(v):
+    if v is None:
+        return "null"
+    if isinstance(v, str):
+        return encode_basestring(v)
+    if isinstance(v, (bool, np.bool_)):
+        return "true" if v else "false"
+    if isinstance(v, (int, np.integer)):
+        return str(int(v))
+    if isinstance(v, (float, np.floating)):
+        return "null" if math.isnan(v) or math.isinf(v) else repr(float(v))
+    return json.dumps(v, default=str)
+
+
+def encode_column(values):
+    """JSON-encode every value of a column; NaN/None become ``null``."""
+    arr = np.asarray(values)
+    if arr.dtype.kind in "iu":
+        return [str(v) for v in arr.tolist()]
+    if arr.dtype.kind == "b":
+        return ["true" if v else "false" for v in arr.tolist()]
+    if arr.dtype.kind == "f":
+        return [
+            "null" if v != v or v in (math.inf, -math.inf) else repr(v)
+            for v in arr.tolist()
+        ]
+    values = values.tolist() if hasattr(values, "tolist") else list(values)
+    # pandas.NA / NaT and other missing markers compare unequal to themselves or
+    # are not JSON-serialisable; normalise them to None first
+    return [_encode_value(None if _is_missing(v) else v) for v in values]
+
+
+def _is_missing(v):
+    if v is None:
+        return True
+    try:
+        return bool(v != v)
+    except (TypeError, ValueError):
+        return False
+
+
+def _encode_coords(values, precision):
+    rounded = np.round(np.asarray(values, dtype=np.float64), precision)
+    return [repr(v) for v in rounded.tolist()]
+
+
+def iter_point_features(lon, lat, properties=None, precision=DEFAULT_PRECISION):
+    """Yield one GeoJSON Feature string per point."""
+    properties = properties or {}
+    keys = [encode_basestring(str(k)) + ":" for k in properties]
+    columns = [encode_column(col) for col in properties.values()]
+    xs = _encode_coords(lon, precision)
+    ys = _encode_coords(lat, precision)
+    for n, (x, y) in enumerate(zip(xs, ys, strict=True)):
+        props = ",".join(k + col[n] for k, col in zip(keys, columns, strict=True))
+        if x == "nan" or y == "nan":
+            geometry = "null"
+        else:
+            geometry = '{"type":"Point","coordinates":[' + x + "," + y + "]}"
+        yield '{"type":"Feature","properties":{' + props + '},"geometry":' + geometry + "}"
+
+
+def _chunks(iterable, size=None):
+    size = size or CHUNK_SIZE
+    chunk = []
+    for item in iterable:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def write_points(
+    fh, lon, lat, properties=None, precision=DEFAULT_PRECISION, ndjson=False
+):
+    """Write points to the text stream ``fh`` as a FeatureCollection or NDJSON."""
+    features = iter_point_features(lon, lat, properties, precision)
+    if ndjson:
+        for chunk in _chunks(features):
+            fh.write("\n".join(chunk))
+            fh.write("\n")
+        return
+    fh.write('{"type":"FeatureCollection","features":[\n')
+    first = True
+    for chunk in _chunks(features):
+        if not first:
+            fh.write(",\n")
+        fh.write(",\n".join(chunk))
+        first = False
+    fh.write("\n]}\n")
+
+
+def dumps_points(lon, lat, properties=None, precision=DEFAULT_PRECISION):
+    """Return a FeatureCollection string (e.g. for embedding in HTML)."""
+    features = ",".join(iter_point_features(lon, lat, properties, precision))
+    return '{"type":"FeatureCollection","features":[' + features + "]}"
+
+
+def gdf_columns(gdf, columns=None):
+    """(lon, lat, properties) arrays of a point GeoDataFrame in EPSG:4326."""
+    if gdf.crs is not None and gdf.crs.to_epsg() != 4326:
+        gdf = gdf.to_crs("EPSG:4326")
+    geom = gdf.geometry
+    if len(gdf) and not (geom.geom_type.dropna() == "Point").all():
+        raise ValueError("geojson_writer only writes point geometries")
+    columns = columns or [c for c in gdf.columns if c != gdf.geometry.name]
+    return geom.x.to_numpy(), geom.y.to_numpy(), {c: gdf[c].to_numpy() for c in columns}
+
+
+def write_points_gdf(
+    gdf, path: Path, precision=DEFAULT_PRECISION, ndjson=None, columns=None
+):
+    """Write a point GeoDataFrame to ``path``; NDJSON when the suffix asks for it."""
+    path = Path(path)
+    if ndjson is None:
+        ndjson = path.suffix.lower() in NDJSON_SUFFIXES
+    lon, lat, properties = gdf_columns(gdf, columns)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf8", newline="\n") as fh:
+            write_points(fh, lon, lat, properties, precision, ndjson)
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.unlink(tmp)
+        raise
+    return path
+
+
+def read_points(path: Path):
+    """Read a point GeoJSON/NDJSON file into ``(lon, lat, properties)`` columns."""
+    path = Path(path)
+    with open(path, "r", encoding="utf8") as fh:
+        if path.suffix.lower() in NDJSON_SUFFIXES:
+            features = [json.loads(line) for line in fh if line.strip()]
+        else:
+            features = json.load(fh).get("features", [])
+    lon = np.full(len(features), np.nan)
+    lat = np.full(len(features), np.nan)
+    properties = {}
+    for n, feature in enumerate(features):
+        geometry = feature.get("geometry") or {}
+        if geometry.get("type") == "Point":
+            lon[n], lat[n] = geometry["coordinates"][:2]
+        for key, value in (feature.get("properties") or {}).items():
+            properties.setdefault(key, [None] * len(features))[n] = value
+    return lon, lat, properties
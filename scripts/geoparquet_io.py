@@ -0,0 +1,109 @@
+"""
+GeoParquet read/write for locality frames.
+
+Files are written with zstd compression and rows ordered along a Hilbert curve,
+so each row group covers a compact area; together with the per-row bbox covering
+column (GeoParquet 1.1) readers can skip whole row groups with ``bbox=`` and load
+only the ``columns=`` they need:
+
+    gdf = read_geoparquet("nc_localities.parquet", columns=["final_name", "geometry"],
+                          bbox=(-79.2, 35.6, -78.5, 36.1))
+
+The same format backs the OSM snapshots (``osm_snapshot``). Dict-valued columns
+such as ``tags`` are stored as JSON strings and decoded on read.
+
+Requires pyarrow; ``available()`` reports whether it is installed.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+import tempfile
+from pathlib import Path
+
+try:
+    import geopandas as gpd
+except ImportError:
+    gpd = None
+
+try:
+    import pyarrow  # noqa: F401
+except ImportError:
+    pyarrow = None
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_COMPRESSION = "zstd"
+DEFAULT_ROW_GROUP_SIZE = 50_000
+JSON_COLUMNS = ("tags",)
+
+
+def available() -> bool:
+    return pyarrow is not None and gpd is not None
+
+
+def _require_pyarrow():
+    if not available():
+        raise ImportError("pyarrow is required for GeoParquet (pip install pyarrow)")
+
+
+def spatially_sorted(gdf):
+    """Return ``gdf`` ordered by the Hilbert distance of its geometries."""
+    if len(gdf) < 2:
+        return gdf.reset_index(drop=True)
+    key = gdf.geometry.hilbert_distance()
+    return gdf.iloc[key.argsort(kind="stable").to_numpy()].reset_index(drop=True)
+
+
+def write_geoparquet(
+    gdf,
+    path: Path,
+    compression=DEFAULT_COMPRESSION,
+    row_group_size=DEFAULT_ROW_GROUP_SIZE,
+    sort=True,
+):
+    """Write ``gdf`` as GeoParquet (atomically replacing ``path``)."""
+    _require_pyarrow()
+    path = Path(path)
+    out = spatially_sorted(gdf) if sort else gdf.reset_index(drop=True)
+    json_cols = [c for c in JSON_COLUMNS if c in out.columns]
+    if json_cols:
+        out = out.copy()
+        for col in json_cols:
+            out[col] = [None if v is None else json.dumps(v) for v in out[col]]
+
+    fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".parquet.tmp")
+    os.close(fd)
+    try:
+        out.to_parquet(
+            tmp,
+            index=False,
+            compression=compression,
+            row_group_size=row_group_size,
+            write_covering_bbox=True,
+        )
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.unlink(tmp)
+        raise
+
+
+def read_geoparquet(path: Path, columns=None, bbox=None):
+    """Read a GeoParquet file written by ``write_geoparquet``.
+
+    ``columns`` limits the columns loaded (the geometry column is always kept);
+    ``bbox`` as ``(minx, miny, maxx, maxy)`` skips row groups outside it.
+    """
+    _require_pyarrow()
+    if columns is not None and "geometry" not in columns:
+        columns = [*columns, "geometry"]
+    gdf = gpd.read_parquet(path, columns=columns, bbox=bbox)
+    if "bbox" in gdf.columns:
+        gdf = gdf.drop(columns="bbox")
+    for col in JSON_COLUMNS:
+        if col in gdf.columns:
+            gdf[col] = [json.loads(v) if isinstance(v, str) else None for v in gdf[col]]
+    return gdf
@@ -0,0 +1,403 @@
+"""
+Content-addressed on-disk cache for the pipeline's HTTP fetches (Nominatim, Overpass, TIGER).
+
+Each response is stored under a key derived from the request itself (method, URL,
+query parameters, body and an optional discriminator such as the TIGER year):
+
+    <cache-dir>/<key><suffix>   response body (suffix taken from the URL, e.g. ``.zip``)
+    <cache-dir>/<key>.meta.json metadata: url, status, ETag/Last-Modified, stored_at
+    <cache-dir>/<key><suffix>.* side files derived from the body (e.g. the census
+                                join's ``.census-bands.npz``)
+
+Fresh entries (younger than their TTL) are served without touching the network.
+Stale entries are revalidated with ``If-None-Match``/``If-Modified-Since`` so an
+unchanged resource costs a single 304. The total size of the bodies and their
+side files is bounded; the least recently used entries (with their side files) are evicted
+first, and files no entry owns go before them. Entries touched shortly before
+or during the current fetch (``IN_USE_GRACE``) may still be read by another
+thread or process and are never evicted. In offline mode every request must be
+answered from the cache, regardless of age.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from urllib.parse import urlencode, urlparse
+
+try:
+    from tqdm import tqdm
+except ImportError:
+    # Fallback if tqdm is not installed
+    def tqdm(iterable=None, **kwargs):
+        class _NoBar:
+            def update(self, n):
+                pass
+
+            def __enter__(self):
+                return self
+
+            def __exit__(self, *exc):
+                return False
+
+        return _NoBar() if iterable is None else iterable
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_BYTES = 2 * 1024**3  # 2 GiB
+DEFAULT_TTL = 24 * 3600  # seconds
+CHUNK_SIZE = 1024 * 1024
+META_SUFFIX = ".meta.json"
+# seconds before a fetch during which touched entries count as in use
+IN_USE_GRACE = 60.0
+# downloads and metadata being written; never counted or evicted
+_IN_PROGRESS_SUFFIXES = (".part", ".tmp")
+
+
+class CacheMiss(RuntimeError):
+    """Raised in offline mode when a request has no cached response."""
+
+
+@dataclass
+class CacheEntry:
+    key: str
+    path: Path
+    url: str
+    status: int = 200
+    etag: str | None = None
+    last_modified: str | None = None
+    stored_at: float = 0.0
+    headers: dict = field(default_factory=dict)
+    from_cache: bool = False
+
+    def is_fresh(self, ttl: float | None) -> bool:
+        if ttl is None:
+            return True
+        return (time.time() - self.stored_at) < ttl
+
+    def read_bytes(self) -> bytes:
+        return self.path.read_bytes()
+
+    def json(self):
+        with open(self.path, "rb") as fh:
+            return json.load(fh)
+
+    def to_meta(self) -> dict:
+        return {
+            "key": self.key,
+            "body": self.path.name,
+            "url": self.url,
+            "status": self.status,
+            "etag": self.etag,
+            "last_modified": self.last_modified,
+            "stored_at": self.stored_at,
+            "headers": self.headers,
+        }
+
+
+class ResponseCache:
+    """Persistent, size-bounded HTTP response cache shared by the fetch functions."""
+
+    def __init__(
+        self,
+        cache_dir: Path,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        default_ttl: float | None = DEFAULT_TTL,
+        offline: bool = False,
+    ):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.default_ttl = default_ttl
+        self.offline = offline
+
+    @staticmethod
+    def key_for(method, url, params=None, data=None, extra=None) -> str:
+        h = hashlib.sha256()
+        h.update(method.upper().encode("utf8"))
+        h.update(b"\0" + url.encode("utf8"))
+        if params:
+            h.update(b"\0" + urlencode(sorted(dict(params).items())).encode("utf8"))
+        if data:
+            h.update(
+                b"\0" + (data if isinstance(data, bytes) else str(data).encode("utf8"))
+            )
+        if extra is not None:
+            h.update(b"\0" + str(extra).encode("utf8"))
+        return h.hexdigest()
+
+    def _meta_path(self, key: str) -> Path:
+        return self.cache_dir / f"{key}{META_SUFFIX}"
+
+    def get(self, key: str) -> CacheEntry | None:
+        """Return the stored entry for ``key`` or None if absent/corrupt."""
+        meta_path = self._meta_path(key)
+        try:
+            with open(meta_path, "r", encoding="utf8") as fh:
+                meta = json.load(fh)
+        except (OSError, ValueError):
+            return None
+        body = self.cache_dir / meta.get("body", "")
+        if not body.is_file():
+            return None
+        return CacheEntry(
+            key=key,
+            path=body,
+            url=meta.get("url", ""),
+            status=meta.get("status", 200),
+            etag=meta.get("etag"),
+            last_modified=meta.get("last_modified"),
+            stored_at=meta.get("stored_at", 0.0),
+            headers=meta.get("headers", {}),
+            from_cache=True,
+        )
+
+    def has(self, method, url, params=None, data=None, extra=None) -> bool:
+        return self.get(self.key_for(method, url, params, data, extra)) is not None
+
+    def _write_meta(self, entry: CacheEntry):
+        meta_path = self._meta_path(entry.key)
+        fd, tmp = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf8") as fh:
+            json.dump(entry.to_meta(), fh)
+        os.replace(tmp, meta_path)
+
+    def _touch(self, entry: CacheEntry):
+        # The metadata mtime doubles as the LRU access time
+        try:
+            os.utime(self._meta_path(entry.key))
+        except OSError:
+            pass
+
+    def fetch(
+        self,
+        session,
+        method,
+        url,
+        *,
+        params=None,
+        data=None,
+        key_extra=None,
+        ttl=None,
+        timeout=60,
+        progress_desc=None,
+    ) -> CacheEntry:
+        """Return the response for a request, from the cache when possible.
+
+        Raises CacheMiss in offline mode when nothing is cached, and the usual
+        ``requests`` exceptions for network/HTTP errors otherwise.
+        """
+        started = time.time()
+        key, entry, headers = self._lookup(method, url, params, data, key_extra, ttl)
+        if headers is None:
+            return entry
+
+        resp = session.request(
+            method,
+            url,
+            params=params,
+            data=data,
+            headers=headers,
+            stream=True,
+            timeout=timeout,
+        )
+        try:
+            if resp.status_code == 304 and entry is not None:
+                return self._revalidated(entry)
+            resp.raise_for_status()
+            new_entry = self._store(key, url, resp, progress_desc)
+        finally:
+            resp.close()
+
+        self.evict(since=started)
+        return new_entry
+
+    async def fetch_async(
+        self,
+        fetcher,
+        method,
+        url,
+        *,
+        params=None,
+        data=None,
+        key_extra=None,
+        ttl=None,
+        timeout=60,
+    ) -> CacheEntry:
+        """``fetch`` for an ``async_fetch.AsyncFetcher``: the body is streamed
+        straight into the cache directory."""
+        started = time.time()
+        key, entry, headers = self._lookup(method, url, params, data, key_extra, ttl)
+        if headers is None:
+            return entry
+
+        fd, tmp = tempfile.mkstemp(dir=self.cache_dir, suffix=".part")
+        os.close(fd)
+        try:
+            status, resp_headers = await fetcher.download(
+                method,
+                url,
+                Path(tmp),
+                params=params,
+                data=data,
+                headers=headers,
+                timeout=timeout,
+            )
+            if status == 304 and entry is not None:
+                os.remove(tmp)
+                return self._revalidated(entry)
+            new_entry = self._commit(key, url, tmp, status, resp_headers)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+
+        self.evict(since=started)
+        return new_entry
+
+    def _lookup(self, method, url, params, data, key_extra, ttl):
+        """Return ``(key, entry, headers)``; ``headers`` (the conditional request
+        headers) is None when ``entry`` can be served as is."""
+        key = self.key_for(method, url, params, data, key_extra)
+        ttl = self.default_ttl if ttl is None else ttl
+        entry = self.get(key)
+
+        if entry is not None and (self.offline or entry.is_fresh(ttl)):
+            logger.info(f"Cache hit for {url} ({entry.path.stat().st_size} bytes)")
+            self._touch(entry)
+            return key, entry, None
+        if self.offline:
+            raise CacheMiss(f"No cached response for {method} {url} (offline mode)")
+
+        headers = {}
+        if entry is not None:
+            if entry.etag:
+                headers["If-None-Match"] = entry.etag
+            if entry.last_modified:
+                headers["If-Modified-Since"] = entry.last_modified
+        return key, entry, headers
+
+    def _revalidated(self, entry: CacheEntry) -> CacheEntry:
+        logger.info(f"Cache revalidated for {entry.url} (304 Not Modified)")
+        entry.stored_at = time.time()
+        self._write_meta(entry)
+        return entry
+
+    def _store(self, key, url, resp, progress_desc=None) -> CacheEntry:
+        total_size = int(resp.headers.get("content-length", 0) or 0)
+        fd, tmp = tempfile.mkstemp(dir=self.cache_dir, suffix=".part")
+        try:
+            with os.fdopen(fd, "wb") as fh:
+                with tqdm(
+                    total=total_size,
+                    unit="B",
+                    unit_scale=True,
+                    desc=progress_desc or "Downloading",
+                    disable=progress_desc is None,
+                ) as pbar:
+                    for chunk in resp.iter_content(chunk_size=CHUNK_SIZE):
+                        fh.write(chunk)
+                        pbar.update(len(chunk))
+            return self._commit(key, url, tmp, resp.status_code, resp.headers)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+
+    def _commit(self, key, url, tmp, status, headers) -> CacheEntry:
+        """Move a downloaded body into place and write its metadata."""
+        suffix = Path(urlparse(url).path).suffix or ".body"
+        body_path = self.cache_dir / f"{key}{suffix}"
+        os.replace(tmp, body_path)
+        entry = CacheEntry(
+            key=key,
+            path=body_path,
+            url=url,
+            status=status,
+            etag=headers.get("ETag"),
+            last_modified=headers.get("Last-Modified"),
+            stored_at=time.time(),
+            headers={
+                k: v
+                for k, v in headers.items()
+                if k.lower() in ("content-type", "etag", "last-modified")
+            },
+            from_cache=False,
+        )
+        self._write_meta(entry)
+        return entry
+
+    def _file_sizes(self):
+        """{name: bytes} of the finished files; metadata files count as 0."""
+        sizes = {}
+        for p in self.cache_dir.iterdir():
+            if not p.is_file() or p.name.endswith(_IN_PROGRESS_SUFFIXES):
+                continue
+            try:
+                # bodies and side files count; the small metadata files do not
+                sizes[p.name] = 0 if p.name.endswith(META_SUFFIX) else p.stat().st_size
+            except OSError:
+                sizes[p.name] = 0
+        return sizes
+
+    def _eviction_candidates(self, sizes, cutoff):
+        """``(accessed, size, url or None, names)`` of everything that may be
+        evicted, oldest first: entries last accessed before ``cutoff``, preceded
+        by files no entry owns (an old layout, a body whose metadata is gone)."""
+        unowned = dict(sizes)
+        candidates = []
+        for name in [n for n in sizes if n.endswith(META_SUFFIX)]:
+            entry = self.get(name[: -len(META_SUFFIX)])
+            if entry is None:
+                continue
+            try:
+                accessed = (self.cache_dir / name).stat().st_mtime
+            except OSError:
+                continue
+            members = [n for n in unowned if n == name or n.startswith(entry.path.name)]
+            for n in members:
+                del unowned[n]
+            if accessed < cutoff:
+                size = sum(sizes[n] for n in members)
+                candidates.append((accessed, size, entry.url, members))
+        candidates.extend(
+            (float("-inf"), size, None, [n]) for n, size in unowned.items()
+        )
+        return sorted(candidates, key=lambda c: c[0])
+
+    def evict(self, since=None):
+        """Drop least recently used entries until bodies and side files fit max_bytes.
+
+        Entries accessed less than ``IN_USE_GRACE`` seconds before ``since``
+        (the start of the calling fetch; default now) or later are kept, even
+        if the directory then stays over the bound.
+        """
+        cutoff = (time.time() if since is None else since) - IN_USE_GRACE
+        sizes = self._file_sizes()
+        total = sum(sizes.values())
+        if total <= self.max_bytes:
+            return
+
+        for _, size, url, members in self._eviction_candidates(sizes, cutoff):
+            if total <= self.max_bytes:
+                break
+            if url is not None:
+                logger.info(f"Evicting cached response for {url} ({size} bytes)")
+            for n in members:
+                try:
+                    (self.cache_dir / n).unlink()
+                except OSError:
+                    pass
+            total -= size
+        if total > self.max_bytes:
+            logger.warning(
+                f"Response cache holds {total} bytes, over its {self.max_bytes} byte bound; "
+                "the remaining entries are in use"
+            )
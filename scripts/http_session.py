@@ -0,0 +1,599 @@
+"""
+Shared, rate-limited HTTP sessions for the pipeline's fetches.
+
+Every session returned by ``get_session`` sends through one connection pool per
+process, so connections to Nominatim, Overpass and the Census server are reused
+across fetch functions and threads. Each retry policy (``total_retries`` and
+``status_forcelist``) gets one session; all of them share the pool and the
+limiters.
+
+Requests pass through a per-host limiter before they are sent:
+
+- a token bucket (``HOST_LIMITS``; e.g. Nominatim's usage policy allows one
+  request per second);
+- a shared "not before" time: a ``Retry-After`` from the server (or the backoff
+  after a 429/503) holds back every thread talking to that host, not only the
+  one that got the response;
+- for Overpass, the slot information of ``<api>/status``: concurrent queries are
+  capped at the server's ``Rate limit`` and, when no slot is free, requests wait
+  until the time the server announces.
+
+Status retries are done here rather than by urllib3, so that each attempt goes
+through the limiter again; urllib3 only retries connection errors.
+
+The limiters belong to the process. Batch workers (``--states``) must not each
+get their own budget, so ``run_batch`` starts them inside ``shared_limits()``:
+rate limits, back-offs and Overpass slot claims then live in small JSON files
+updated under ``flock`` in a directory named by ``NC_LOCALITIES_LIMITS_DIR``.
+Setting that variable by hand makes separate runs share the limits as well.
+Without ``fcntl`` (Windows) the limits stay per process.
+"""
+
+from __future__ import annotations
+
+import email.utils
+import hashlib
+import json
+import logging
+import os
+import re
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+from urllib.parse import urlsplit
+
+try:
+    import fcntl
+except ImportError:  # Windows: limits are per process
+    fcntl = None
+
+try:
+    import requests
+    from requests.adapters import HTTPAdapter
+    from urllib3.util.retry import Retry
+except ImportError:
+    requests = None
+    HTTPAdapter = object
+    Retry = None
+
+logger = logging.getLogger(__name__)
+
+# Connections kept per host; at least the largest worker pool talking to one host
+# (tile workers, census year probes)
+POOL_MAXSIZE = 32
+# Hosts with pooled connections (Nominatim, Overpass, Census, a stand-in, ...)
+POOL_CONNECTIONS = 8
+# host -> token bucket (requests per second, burst)
+HOST_LIMITS = {
+    "nominatim.openstreetmap.org": (1.0, 1),
+    "www2.census.gov": (10.0, 10),
+}
+RETRY_METHODS = frozenset(["HEAD", "GET", "POST", "OPTIONS"])
+BACKOFF_FACTOR = 1.0
+MAX_BACKOFF = 120.0
+# statuses whose retry delay applies to every request to the host
+THROTTLE_STATUSES = (429, 503)
+MIN_SLOT_WAIT = 0.25  # seconds between status polls while no slot is free
+# seconds a query we have finished reading may still be listed as running
+RELEASE_GRACE = 1.0
+# directory holding limiter state shared by processes (see shared_limits)
+SHARED_DIR_ENV = "NC_LOCALITIES_LIMITS_DIR"
+
+
+class LocalState:
+    """Limiter state of one process: a dict updated under a thread lock."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._state = {}
+
+    @contextmanager
+    def locked(self):
+        with self._lock:
+            yield
+
+    def update(self, fn):
+        """``fn(state)`` with the state locked; returns its result."""
+        with self._lock:
+            return fn(self._state)
+
+
+class SharedState(LocalState):
+    """Limiter state shared by every process using the same ``path``: a JSON
+    document read and rewritten under an exclusive ``flock``."""
+
+    def __init__(self, path: Path):
+        super().__init__()
+        self.path = Path(path)
+        self._lock_path = self.path.with_suffix(".lock")
+
+    @contextmanager
+    def locked(self):
+        # a fresh descriptor per call, so threads of one process exclude each other too
+        with open(self._lock_path, "a") as fh:
+            fcntl.flock(fh, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(fh, fcntl.LOCK_UN)
+
+    def update(self, fn):
+        with self.locked():
+            try:
+                state = json.loads(self.path.read_text(encoding="utf8"))
+            except (OSError, ValueError):
+                state = {}
+            result = fn(state)
+            self.path.write_text(json.dumps(state), encoding="utf8")
+            return result
+
+
+def shared_dir() -> Path | None:
+    """Directory of the limiter state shared across processes, if any."""
+    path = os.environ.get(SHARED_DIR_ENV)
+    if not path or fcntl is None:
+        return None
+    return Path(path)
+
+
+@contextmanager
+def shared_limits():
+    """Share the per-host limits with child processes started inside the block.
+
+    Workers inherit ``SHARED_DIR_ENV``; an outer value (e.g. set by the user to
+    coordinate several runs) is kept.
+    """
+    if os.environ.get(SHARED_DIR_ENV) or fcntl is None:
+        yield
+        return
+    with tempfile.TemporaryDirectory(prefix="nc-localities-limits-") as path:
+        os.environ[SHARED_DIR_ENV] = path
+        try:
+            yield
+        finally:
+            del os.environ[SHARED_DIR_ENV]
+
+
+class HostLimiter:
+    """Rate limit, concurrency cap and shared back-off for one host.
+
+    The rate is enforced as a token bucket in its virtual-scheduling form: the
+    state is one "theoretical arrival time", which fits in a ``SharedState``
+    when processes must share the limit. The concurrency cap is per process.
+    """
+
+    def __init__(self, rate=None, burst=1, max_concurrent=None, state=None):
+        self.rate = rate
+        self.burst = max(1, burst)
+        self.max_concurrent = max_concurrent
+        self._state = state or LocalState()
+        self._in_flight = 0
+        self._cond = threading.Condition()
+
+    def defer(self, seconds):
+        """Hold back every request to this host for ``seconds``."""
+
+        def push(state):
+            state["not_before"] = max(
+                state.get("not_before", 0.0), time.time() + seconds
+            )
+
+        self._state.update(push)
+
+    def _take(self, state):
+        now = time.time()
+        not_before = state.get("not_before", 0.0)
+        if now < not_before:
+            return not_before - now
+        if not self.rate:
+            return 0.0
+        interval = 1.0 / self.rate
+        tat = max(state.get("tat", 0.0), now)
+        delay = tat - now - (self.burst - 1) * interval
+        if delay > 0:
+            return delay
+        state["tat"] = tat + interval
+        return 0.0
+
+    def reserve(self) -> float:
+        """Take the right to send one request now (returns 0), or return the
+        seconds to wait before asking again."""
+        return self._state.update(self._take)
+
+    def wait(self):
+        """Block until a request may start (back-off over, token available)."""
+        while True:
+            delay = self.reserve()
+            if delay <= 0:
+                return
+            time.sleep(delay)
+
+    def before_request(self):
+        """Hook for limiters that consult the server before each request."""
+
+    def after_request(self):
+        """Called once the response body of a request has been read (or it failed)."""
+
+    def __enter__(self):
+        with self._cond:
+            while self.max_concurrent and self._in_flight >= self.max_concurrent:
+                self._cond.wait()
+            self._in_flight += 1
+        return self
+
+    def __exit__(self, *exc):
+        with self._cond:
+            self._in_flight -= 1
+            self._cond.notify()
+        return False
+
+
+def parse_overpass_status(text):
+    """``(rate_limit, free_now, seconds_until_next_free, running)`` from ``/api/status``.
+
+    ``rate_limit`` 0 means unlimited, and then ``free_now`` is None;
+    ``seconds_until_next_free`` is None when no busy slot announces a time;
+    ``running`` counts this client's queries the server is processing.
+    """
+    match = re.search(r"^Rate limit:\s*(\d+)", text, re.M)
+    rate_limit = int(match.group(1)) if match else 0
+    match = re.search(r"^(\d+) slots? available now", text, re.M)
+    free_now = (int(match.group(1)) if match else 0) if rate_limit else None
+    waits = [
+        int(s)
+        for s in re.findall(
+            r"^Slot available after: .*?, in (-?\d+) seconds?", text, re.M
+        )
+    ]
+    _, _, queries = text.partition("Currently running queries")
+    running = len(re.findall(r"^\d+\t", queries, re.M))
+    return rate_limit, free_now, (max(0, min(waits)) if waits else None), running
+
+
+class OverpassLimiter(HostLimiter):
+    """Limiter fed by the slot information of an Overpass instance's ``/api/status``.
+
+    Concurrent queries are capped at the server's rate limit, and each query
+    reads the status page before it is sent: it goes ahead when a slot is free
+    after discounting the queries that are in flight but not yet listed as
+    running; otherwise it sleeps until the announced time. Queries finished
+    within ``RELEASE_GRACE`` may still be listed, so they do not count as in
+    flight ones seen by the server. Status reads are serialised (across
+    processes, with a ``SharedState``), so two queries never claim the same
+    free slot.
+    """
+
+    def __init__(self, status_url, session, rate=None, burst=1, state=None, gate=None):
+        super().__init__(rate, burst, state=state)
+        self.status_url = status_url
+        self.session = session
+        # held while reading the status and claiming a slot
+        self.gate = gate or LocalState()
+
+    def refresh(self):
+        """Read ``/api/status``; returns ``parse_overpass_status``'s tuple, or None."""
+        try:
+            resp = self.session.get(self.status_url, timeout=15)
+            resp.raise_for_status()
+        except requests.RequestException as e:
+            logger.debug(f"Overpass status unavailable ({e}); not limiting by slots")
+            return None
+        return self.update_status(resp.text)
+
+    def update_status(self, text):
+        """Apply a status page's rate limit; returns ``parse_overpass_status(text)``."""
+        status = parse_overpass_status(text)
+        rate_limit = status[0]
+        with self._cond:
+            if rate_limit and rate_limit != self.max_concurrent:
+                logger.info(
+                    f"Overpass allows {rate_limit} concurrent queries from this address"
+                )
+            self.max_concurrent = rate_limit or None
+            self._cond.notify_all()
+        return status
+
+    def claim(self, status):
+        """Claim a slot given a fresh ``status`` (call with ``gate`` locked).
+
+        Returns 0 when the query may be sent, else the seconds to wait before
+        reading the status again.
+        """
+        if status is None or status[1] is None:
+            return 0.0
+        _, free_now, wait, running = status
+
+        def take(state):
+            now = time.time()
+            sending = _live_counts(state.get("sending", {}))
+            finished = [t for t in state.get("finished", []) if now - t < RELEASE_GRACE]
+            state["finished"] = finished
+            seen = max(0, running - len(finished))
+            if free_now - max(0, sum(sending.values()) - seen) <= 0:
+                return False
+            pid = str(os.getpid())
+            sending[pid] = sending.get(pid, 0) + 1
+            state["sending"] = sending
+            return True
+
+        if self._state.update(take):
+            return 0.0
+        return max(MIN_SLOT_WAIT, wait if wait is not None else BACKOFF_FACTOR)
+
+    def before_request(self):
+        # called with this query's concurrency slot held
+        with self.gate.locked():
+            while True:
+                wait = self.claim(self.refresh())
+                if not wait:
+                    return
+                logger.info(f"No Overpass slot free; waiting {wait:.0f}s")
+                time.sleep(wait)
+
+    def after_request(self):
+        def release(state):
+            sending = _live_counts(state.get("sending", {}))
+            pid = str(os.getpid())
+            if sending.get(pid):
+                sending[pid] -= 1
+            state["sending"] = sending
+            state.setdefault("finished", []).append(time.time())
+
+        self._state.update(release)
+
+
+def _live_counts(counts):
+    """Per-pid counts without the entries of processes that have exited.
+
+    Only other processes are probed, and only where counts are shared between
+    processes (POSIX): on Windows ``os.kill(pid, 0)`` terminates the process.
+    """
+    own = str(os.getpid())
+    return {
+        pid: n
+        for pid, n in counts.items()
+        if n and (pid == own or fcntl is None or _alive(int(pid)))
+    }
+
+
+def _alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except OSError:
+        pass  # exists, but not ours to signal
+    return True
+
+
+def retry_after_seconds(resp):
+    """Seconds asked for by a ``Retry-After`` header (delta or HTTP date), or None."""
+    value = resp.headers.get("Retry-After")
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        when = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+
+
+class Limits:
+    """The per-host limiters of a process; ``status_session`` (not itself limited)
+    reads the Overpass slot information. When ``shared_dir()`` is set, the rate
+    limits, back-offs and Overpass slot claims are shared with the other
+    processes using that directory."""
+
+    def __init__(self, status_session):
+        self.status_session = status_session
+        self.shared_dir = shared_dir()
+        self._lock = threading.Lock()
+        self._hosts = {}
+        self._overpass = {}
+
+    def _state(self, name):
+        if self.shared_dir is None:
+            return None
+        digest = hashlib.sha256(name.encode("utf8")).hexdigest()[:16]
+        return SharedState(self.shared_dir / f"{digest}.json")
+
+    def watch_overpass(self, interpreter_url):
+        """Limit requests under ``interpreter_url``'s API by its ``/status`` slots."""
+        base = interpreter_url.rsplit("/", 1)[0]
+        with self._lock:
+            if base not in self._overpass:
+                self._overpass[base] = OverpassLimiter(
+                    base + "/status",
+                    self.status_session,
+                    state=self._state(base),
+                    gate=self._state(base + "/status"),
+                )
+
+    def for_url(self, url) -> HostLimiter:
+        with self._lock:
+            for base, limiter in self._overpass.items():
+                if url.startswith(base + "/"):
+                    return limiter
+            host = urlsplit(url).netloc.lower()
+            limiter = self._hosts.get(host)
+            if limiter is None:
+                rate, burst = HOST_LIMITS.get(host.split(":")[0], (None, 1))
+                limiter = self._hosts[host] = HostLimiter(
+                    rate, burst, state=self._state(host)
+                )
+            return limiter
+
+
+def _call_when_read(resp, callback):
+    """Call ``callback`` once, when the body of ``resp`` has been read or closed."""
+    raw = resp.raw
+    release_conn = raw.release_conn
+    done = []
+
+    def release():
+        if not done:
+            done.append(True)
+            callback()
+        release_conn()
+
+    raw.release_conn = release
+
+
+class LimitedAdapter(HTTPAdapter):
+    """HTTPAdapter on a shared pool manager that waits for the host's limiter and
+    retries ``status_forcelist`` responses itself."""
+
+    def __init__(self, limits: Limits, total_retries=5, status_forcelist=()):
+        self.total_retries = total_retries
+        self.status_forcelist = frozenset(status_forcelist)
+        self.limits = limits
+        # connection errors only; statuses are retried in send()
+        super().__init__(
+            max_retries=Retry(
+                total=total_retries,
+                status=0,
+                backoff_factor=BACKOFF_FACTOR,
+                allowed_methods=RETRY_METHODS,
+                raise_on_status=False,
+            ),
+        )
+
+    def send(self, request, **kwargs):
+        limiter = self.limits.for_url(request.url)
+        attempt = 0
+        while True:
+            with limiter:
+                limiter.before_request()
+                try:
+                    limiter.wait()
+                    resp = super().send(request, **kwargs)
+                except BaseException:
+                    limiter.after_request()
+                    raise
+            _call_when_read(resp, limiter.after_request)
+            if (
+                resp.status_code not in self.status_forcelist
+                or attempt >= self.total_retries
+                or request.method not in RETRY_METHODS
+            ):
+                return resp
+            delay = retry_after_seconds(resp)
+            if delay is None:
+                delay = min(MAX_BACKOFF, BACKOFF_FACTOR * 2**attempt)
+            attempt += 1
+            logger.info(
+                f"{request.method} {request.url.split('?')[0]} returned {resp.status_code}; "
+                f"retry {attempt}/{self.total_retries} in {delay:.0f}s"
+            )
+            resp.close()
+            if resp.status_code in THROTTLE_STATUSES:
+                limiter.defer(delay)  # everyone waits, not just this thread
+            else:
+                time.sleep(delay)
+
+
+_lock = threading.Lock()
+_pool = None  # the adapter owning the process's connection pool
+_limits = None
+_sessions = {}
+
+
+def _shared_adapter(adapter):
+    adapter.poolmanager = _pool.poolmanager
+    return adapter
+
+
+def _ensure_pool(headers=None):
+    """Create the process's pool and limiters (once); call with ``_lock`` held.
+
+    ``headers`` (e.g. the pipeline's User-Agent) are also sent with the Overpass
+    status reads.
+    """
+    global _pool, _limits
+    if _pool is None:
+        _pool = HTTPAdapter(
+            pool_connections=POOL_CONNECTIONS, pool_maxsize=POOL_MAXSIZE
+        )
+        status_session = requests.Session()
+        status_session.mount("https://", _shared_adapter(HTTPAdapter(max_retries=1)))
+        status_session.mount("http://", status_session.get_adapter("https://"))
+        _limits = Limits(status_session)
+    if headers:
+        _limits.status_session.headers.update(headers)
+
+
+def get_session(
+    total_retries=5, status_forcelist=(429, 500, 502, 503, 504), headers=None, hooks=()
+):
+    """The process's session for this retry policy, headers and response hooks
+    (created on first use)."""
+    headers = dict(headers or {})
+    hooks = tuple(hooks)
+    key = (
+        total_retries,
+        tuple(status_forcelist),
+        tuple(sorted(headers.items())),
+        hooks,
+    )
+    with _lock:
+        session = _sessions.get(key)
+        if session is not None:
+            return session
+        _ensure_pool(headers)
+        adapter = _shared_adapter(
+            LimitedAdapter(_limits, total_retries, status_forcelist)
+        )
+        session = requests.Session()
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        session.headers.update(headers)
+        session.hooks["response"].extend(hooks)
+        _sessions[key] = session
+        return session
+
+
+def watch_overpass(interpreter_url):
+    """Make requests to this Overpass instance wait for free slots."""
+    with _lock:
+        _ensure_pool()
+        limits = _limits
+    limits.watch_overpass(interpreter_url)
+
+
+def limiter_for(url) -> HostLimiter:
+    with _lock:
+        _ensure_pool()
+        limits = _limits
+    return limits.for_url(url)
+
+
+def reset():
+    """Close the pooled connections and forget sessions and limiters."""
+    global _pool, _limits
+    with _lock:
+        _sessions.clear()
+        if _pool is not None:
+            _pool.close()
+        _pool = None
+        _limits = None
+
+
+def _forget_after_fork():
+    # a forked batch worker must not share the parent's sockets or locks
+    global _lock, _pool, _limits, _sessions
+    _lock = threading.Lock()
+    _pool = None
+    _limits = None
+    _sessions = {}
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_forget_after_fork)
@@ -0,0 +1,135 @@
+"""
+Content-hashed data files for the site's map pages.
+
+The map pages load their data from a separate file instead of embedding it, so
+the data can be cached independently of the page:
+
+    data/<stem>.<hash>.json       the payload; <hash> is taken from its bytes
+    data/<stem>.<hash>.json.gz    gzip variant (level 9, no timestamp)
+    data/<stem>.<hash>.json.br    brotli variant, when ``brotli`` is installed
+
+A changed payload gets a new name, so the files can be served with
+``Cache-Control: immutable`` and the variants picked by ``gzip_static``-style
+servers. Files of the same stem with another hash are removed when a new one is
+written; an unchanged payload is not rewritten.
+"""
+
+from __future__ import annotations
+
+import gzip
+import hashlib
+import logging
+import os
+import re
+import tempfile
+from pathlib import Path
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    from scripts import build_manifest
+except ImportError:  # executed from inside ``scripts/``
+    import build_manifest
+
+logger = logging.getLogger(__name__)
+
+DATA_DIR = "data"
+HASH_LENGTH = 16
+COMPRESSED_SUFFIXES = (".gz", ".br")
+# data/<stem>.<hash>.<ext> as referenced from a page
+ASSET_REF = re.compile(r"\bdata/[\w.-]+?\.[0-9a-f]{%d}\.\w+" % HASH_LENGTH)
+
+
+def content_hash(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()[:HASH_LENGTH]
+
+
+def _write_atomic(path: Path, data: bytes):
+    fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as fh:
+            fh.write(data)
+        os.chmod(tmp, 0o644)  # served as-is; mkstemp creates 0600
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.unlink(tmp)
+        raise
+
+
+def variant_suffixes():
+    return (".gz", ".br") if brotli is not None else (".gz",)
+
+
+def compressed_variants(data: bytes):
+    """{suffix: bytes} of the precompressed variants available here."""
+    variants = {".gz": gzip.compress(data, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        variants[".br"] = brotli.compress(data, quality=11)
+    return variants
+
+
+def prune_stale(keep: Path):
+    """Remove other-hash versions (and their variants) of the hashed file ``keep``."""
+    stem, _, suffix = keep.name.rsplit(".", 2)
+    stale = re.compile(
+        r"%s\.[0-9a-f]{%d}\.%s(%s)?$"
+        % (
+            re.escape(stem),
+            HASH_LENGTH,
+            re.escape(suffix),
+            "|".join(map(re.escape, COMPRESSED_SUFFIXES)),
+        )
+    )
+    for old in keep.parent.iterdir():
+        if stale.match(old.name) and not old.name.startswith(keep.name):
+            old.unlink()
+
+
+def write_hashed(data, directory: Path, stem: str, suffix=".json") -> Path:
+    """Write ``data`` as ``<directory>/<stem>.<hash><suffix>`` plus its compressed
+    variants; returns the path of the uncompressed file."""
+    if isinstance(data, str):
+        data = data.encode("utf8")
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    path = directory / f"{stem}.{content_hash(data)}{suffix}"
+
+    if path.exists() and all(
+        path.with_name(path.name + ext).exists() for ext in variant_suffixes()
+    ):
+        logger.info(f"{path.name} is up to date")
+    else:
+        _write_atomic(path, data)
+        for ext, blob in compressed_variants(data).items():
+            _write_atomic(path.with_name(path.name + ext), blob)
+        logger.info(
+            f"Wrote {path.name} ({len(data):,} bytes) and {', '.join(variant_suffixes())} variants"
+        )
+    prune_stale(path)
+    return path
+
+
+def referenced_assets(html: str):
+    """Relative paths of the hashed data files a page refers to."""
+    return sorted(set(ASSET_REF.findall(html)))
+
+
+def copy_page(src: Path, dest: Path):
+    """Copy a map page and the hashed data files it refers to (with variants);
+    files whose bytes are unchanged are left alone."""
+    src, dest = Path(src), Path(dest)
+    build_manifest.copy_if_changed(src, dest)
+    for rel in referenced_assets(src.read_text(encoding="utf8")):
+        target = dest.parent / rel
+        for ext in ("", *COMPRESSED_SUFFIXES):
+            asset = src.parent / (rel + ext)
+            if asset.exists():
+                build_manifest.copy_if_changed(
+                    asset, target.with_name(target.name + ext)
+                )
+        prune_stale(target)
+    return dest
@@ -0,0 +1,224 @@
+"""
+Read place nodes, ways and relations from a local ``.osm.pbf`` extract.
+
+An offline alternative to the Overpass query in ``fetch_osm_places``: the output
+is the same columnar batch layout as ``overpass_stream.iter_place_batches``, so it
+feeds ``osm_places_from_batches`` unchanged.
+
+Requires pyosmium (``pip install osmium``). The file is streamed by libosmium's
+threaded PBF decoder with tag/id filters applied in C++. Place nodes and place
+ways/relations are read by two (spawned) worker processes in parallel. Way and relation
+positions follow Overpass ``out center`` (the centre of the bounding box of the
+member coordinates) and are computed in bulk with NumPy.
+"""
+
+from __future__ import annotations
+
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+
+try:
+    import osmium
+except ImportError:
+    osmium = None
+
+logger = logging.getLogger(__name__)
+
+_COLUMNS = ("osm_id", "osm_type", "lon", "lat", "name", "place", "population", "tags")
+
+
+def _require_osmium():
+    if osmium is None:
+        raise ImportError(
+            "pyosmium is required to read .osm.pbf extracts (pip install osmium)"
+        )
+
+
+def _empty_columns():
+    return {col: [] for col in _COLUMNS}
+
+
+def _append(cols, osm_id, osm_type, lon, lat, tags):
+    cols["osm_id"].append(osm_id)
+    cols["osm_type"].append(osm_type)
+    cols["lon"].append(lon)
+    cols["lat"].append(lat)
+    cols["name"].append(tags.get("name"))
+    cols["place"].append(tags.get("place"))
+    cols["population"].append(tags.get("population"))
+    cols["tags"].append(tags)
+
+
+def _to_batch(cols):
+    return {
+        "osm_id": np.asarray(cols["osm_id"], dtype=np.int64),
+        "osm_type": np.asarray(cols["osm_type"], dtype=object),
+        "lon": np.asarray(cols["lon"], dtype=np.float64),
+        "lat": np.asarray(cols["lat"], dtype=np.float64),
+        "name": np.asarray(cols["name"], dtype=object),
+        "place": np.asarray(cols["place"], dtype=object),
+        "population": np.asarray(cols["population"], dtype=object),
+        "tags": np.asarray(cols["tags"], dtype=object),
+    }
+
+
+def bbox_centers(lons, lats, offsets):
+    """Centres of the bounding boxes of consecutive coordinate groups.
+
+    Group ``i`` spans ``lons[offsets[i]:offsets[i + 1]]``; every group must be
+    non-empty.
+    """
+    lons = np.asarray(lons, dtype=np.float64)
+    lats = np.asarray(lats, dtype=np.float64)
+    starts = np.asarray(offsets[:-1], dtype=np.intp)
+    if not len(starts):
+        return np.empty(0), np.empty(0)
+    cx = (np.minimum.reduceat(lons, starts) + np.maximum.reduceat(lons, starts)) / 2
+    cy = (np.minimum.reduceat(lats, starts) + np.maximum.reduceat(lats, starts)) / 2
+    return cx, cy
+
+
+def read_place_nodes(path):
+    """Columnar batch of every node tagged ``place``."""
+    _require_osmium()
+    cols = _empty_columns()
+    processor = osmium.FileProcessor(str(path), osmium.osm.NODE).with_filter(
+        osmium.filter.KeyFilter("place")
+    )
+    for node in processor:
+        if node.location.valid():
+            _append(
+                cols,
+                node.id,
+                "node",
+                node.location.lon,
+                node.location.lat,
+                dict(node.tags),
+            )
+    return _to_batch(cols)
+
+
+def _append_centred(cols, osm_type, items):
+    """Append ``(id, tags, coords)`` items at the centres of their coordinates' bboxes."""
+    lons, lats, offsets = [], [], [0]
+    for _, _, coords in items:
+        lons.extend(c[0] for c in coords)
+        lats.extend(c[1] for c in coords)
+        offsets.append(len(lons))
+    cx, cy = bbox_centers(lons, lats, offsets)
+    for (osm_id, tags, _), x, y in zip(items, cx, cy, strict=True):
+        _append(cols, osm_id, osm_type, float(x), float(y), tags)
+
+
+def _read_place_relations(path):
+    """Pass 1: ``(relations, member_ways, place_ways)``.
+
+    ``relations`` holds ``(id, tags, way_ids, node_ids)`` per place relation,
+    ``member_ways`` the ids of their member ways and ``place_ways`` the ids of the
+    ways tagged ``place``. Way geometry is not read here.
+    """
+    relations = []
+    member_ways = set()
+    place_ways = set()
+    processor = osmium.FileProcessor(
+        str(path), osmium.osm.WAY | osmium.osm.RELATION
+    ).with_filter(osmium.filter.KeyFilter("place"))
+    for obj in processor:
+        if obj.is_way():
+            place_ways.add(obj.id)
+            continue
+        ways = [m.ref for m in obj.members if m.type == "w"]
+        nodes = [m.ref for m in obj.members if m.type == "n"]
+        relations.append((obj.id, dict(obj.tags), ways, nodes))
+        member_ways.update(ways)
+    return relations, member_ways, place_ways
+
+
+def _read_ways(path, way_ids, member_ways):
+    """Pass 2: ``(place_ways, member_coords, locations)`` for the ways in ``way_ids``.
+
+    Only those ways reach Python (the id filter runs in libosmium); nodes are
+    indexed in ``locations`` for the relations' node members but never yielded.
+    ``place_ways`` holds ``(id, tags, coords)`` of the ways tagged ``place`` and
+    ``member_coords`` the coordinates of the ways in ``member_ways``.
+    """
+    locations = osmium.index.create_map("flex_mem")
+    processor = (
+        osmium.FileProcessor(str(path), osmium.osm.NODE | osmium.osm.WAY)
+        .with_locations(locations)
+        .with_filter(osmium.filter.IdFilter([]).enable_for(osmium.osm.NODE))
+        .with_filter(osmium.filter.IdFilter(way_ids).enable_for(osmium.osm.WAY))
+    )
+    place_ways = []
+    member_coords = {}
+    for way in processor:
+        coords = [(n.lon, n.lat) for n in way.nodes if n.location.valid()]
+        if not coords:
+            continue
+        if way.id in member_ways:
+            member_coords[way.id] = coords
+        if "place" in way.tags:
+            place_ways.append((way.id, dict(way.tags), coords))
+    return place_ways, member_coords, locations
+
+
+def _relation_coords(ways, nodes, member_coords, locations):
+    coords = [c for way_id in ways for c in member_coords.get(way_id, ())]
+    for node_id in nodes:
+        try:
+            loc = locations.get(node_id)
+        except KeyError:
+            continue
+        coords.append((loc.lon, loc.lat))
+    return coords
+
+
+def read_place_areas(path):
+    """Columnar batch of every way and relation tagged ``place``, at their bbox centres."""
+    _require_osmium()
+    relations, member_ways, place_way_ids = _read_place_relations(path)
+    place_ways, member_coords, locations = _read_ways(
+        path, place_way_ids | member_ways, member_ways
+    )
+
+    placed = []
+    for rel_id, tags, ways, nodes in relations:
+        coords = _relation_coords(ways, nodes, member_coords, locations)
+        if coords:
+            placed.append((rel_id, tags, coords))
+
+    cols = _empty_columns()
+    _append_centred(cols, "way", place_ways)
+    _append_centred(cols, "relation", placed)
+    return _to_batch(cols)
+
+
+def read_pbf_places(path, parallel=True):
+    """Read all places from a PBF extract; returns one columnar batch.
+
+    With ``parallel`` nodes and ways/relations are read in two worker processes.
+    Workers are spawned rather than forked because the caller may have other
+    threads running (e.g. the concurrent TIGER download).
+    """
+    _require_osmium()
+    path = Path(path)
+    if not path.exists():
+        raise FileNotFoundError(f"OSM extract not found: {path}")
+
+    logger.info(f"Reading places from {path}...")
+    if parallel:
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=2, mp_context=context) as pool:
+            nodes_future = pool.submit(read_place_nodes, path)
+            areas_future = pool.submit(read_place_areas, path)
+            parts = [nodes_future.result(), areas_future.result()]
+    else:
+        parts = [read_place_nodes(path), read_place_areas(path)]
+
+    batch = {col: np.concatenate([p[col] for p in parts]) for col in _COLUMNS}
+    logger.info(f"Read {len(batch['osm_id'])} places from {path.name}")
+    return batch
@@ -0,0 +1,154 @@
+"""
+Persisted OSM snapshots for incremental refreshes.
+
+After a successful run the pipeline stores, per state, the OSM places it fetched,
+the census-joined rows (before de-duplication) and the Overpass database time
+those places reflect (the response's ``osm3s.timestamp_osm_base``). The next run
+asks Overpass only for places changed since that time (``newer:``) plus the ids
+of every place that still exists, and patches the snapshot:
+
+- changed or new places replace their previous rows,
+- places whose id is no longer returned are dropped,
+- only the changed rows are re-joined against the census polygons.
+
+Overpass ``newer:`` does not see a way or relation whose centre moved because one
+of its nodes moved; those are picked up on the next full refresh.
+
+Layout: ``<snapshot-dir>/<name>/{meta.json, osm.parquet, joined.parquet}`` (GeoParquet,
+see ``geoparquet_io``), or ``osm.pkl``/``joined.pkl`` pickles when pyarrow is not
+installed. ``meta.json`` records the format and is written last, so a snapshot
+without it is ignored.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+import tempfile
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+try:
+    import pandas as pd
+except ImportError:
+    pd = None
+
+try:
+    from scripts import geoparquet_io
+except ImportError:  # executed from inside ``scripts/``
+    import geoparquet_io
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_VERSION = 1
+# Margin subtracted from the local clock when a response carries no
+# timestamp_osm_base, to absorb clock skew and the server's replication lag
+CLOCK_MARGIN = timedelta(minutes=5)
+
+
+def utc_timestamp(now=None) -> str:
+    """Return an Overpass ``newer:`` timestamp for ``now`` minus a safety margin.
+
+    Only a fallback: the database time Overpass reports is the real watermark.
+    """
+    now = now or datetime.now(timezone.utc)
+    return (now - CLOCK_MARGIN).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+@dataclass
+class Snapshot:
+    timestamp: str
+    osm: object  # GeoDataFrame in fetch_osm_places layout
+    joined: object  # GeoDataFrame of census-joined rows, before dedup
+    census_signature: str
+
+
+class SnapshotStore:
+    def __init__(self, root: Path, name: str):
+        self.dir = Path(root) / name
+
+    def load(self) -> Snapshot | None:
+        try:
+            with open(self.dir / "meta.json", "r", encoding="utf8") as fh:
+                meta = json.load(fh)
+            if meta.get("version") != SNAPSHOT_VERSION:
+                logger.info("Snapshot format changed; ignoring old snapshot")
+                return None
+            if meta.get("format", "pickle") == "parquet":
+                osm = geoparquet_io.read_geoparquet(self.dir / "osm.parquet")
+                joined = geoparquet_io.read_geoparquet(self.dir / "joined.parquet")
+            else:
+                osm = pd.read_pickle(self.dir / "osm.pkl")
+                joined = pd.read_pickle(self.dir / "joined.pkl")
+        except Exception as e:
+            logger.info(f"No usable OSM snapshot in {self.dir}: {e}")
+            return None
+        return Snapshot(
+            meta["timestamp"], osm, joined, meta.get("census_signature", "")
+        )
+
+    def save(self, snapshot: Snapshot):
+        self.dir.mkdir(parents=True, exist_ok=True)
+        meta_path = self.dir / "meta.json"
+        # Invalidate first so a crash mid-save never pairs new data with old meta
+        if meta_path.exists():
+            meta_path.unlink()
+        if geoparquet_io.available():
+            fmt = "parquet"
+            geoparquet_io.write_geoparquet(snapshot.osm, self.dir / "osm.parquet")
+            geoparquet_io.write_geoparquet(snapshot.joined, self.dir / "joined.parquet")
+        else:
+            fmt = "pickle"
+            snapshot.osm.to_pickle(self.dir / "osm.pkl")
+            snapshot.joined.to_pickle(self.dir / "joined.pkl")
+        fd, tmp = tempfile.mkstemp(dir=self.dir, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf8") as fh:
+            json.dump(
+                {
+                    "version": SNAPSHOT_VERSION,
+                    "format": fmt,
+                    "timestamp": snapshot.timestamp,
+                    "census_signature": snapshot.census_signature,
+                    "rows": len(snapshot.osm),
+                },
+                fh,
+            )
+        os.replace(tmp, meta_path)
+        logger.info(f"Saved OSM snapshot ({len(snapshot.osm)} places) to {self.dir}")
+
+
+def element_keys(gdf):
+    """(osm_type, osm_id) index identifying each row's OSM element."""
+    return pd.MultiIndex.from_arrays(
+        [gdf["osm_type"].astype(str), gdf["osm_id"].astype("int64")]
+    )
+
+
+def drop_elements(gdf, keys):
+    """Return ``gdf`` without the rows whose element key is in ``keys``."""
+    if gdf is None or gdf.empty or not len(keys):
+        return gdf
+    return gdf[~element_keys(gdf).isin(keys)]
+
+
+def apply_changes(base_osm, changed_osm, current_keys):
+    """Patch a snapshot's OSM rows; returns ``(updated_osm, affected_keys)``.
+
+    ``current_keys`` is the set of (type, id) pairs that still exist upstream;
+    base rows missing from it were deleted (or lost their place tag).
+    """
+    base_keys = element_keys(base_osm)
+    changed_keys = element_keys(changed_osm)
+    deleted = base_keys[~base_keys.isin(list(current_keys))]
+    affected = changed_keys.union(deleted)
+
+    kept = drop_elements(base_osm, affected)
+    parts = [df for df in (kept, changed_osm) if not df.empty]
+    updated = pd.concat(parts, ignore_index=True) if parts else base_osm.iloc[:0]
+    logger.info(
+        f"Applied OSM changes: {len(changed_keys)} changed/new, {len(deleted)} deleted, "
+        f"{len(updated)} places total"
+    )
+    return updated, affected
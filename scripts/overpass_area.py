@@ -0,0 +1,105 @@
+"""
+Query-area helpers for Overpass: turn the Nominatim state boundary into something
+Overpass accepts, and cull points that fall outside the state.
+
+Full-resolution state boundaries have tens of thousands of vertices, which Overpass
+either rejects or evaluates very slowly. ``simplify_to_budget`` buffers the boundary
+by a tolerance and simplifies it by the same tolerance, so the result always
+contains the original, doubling the tolerance until the vertex budget is met.
+Nearby islands merge as the buffer grows, which also keeps the number of parts small.
+"""
+
+from __future__ import annotations
+
+import logging
+
+try:
+    import shapely
+    from shapely.geometry import MultiPolygon, Polygon, shape
+    from shapely.validation import make_valid
+except ImportError:
+    shapely = None
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_VERTICES = 500
+DEFAULT_MAX_PARTS = 8
+_START_TOLERANCE = 0.001  # degrees, roughly 100 m
+
+
+def polygon_parts(geom):
+    """Return the exterior-only polygons of a (multi)polygon geometry."""
+    if geom.is_empty:
+        return []
+    if isinstance(geom, Polygon):
+        return [Polygon(geom.exterior)]
+    if isinstance(geom, MultiPolygon):
+        return [Polygon(p.exterior) for p in geom.geoms]
+    # GeometryCollection from make_valid: keep the areal pieces
+    return [
+        Polygon(p.exterior)
+        for g in getattr(geom, "geoms", [])
+        for p in polygon_parts(g)
+    ]
+
+
+def vertex_count(parts):
+    return sum(len(p.exterior.coords) - 1 for p in parts)
+
+
+def simplify_to_budget(
+    geom, max_vertices=DEFAULT_MAX_VERTICES, max_parts=DEFAULT_MAX_PARTS
+):
+    """Return exterior polygons covering ``geom`` within the vertex and part budget."""
+    if not geom.is_valid:
+        geom = make_valid(geom)
+    parts = polygon_parts(geom)
+    if vertex_count(parts) <= max_vertices and len(parts) <= max_parts:
+        return parts
+
+    tolerance = _START_TOLERANCE
+    while tolerance < 1.0:
+        covering = geom.buffer(tolerance).simplify(tolerance, preserve_topology=True)
+        parts = polygon_parts(covering)
+        if vertex_count(parts) <= max_vertices and len(parts) <= max_parts:
+            logger.info(
+                f"Simplified query area to {vertex_count(parts)} vertices in "
+                f"{len(parts)} part(s) (tolerance {tolerance:g} deg)"
+            )
+            return parts
+        tolerance *= 2
+
+    logger.warning("Could not meet the vertex budget; using the convex hull")
+    return [geom.convex_hull]
+
+
+def to_overpass_poly(polygon):
+    """Format a polygon exterior as an Overpass ``poly:"lat lon ..."`` string."""
+    coords = list(polygon.exterior.coords)[:-1]
+    return " ".join(f"{lat:.6f} {lon:.6f}" for lon, lat in coords)
+
+
+def overpass_polys_from_geojson(
+    poly_geojson, max_vertices=DEFAULT_MAX_VERTICES, max_parts=DEFAULT_MAX_PARTS
+):
+    """Simplify a GeoJSON boundary into a list of Overpass poly strings."""
+    parts = simplify_to_budget(shape(poly_geojson), max_vertices, max_parts)
+    return [to_overpass_poly(p) for p in parts]
+
+
+def clip_to_polygon(gdf, geom):
+    """Keep only the points of ``gdf`` that fall inside ``geom``.
+
+    The polygon is prepared once and tested against all coordinates in a single
+    vectorised ``intersects_xy`` call (points on the boundary are kept).
+    """
+    if gdf is None or gdf.empty:
+        return gdf
+    if not geom.is_valid:
+        geom = make_valid(geom)
+    shapely.prepare(geom)
+    inside = shapely.intersects_xy(geom, gdf.geometry.x.values, gdf.geometry.y.values)
+    dropped = int((~inside).sum())
+    if dropped:
+        logger.info(f"Culled {dropped} of {len(gdf)} places outside the state boundary")
+    return gdf[inside]
@@ -0,0 +1,196 @@
+"""
+Incremental parsing of Overpass JSON responses.
+
+``iter_elements`` walks the top-level ``elements`` array of an Overpass response
+one element at a time from a stream of byte chunks (a socket or a cached file),
+so the full response is never held in memory. ``iter_place_batches`` packs the
+elements into fixed-size columnar batches of NumPy arrays, ready to be turned
+into GeoDataFrame pieces.
+"""
+
+from __future__ import annotations
+
+import codecs
+import json
+import logging
+import re
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BATCH_SIZE = 50_000
+PLACE_COLUMNS = (
+    "osm_id",
+    "osm_type",
+    "lon",
+    "lat",
+    "name",
+    "place",
+    "population",
+    "tags",
+)
+
+_ELEMENTS_RE = re.compile(r'"elements"\s*:\s*\[')
+_REMARK_RE = re.compile(r'"remark"\s*:\s*"((?:[^"\\]|\\.)*)"')
+_OSM_BASE_RE = re.compile(r'"timestamp_osm_base"\s*:\s*"([^"]*)"')
+_WS = " \t\r\n"
+
+
+def iter_file_chunks(path, chunk_size=1024 * 1024):
+    with open(path, "rb") as fh:
+        while True:
+            chunk = fh.read(chunk_size)
+            if not chunk:
+                break
+            yield chunk
+
+
+def osm_base_timestamp(data):
+    """``osm3s.timestamp_osm_base`` of a parsed Overpass response: the time up to
+    which the server's database has applied OSM edits, or None."""
+    return (data.get("osm3s") or {}).get("timestamp_osm_base")
+
+
+class _ChunkReader:
+    """Decoded text of a stream of byte chunks, consumed from ``pos``."""
+
+    def __init__(self, chunks):
+        self.chunks = iter(chunks)
+        self.text_decoder = codecs.getincrementaldecoder("utf-8")()
+        self.buf = ""
+        self.pos = 0
+        self.exhausted = False
+
+    def more(self):
+        """Drop the consumed text and append the next chunk."""
+        chunk = next(self.chunks, None)
+        if chunk is None:
+            self.exhausted = True
+            tail = self.text_decoder.decode(b"", final=True)
+        else:
+            tail = self.text_decoder.decode(chunk)
+        self.buf = self.buf[self.pos :] + tail
+        self.pos = 0
+
+    def skip_header(self, header=None) -> bool:
+        """Move past ``"elements": [``; False if the response has no such array."""
+        while True:
+            m = _ELEMENTS_RE.search(self.buf, self.pos)
+            end = m.start() if m else len(self.buf)
+            base = header is not None and _OSM_BASE_RE.search(self.buf, 0, end)
+            if base:
+                header["timestamp_osm_base"] = base.group(1)
+            if m:
+                self.pos = m.end()
+                return True
+            if self.exhausted:
+                return False
+            # Keep a short tail in case a key is split across chunks
+            self.pos = max(0, len(self.buf) - 64)
+            self.more()
+
+    def elements(self):
+        """Yield the array's objects, leaving ``pos`` after its closing bracket."""
+        decoder = json.JSONDecoder()
+        skip = _WS + ","
+        # the hot loop works on locals; ``pos`` is written back before a refill
+        buf, pos = self.buf, self.pos
+        while True:
+            while pos < len(buf) and buf[pos] in skip:
+                pos += 1
+            if pos >= len(buf):
+                if self.exhausted:
+                    raise ValueError(
+                        "Truncated Overpass response: unterminated elements array"
+                    )
+                buf, pos = self._refill(pos)
+                continue
+            if buf[pos] == "]":
+                self.pos = pos + 1
+                return
+            try:
+                obj, pos = decoder.raw_decode(buf, pos)
+            except json.JSONDecodeError:
+                if self.exhausted:
+                    raise
+                buf, pos = self._refill(pos)
+                continue
+            yield obj
+
+    def _refill(self, pos):
+        self.pos = pos
+        self.more()
+        return self.buf, self.pos
+
+    def remark(self):
+        """The ``remark`` after the elements array, if any."""
+        while not self.exhausted and len(self.buf) - self.pos < 65536:
+            self.more()
+        m = _REMARK_RE.search(self.buf, self.pos)
+        return m.group(1) if m else None
+
+
+def iter_elements(chunks, header=None):
+    """Yield each object of the top-level ``elements`` array from byte chunks.
+
+    If a ``header`` dict is given, the response's ``timestamp_osm_base`` (see
+    osm_base_timestamp) is stored in it under that key.
+    """
+    reader = _ChunkReader(chunks)
+    # Skip the header (version, generator, osm3s) up to the elements array
+    if not reader.skip_header(header):
+        logger.warning("Overpass response has no 'elements' array")
+        return
+    yield from reader.elements()
+    # Overpass reports server-side failures (timeouts, memory) in a trailing remark
+    remark = reader.remark()
+    if remark:
+        logger.warning(f"Overpass remark: {remark}")
+
+
+def _new_batch(size):
+    return {
+        "osm_id": np.empty(size, dtype=np.int64),
+        "osm_type": np.empty(size, dtype=object),
+        "lon": np.empty(size, dtype=np.float64),
+        "lat": np.empty(size, dtype=np.float64),
+        "name": np.empty(size, dtype=object),
+        "place": np.empty(size, dtype=object),
+        "population": np.empty(size, dtype=object),
+        "tags": np.empty(size, dtype=object),
+    }
+
+
+def iter_place_batches(elements, batch_size=DEFAULT_BATCH_SIZE):
+    """Pack Overpass place elements into columnar batches of at most ``batch_size`` rows.
+
+    Nodes use their own coordinates, ways and relations their ``center``;
+    elements without coordinates are skipped.
+    """
+    batch = _new_batch(batch_size)
+    n = 0
+    for el in elements:
+        if el.get("type") == "node":
+            lon, lat = el.get("lon"), el.get("lat")
+        else:
+            center = el.get("center") or {}
+            lon, lat = center.get("lon"), center.get("lat")
+        if lon is None or lat is None:
+            continue
+        tags = el.get("tags", {})
+        batch["osm_id"][n] = el.get("id")
+        batch["osm_type"][n] = el.get("type")
+        batch["lon"][n] = lon
+        batch["lat"][n] = lat
+        batch["name"][n] = tags.get("name")
+        batch["place"][n] = tags.get("place")
+        batch["population"][n] = tags.get("population")
+        batch["tags"][n] = tags
+        n += 1
+        if n == batch_size:
+            yield batch
+            batch = _new_batch(batch_size)
+            n = 0
+    if n:
+        yield {k: v[:n] for k, v in batch.items()}
@@ -0,0 +1,344 @@
+"""
+Tiled, resumable Overpass extraction.
+
+The query area is cut into a grid of bbox tiles that are fetched with bounded
+concurrency. Every finished tile is checkpointed to disk, so an interrupted run
+picks up where it stopped. A tile that is too large for the server (a 504, an
+Overpass timeout/out-of-memory remark, or a result that hits the element cap) is
+split into four quadrants instead of being retried as a whole. fetch_tiles runs
+the requests on a thread pool; fetch_tiles_async runs them as tasks on an
+asyncio event loop.
+
+Checkpoint layout (one directory per query signature):
+
+    <checkpoint-dir>/<signature>/<tile-key>.json   {"elements": [...]} or {"split": true}
+    <checkpoint-dir>/<signature>/osm_base          oldest timestamp_osm_base of the tiles
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from pathlib import Path
+
+try:
+    from shapely.geometry import box
+except ImportError:
+    box = None
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_GRID = 4
+DEFAULT_WORKERS = 4
+DEFAULT_ELEMENT_LIMIT = 20_000
+DEFAULT_MAX_DEPTH = 4
+DEFAULT_RETRIES = 3
+
+
+class TileTooLarge(RuntimeError):
+    """The server could not answer a tile query; the tile should be subdivided."""
+
+
+@dataclass(frozen=True)
+class Tile:
+    south: float
+    west: float
+    north: float
+    east: float
+    depth: int = 0
+
+    @property
+    def bbox(self) -> str:
+        return f"{self.south:.6f},{self.west:.6f},{self.north:.6f},{self.east:.6f}"
+
+    @property
+    def key(self) -> str:
+        return self.bbox.replace(",", "_")
+
+    def split(self):
+        mid_lat = (self.south + self.north) / 2
+        mid_lon = (self.west + self.east) / 2
+        d = self.depth + 1
+        return [
+            Tile(self.south, self.west, mid_lat, mid_lon, d),
+            Tile(self.south, mid_lon, mid_lat, self.east, d),
+            Tile(mid_lat, self.west, self.north, mid_lon, d),
+            Tile(mid_lat, mid_lon, self.north, self.east, d),
+        ]
+
+
+def grid_tiles(bounds, rows=DEFAULT_GRID, cols=None, area=None):
+    """Cut ``(west, south, east, north)`` into a rows x cols grid of tiles.
+
+    When a shapely ``area`` is given, tiles that do not touch it are skipped.
+    """
+    west, south, east, north = bounds
+    cols = cols or rows
+    dlat = (north - south) / rows
+    dlon = (east - west) / cols
+    tiles = []
+    for r in range(rows):
+        for c in range(cols):
+            tile = Tile(
+                south + r * dlat,
+                west + c * dlon,
+                south + (r + 1) * dlat,
+                west + (c + 1) * dlon,
+            )
+            if area is not None and not area.intersects(
+                box(tile.west, tile.south, tile.east, tile.north)
+            ):
+                continue
+            tiles.append(tile)
+    return tiles
+
+
+def query_signature(*parts) -> str:
+    h = hashlib.sha256()
+    for part in parts:
+        h.update(str(part).encode("utf8") + b"\0")
+    return h.hexdigest()[:16]
+
+
+class TileCheckpoint:
+    """Per-tile results persisted under ``<root>/<signature>/``."""
+
+    def __init__(self, root: Path, signature: str):
+        self.dir = Path(root) / signature
+        self.dir.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+
+    def _path(self, tile: Tile) -> Path:
+        return self.dir / f"{tile.key}.json"
+
+    def load(self, tile: Tile):
+        try:
+            with open(self._path(tile), "r", encoding="utf8") as fh:
+                return json.load(fh)
+        except (OSError, ValueError):
+            return None
+
+    def _replace(self, path: Path, text: str):
+        fd, tmp = tempfile.mkstemp(dir=self.dir, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf8") as fh:
+            fh.write(text)
+        os.replace(tmp, path)
+
+    def _write(self, tile: Tile, record: dict):
+        self._replace(self._path(tile), json.dumps(record))
+
+    def save_elements(self, tile: Tile, elements):
+        self._write(tile, {"elements": elements})
+
+    def save_split(self, tile: Tile):
+        self._write(tile, {"split": True})
+
+    def osm_base(self):
+        """Oldest ``timestamp_osm_base`` recorded with note_osm_base, or None."""
+        try:
+            return (self.dir / "osm_base").read_text(encoding="utf8").strip() or None
+        except OSError:
+            return None
+
+    def note_osm_base(self, timestamp):
+        """Record a tile response's ``timestamp_osm_base``; only the oldest is kept,
+        so a resumed run knows how old its checkpointed tiles are."""
+        if not timestamp:
+            return
+        with self._lock:
+            current = self.osm_base()
+            if current is None or timestamp < current:
+                self._replace(self.dir / "osm_base", timestamp)
+
+    def clear(self):
+        shutil.rmtree(self.dir, ignore_errors=True)
+
+
+class _TileRun:
+    """Bookkeeping shared by fetch_tiles and fetch_tiles_async: the tile queue,
+    checkpoint reads and writes, subdivision, retries and the collected elements."""
+
+    def __init__(self, tiles, checkpoint, element_limit, max_depth, retries):
+        self.queue = list(tiles)
+        self.checkpoint = checkpoint
+        self.element_limit = element_limit
+        self.max_depth = max_depth
+        self.retries = retries
+        self.attempts = {}
+        self.failed = []
+        self.seen = set()
+        self.elements = []
+        self.done_tiles = 0
+
+    def next_tile(self):
+        """Pop the next tile that needs a request; checkpointed ones are consumed
+        on the way. Returns None when the queue is empty."""
+        while self.queue:
+            tile = self.queue.pop(0)
+            record = self.checkpoint.load(tile) if self.checkpoint is not None else None
+            if record is None:
+                return tile
+            if record.get("split"):
+                self.queue.extend(tile.split())
+            else:
+                self._collect(record.get("elements", []))
+                self.done_tiles += 1
+        return None
+
+    def retry_delay(self, tile, backoff):
+        n = self.attempts.get(tile, 0)
+        return backoff * 2 ** (n - 1) if n else 0
+
+    def _collect(self, tile_elements):
+        for el in tile_elements:
+            ident = (el.get("type"), el.get("id"))
+            if ident not in self.seen:
+                self.seen.add(ident)
+                self.elements.append(el)
+
+    def _subdivide(self, tile, reason):
+        if tile.depth >= self.max_depth:
+            logger.error(
+                f"Tile {tile.bbox} still too large at depth {tile.depth}: {reason}"
+            )
+            self.failed.append(tile)
+            return
+        logger.info(f"Subdividing tile {tile.bbox} ({reason})")
+        if self.checkpoint is not None:
+            self.checkpoint.save_split(tile)
+        self.queue.extend(tile.split())
+
+    def finished(self, tile, get_result):
+        """Handle a finished request; ``get_result()`` returns its elements or raises."""
+        try:
+            tile_elements = get_result()
+        except TileTooLarge as e:
+            self._subdivide(tile, str(e))
+            return
+        except Exception as e:
+            self.attempts[tile] = self.attempts.get(tile, 0) + 1
+            if self.attempts[tile] > self.retries:
+                logger.error(
+                    f"Tile {tile.bbox} failed after {self.retries} retries: {e}"
+                )
+                self.failed.append(tile)
+            else:
+                logger.warning(f"Tile {tile.bbox} failed ({e}); retrying")
+                self.queue.append(tile)
+            return
+
+        if len(tile_elements) >= self.element_limit:
+            self._subdivide(tile, f"{len(tile_elements)} elements hit the cap")
+            return
+        if self.checkpoint is not None:
+            self.checkpoint.save_elements(tile, tile_elements)
+        self._collect(tile_elements)
+        self.done_tiles += 1
+
+    def result(self):
+        if self.failed:
+            raise RuntimeError(
+                f"{len(self.failed)} Overpass tile(s) failed: "
+                + ", ".join(t.bbox for t in self.failed)
+                + ". Re-run to resume from the checkpoint."
+            )
+        logger.info(
+            f"Fetched {self.done_tiles} tile(s), {len(self.elements)} unique elements"
+        )
+        return self.elements
+
+
+def fetch_tiles(
+    tiles,
+    fetch_tile,
+    checkpoint: TileCheckpoint | None = None,
+    max_workers=DEFAULT_WORKERS,
+    element_limit=DEFAULT_ELEMENT_LIMIT,
+    max_depth=DEFAULT_MAX_DEPTH,
+    retries=DEFAULT_RETRIES,
+    backoff=5.0,
+):
+    """Fetch every tile and return the de-duplicated list of elements.
+
+    ``fetch_tile(tile)`` returns the tile's Overpass elements and raises
+    TileTooLarge when the tile must be subdivided. Any other exception is retried
+    ``retries`` times with exponential backoff. Raises RuntimeError listing the
+    tiles that still failed; their neighbours stay checkpointed for the next run.
+    """
+    state = _TileRun(tiles, checkpoint, element_limit, max_depth, retries)
+
+    def run(tile):
+        delay = state.retry_delay(tile, backoff)
+        if delay:
+            time.sleep(delay)
+        return fetch_tile(tile)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        running = {}
+        while True:
+            while len(running) < max_workers:
+                tile = state.next_tile()
+                if tile is None:
+                    break
+                running[pool.submit(run, tile)] = tile
+            if not running:
+                break
+
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for fut in finished:
+                state.finished(running.pop(fut), fut.result)
+
+    return state.result()
+
+
+async def fetch_tiles_async(
+    tiles,
+    fetch_tile,
+    checkpoint: TileCheckpoint | None = None,
+    max_concurrent=DEFAULT_WORKERS,
+    element_limit=DEFAULT_ELEMENT_LIMIT,
+    max_depth=DEFAULT_MAX_DEPTH,
+    retries=DEFAULT_RETRIES,
+    backoff=5.0,
+):
+    """Coroutine version of fetch_tiles: ``fetch_tile(tile)`` is a coroutine
+    function, and up to ``max_concurrent`` tiles are in flight as tasks of the
+    running event loop rather than threads."""
+    state = _TileRun(tiles, checkpoint, element_limit, max_depth, retries)
+
+    async def run(tile):
+        delay = state.retry_delay(tile, backoff)
+        if delay:
+            await asyncio.sleep(delay)
+        return await fetch_tile(tile)
+
+    running = {}
+    try:
+        while True:
+            while len(running) < max_concurrent:
+                tile = state.next_tile()
+                if tile is None:
+                    break
+                running[asyncio.ensure_future(run(tile))] = tile
+            if not running:
+                break
+
+            finished, _ = await asyncio.wait(
+                running, return_when=asyncio.FIRST_COMPLETED
+            )
+            for task in finished:
+                state.finished(running.pop(task), task.result)
+    finally:
+        for task in running:
+            task.cancel()
+
+    return state.result()
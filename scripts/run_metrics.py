@@ -0,0 +1,324 @@
+"""
+Per-stage timing, memory and I/O metrics for pipeline runs.
+
+Stages are marked with a context manager or decorator:
+
+    with run_metrics.stage("census_join", rows_in=len(osm_gdf)) as st:
+        joined = ...
+        st.rows_out = len(joined)
+
+    @run_metrics.timed("fetch_census")
+    def fetch_census_for_state(args, cache=None): ...
+
+Each stage records wall and CPU time, the process's RSS at its start and end,
+rows in/out, bytes received over HTTP (counted by ``count_response_bytes``, a
+``requests`` response hook, or reported with ``count_bytes`` by the async
+fetcher) and bytes written. The peak RSS (``ru_maxrss``, a high-water mark for
+the process's lifetime) is only recorded in the run's totals. CPU time, RSS and
+received bytes are process-wide, so stages that run concurrently (e.g. the OSM
+and TIGER fetches, or the export writers) each see the other's share.
+
+When no recorder is active, stages only cost a couple of clock reads. ``main()``
+activates a ``Recorder`` and writes ``run_metrics.json`` to the output directory;
+with ``--profile`` each top-level stage in a thread is also run under cProfile
+and dumped to ``<output-dir>/profiles/<stage>.prof`` (view with ``snakeviz`` or
+``python -m pstats``). Batch workers record into their own recorder
+(``collect``) and the parent merges the results.
+"""
+
+from __future__ import annotations
+
+import cProfile
+import functools
+import json
+import logging
+import os
+import re
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+logger = logging.getLogger(__name__)
+
+METRICS_VERSION = 2
+METRICS_FILE = "run_metrics.json"
+
+_lock = threading.Lock()
+_bytes_received = 0
+_active = None
+_active_pid = None
+_local = threading.local()
+
+
+def bytes_received() -> int:
+    """Total HTTP bytes received by this process so far."""
+    return _bytes_received
+
+
+def _add_bytes(n: int):
+    global _bytes_received
+    with _lock:
+        _bytes_received += n
+
+
+def count_bytes(n: int):
+    """Count ``n`` HTTP bytes received by a client other than ``requests``."""
+    _add_bytes(n)
+
+
+def count_response_bytes(resp, *args, **kwargs):
+    """``requests`` response hook counting the bytes read off the wire.
+
+    Works for streamed responses too: reads of the underlying urllib3 response
+    are counted as the body is consumed.
+    """
+    raw = getattr(resp, "raw", None)
+    if (
+        raw is None
+        or not hasattr(raw, "tell")
+        or getattr(raw, "_metrics_counted", False)
+    ):
+        return resp
+    read = raw.read
+    seen = [raw.tell()]
+
+    def counting_read(*a, **kw):
+        data = read(*a, **kw)
+        pos = raw.tell()
+        _add_bytes(pos - seen[0])
+        seen[0] = pos
+        return data
+
+    raw.read = counting_read
+    raw._metrics_counted = True
+    return resp
+
+
+def current_rss() -> int | None:
+    """Resident set size of this process in bytes (Linux only), else None."""
+    try:
+        with open("/proc/self/statm", "rb") as fh:
+            return int(fh.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError, AttributeError):
+        return None
+
+
+def peak_rss() -> int | None:
+    """High-water RSS of this process in bytes, or None where unsupported."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+class Stage:
+    """Counters of one running stage; set ``rows_out``/``bytes_written`` on it."""
+
+    def __init__(self, name, rows_in=None):
+        self.name = name
+        self.rows_in = rows_in
+        self.rows_out = None
+        self.bytes_written = None
+
+
+class Recorder:
+    """Collects stage records for one run (or one batch worker)."""
+
+    def __init__(self, profile_dir: Path | None = None):
+        self.profile_dir = Path(profile_dir) if profile_dir else None
+        self.records = []
+        self.t0 = time.perf_counter()
+        self.cpu0 = time.process_time()
+        self.bytes0 = bytes_received()
+        self.started_at = datetime.now(timezone.utc).isoformat(timespec="seconds")
+
+    def add(self, record: dict):
+        with _lock:
+            self.records.append(record)
+
+    def merge(self, records, prefix=""):
+        for record in records:
+            self.add({**record, "name": prefix + record["name"]})
+
+    def total(self) -> dict:
+        return {
+            "wall_s": round(time.perf_counter() - self.t0, 4),
+            "cpu_s": round(time.process_time() - self.cpu0, 4),
+            "peak_rss_bytes": peak_rss(),
+            "bytes_received": bytes_received() - self.bytes0,
+        }
+
+    def summary(self) -> str:
+        def blank(v, fmt=""):
+            return "" if v is None else format(v, fmt)
+
+        lines = [
+            f"{'stage':<28} {'wall s':>8} {'cpu s':>8} {'rows in':>9} {'rows out':>9} "
+            f"{'MB recv':>8} {'MB out':>8}"
+        ]
+        for r in sorted(self.records, key=lambda r: r["start_s"]):
+            written = r["bytes_written"]
+            lines.append(
+                f"{r['name']:<28} {r['wall_s']:>8.2f} {r['cpu_s']:>8.2f} "
+                f"{blank(r['rows_in']):>9} {blank(r['rows_out']):>9} "
+                f"{r['bytes_received'] / 1e6:>8.2f} "
+                f"{blank(None if written is None else written / 1e6, '.2f'):>8}"
+            )
+        return "\n".join(lines)
+
+    def write(self, path: Path, argv=None, status="ok"):
+        data = {
+            "version": METRICS_VERSION,
+            "started_at": self.started_at,
+            "argv": list(sys.argv[1:] if argv is None else argv),
+            "status": status,
+            "total": self.total(),
+            "stages": sorted(self.records, key=lambda r: r["start_s"]),
+        }
+        path = Path(path)
+        tmp = path.with_suffix(path.suffix + ".tmp")
+        with open(tmp, "w", encoding="utf8") as fh:
+            json.dump(data, fh, indent=2)
+        os.replace(tmp, path)
+        return path
+
+
+def activate(recorder: Recorder | None):
+    """Make ``recorder`` receive stage records; returns the previous one."""
+    global _active, _active_pid
+    previous, _active = _active, recorder
+    _active_pid = os.getpid()
+    return previous
+
+
+def active() -> Recorder | None:
+    return _active
+
+
+def _start_profile(recorder, name):
+    # One profiler per thread, around the outermost stage; nested stages are
+    # part of their parent's profile
+    if (
+        recorder is None
+        or recorder.profile_dir is None
+        or getattr(_local, "profiling", False)
+    ):
+        return None
+    profiler = cProfile.Profile()
+    try:
+        profiler.enable()
+    except ValueError:  # another profiler is active (3.12+ allows only one)
+        logger.debug(f"Not profiling stage {name}: another profiler is active")
+        return None
+    _local.profiling = True
+    return profiler
+
+
+def _stop_profile(recorder, profiler, name):
+    profiler.disable()
+    _local.profiling = False
+    recorder.profile_dir.mkdir(parents=True, exist_ok=True)
+    path = recorder.profile_dir / (re.sub(r"[^\w.-]+", "_", name) + ".prof")
+    profiler.dump_stats(path)
+    return str(path)
+
+
+@contextmanager
+def stage(name, rows_in=None):
+    """Record one pipeline stage into the active recorder (if any)."""
+    recorder = _active
+    st = Stage(name, rows_in)
+    rss_start = current_rss()
+    bytes_start = bytes_received()
+    cpu_start = time.process_time()
+    t_start = time.perf_counter()
+    profiler = _start_profile(recorder, name)
+    error = None
+    try:
+        yield st
+    except BaseException as e:
+        error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        wall = time.perf_counter() - t_start
+        cpu = time.process_time() - cpu_start
+        profile = _stop_profile(recorder, profiler, name) if profiler else None
+        if recorder is not None:
+            recorder.add(
+                {
+                    "name": name,
+                    "start_s": round(t_start - recorder.t0, 4),
+                    "wall_s": round(wall, 4),
+                    "cpu_s": round(cpu, 4),
+                    "rss_start_bytes": rss_start,
+                    "rss_end_bytes": current_rss(),
+                    "rows_in": st.rows_in,
+                    "rows_out": st.rows_out,
+                    "bytes_received": bytes_received() - bytes_start,
+                    "bytes_written": st.bytes_written,
+                    "error": error,
+                    "profile": profile,
+                }
+            )
+        logger.debug(f"Stage {name} took {wall:.2f}s (cpu {cpu:.2f}s)")
+
+
+def _len_or_none(result):
+    try:
+        return len(result)
+    except TypeError:
+        return None
+
+
+def timed(name, rows_out=_len_or_none):
+    """Decorator form of ``stage``; ``rows_out`` maps the return value to a row count."""
+
+    def decorate(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with stage(name) as st:
+                result = fn(*args, **kwargs)
+                if result is not None:
+                    st.rows_out = rows_out(result)
+                return result
+
+        return wrapper
+
+    return decorate
+
+
+def path_size(path) -> int | None:
+    """Bytes of a file, or of all files under a directory."""
+    path = Path(path)
+    if path.is_dir():
+        return sum(p.stat().st_size for p in path.rglob("*") if p.is_file())
+    try:
+        return path.stat().st_size
+    except OSError:
+        return None
+
+
+def collect(fn, *args, profile_dir=None, **kwargs):
+    """Run ``fn`` under a fresh recorder (e.g. in a worker process).
+
+    Returns ``(result, records)``; the parent merges ``records`` into its own.
+    Called from a thread of the process that activated the current recorder,
+    the stages already land in that recorder and ``records`` is empty.
+    """
+    if _active is not None and _active_pid == os.getpid():
+        return fn(*args, **kwargs), []
+    recorder = Recorder(profile_dir)
+    previous = activate(recorder)
+    try:
+        return fn(*args, **kwargs), recorder.records
+    finally:
+        activate(previous)
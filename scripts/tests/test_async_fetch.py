@@ -0,0 +1,128 @@
+import asyncio
+import os
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip("geopandas")
+pytest.importorskip("httpx")
+standin = pytest.importorskip("scripts.dev_tools.http_standin")
+build = pytest.importorskip("scripts.build_nc_localities")
+http_cache = pytest.importorskip("scripts.http_cache")
+http_session = pytest.importorskip("scripts.http_session")
+
+
+@pytest.fixture(scope="module")
+def fixture_dir(tmp_path_factory):
+    path = tmp_path_factory.mktemp("fixtures")
+    standin.synthesize(path, size=300, seed=5)
+    return path
+
+
+def point_pipeline_at(monkeypatch, server):
+    for name, url in server.service_urls().items():
+        monkeypatch.setattr(build, name, url)
+
+
+@pytest.fixture
+def threaded_ids(fixture_dir: Path, tmp_path: Path, monkeypatch):
+    """OSM ids fetched by the ``requests`` code path."""
+    args = build.parse_args(["--output-dir", str(tmp_path)])
+    with standin.StandInServer(fixture_dir) as server:
+        point_pipeline_at(monkeypatch, server)
+        return set(build.fetch_osm_for_state(args).osm_id)
+
+
+def test_async_fetch_matches_the_threaded_path(
+    fixture_dir: Path, tmp_path: Path, monkeypatch, threaded_ids
+):
+    args = build.parse_args(["--async-fetch", "--output-dir", str(tmp_path)])
+    with standin.StandInServer(fixture_dir, fail_first=1, retry_after=0) as server:
+        point_pipeline_at(monkeypatch, server)
+        osm, census = asyncio.run(build.fetch_osm_and_census_async(args))
+        stats = server.stats()
+
+    assert set(osm.osm_id) == threaded_ids
+    assert census.attrs["tiger_year"] == 2025 and len(census) == 300 // 40
+    # the first request to every path (Nominatim, Overpass, six TIGER vintage
+    # probes) got a 429 and was retried
+    assert stats["by_status"]["429"] == 8
+    assert stats["by_path"][standin.OVERPASS_INTERPRETER_PATH] == 2
+
+
+def test_async_tiles_share_one_loop_and_the_cache(
+    fixture_dir: Path, tmp_path: Path, monkeypatch, threaded_ids
+):
+    args = build.parse_args(
+        [
+            "--async-fetch",
+            "--output-dir",
+            str(tmp_path),
+            "--osm-tiles",
+            "4",
+            "--tile-workers",
+            "32",
+        ]
+    )
+    cache = http_cache.ResponseCache(tmp_path / "cache")
+    with standin.StandInServer(fixture_dir, latency=0.05) as server:
+        point_pipeline_at(monkeypatch, server)
+        osm, census = asyncio.run(build.fetch_osm_and_census_async(args, cache))
+        first = server.stats()
+        asyncio.run(build.fetch_osm_and_census_async(args, cache))
+        second = server.stats()
+
+    assert set(osm.osm_id) == threaded_ids
+    assert census.attrs["source_path"].startswith(str(tmp_path / "cache"))
+    assert first["by_path"][standin.OVERPASS_INTERPRETER_PATH] == 16
+    assert first["max_in_flight"] > 4  # tiles overlap on a single thread
+    # the second run only repeats the vintage probes
+    assert second["requests"] - first["requests"] == 6
+
+
+def test_async_tiles_wait_for_overpass_slots(
+    fixture_dir: Path, tmp_path: Path, monkeypatch
+):
+    args = build.parse_args(
+        [
+            "--async-fetch",
+            "--output-dir",
+            str(tmp_path),
+            "--osm-tiles",
+            "3",
+            "--tile-workers",
+            "16",
+        ]
+    )
+    with standin.StandInServer(
+        fixture_dir, latency=0.05, overpass_slots=2, slot_cooldown=0.3
+    ) as server:
+        point_pipeline_at(monkeypatch, server)
+        asyncio.run(build.fetch_osm_and_census_async(args))
+        stats = server.stats()
+
+    assert stats["by_path"][standin.OVERPASS_INTERPRETER_PATH] == 9
+    assert stats["max_overpass_running"] <= 2
+    assert "429" not in stats["by_status"]
+
+
+@pytest.mark.parametrize("posix", [True, False])
+def test_async_slot_claims_never_signal_this_process(
+    fixture_dir: Path, tmp_path: Path, monkeypatch, posix
+):
+    if not posix:
+        monkeypatch.setattr(http_session, "fcntl", None)
+    signalled = []
+    monkeypatch.setattr(http_session.os, "kill", lambda pid, sig: signalled.append(pid))
+    args = build.parse_args(
+        ["--async-fetch", "--output-dir", str(tmp_path), "--osm-tiles", "2"]
+    )
+    with standin.StandInServer(fixture_dir, overpass_slots=2) as server:
+        point_pipeline_at(monkeypatch, server)
+        asyncio.run(build.fetch_osm_and_census_async(args))
+        stats = server.stats()
+
+    assert stats["by_path"][standin.OVERPASS_INTERPRETER_PATH] == 4
+    assert os.getpid() not in signalled
+    if not posix:
+        assert signalled == []
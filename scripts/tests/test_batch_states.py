@@ -0,0 +1,88 @@
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import pytest
+
+build = pytest.importorskip("scripts.build_nc_localities")
+gpd = pytest.importorskip("geopandas")
+from shapely.geometry import Point  # noqa: E402
+
+
+def fake_dataset(args, outdir):
+    if args.state_fips == "45":
+        raise RuntimeError("Overpass 504")
+    rows = [
+        {
+            "osm_id": 10,
+            "osm_type": "node",
+            "final_name": "Border Town",
+            "place": "town",
+            "population": "10",
+            "geoid": None,
+            "geometry": Point(-80.0, 35.0),
+        },
+        {
+            "osm_id": int(args.state_fips),
+            "osm_type": "node",
+            "final_name": args.state,
+            "place": "city",
+            "population": "100",
+            "geoid": None,
+            "geometry": Point(-79.0, 36.0),
+        },
+    ]
+    return gpd.GeoDataFrame(rows, geometry="geometry", crs="EPSG:4326")
+
+
+def test_batch_isolates_failures_and_merges(tmp_path: Path, monkeypatch):
+    monkeypatch.setattr(build, "build_state_dataset", fake_dataset)
+    # Threads stand in for processes so the patch is visible on every platform
+    monkeypatch.setattr(build, "ProcessPoolExecutor", ThreadPoolExecutor)
+    args = build.parse_args(
+        ["--output-dir", str(tmp_path), "--states", "NC,SC,VA", "--merge-states"]
+    )
+
+    failed = build.run_batch(args, tmp_path)
+
+    assert list(failed) == ["SC"]
+    assert (tmp_path / "nc_localities.geojson").exists()
+    assert (tmp_path / "va_localities.csv").exists()
+    assert not (tmp_path / "sc_localities.geojson").exists()
+    merged = gpd.read_file(tmp_path / "merged_localities.geojson")
+    # The shared border place is kept once
+    assert sorted(merged["osm_id"]) == [10, 37, 51]
+
+
+def test_run_state_job_reports_errors(tmp_path: Path, monkeypatch):
+    monkeypatch.setattr(build, "build_state_dataset", fake_dataset)
+    args = argparse.Namespace(**vars(build.parse_args([])))
+    code, path, error = build.run_state_job("SC", args, tmp_path)
+    assert code == "SC" and path is None and "504" in error
+
+
+def test_unknown_state_is_rejected():
+    with pytest.raises(SystemExit):
+        build.parse_args(["--states", "NC,XX"])
+
+
+def test_state_polygon_skips_same_named_places():
+    params = build.state_search_params("Georgia")
+    assert params["state"] == "Georgia" and "q" not in params
+
+    def result(name, addresstype, type_="administrative"):
+        return {
+            "osm_type": "relation",
+            "display_name": name,
+            "addresstype": addresstype,
+            "type": type_,
+            "geojson": {"type": "Polygon", "coordinates": []},
+        }
+
+    country = result("Georgia", "country")
+    state = result("Georgia, United States", "state")
+    assert build.state_from_nominatim([country, state], "Georgia") is state
+    with pytest.raises(RuntimeError, match="No state boundary"):
+        build.state_from_nominatim(
+            [result("Washington, District of Columbia", "city")], "Washington"
+        )
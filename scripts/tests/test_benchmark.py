@@ -0,0 +1,85 @@
+import json
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip("geopandas")
+synthetic = pytest.importorskip("scripts.dev_tools.synthetic_localities")
+benchmark = pytest.importorskip("scripts.dev_tools.benchmark")
+
+
+def test_synthetic_places_have_duplicates_and_census_matches():
+    build = pytest.importorskip("scripts.build_nc_localities")
+    osm = synthetic.osm_places(2000, seed=1)
+    census = synthetic.census_places(50, seed=1)
+    assert list(osm.columns) == build.OSM_COLUMNS
+    assert osm["osm_id"].is_unique
+    assert census["GEOID"].str.startswith("37").all()
+    # same seed, same data
+    assert synthetic.osm_places(2000, seed=1).equals(osm)
+
+    out_geo = build.prepare_out_geo(osm, census)
+    # the exact (respelled) duplicates are removed, the nearby ones are not
+    assert len(osm) - len(out_geo) >= 2000 * synthetic.DUPLICATE_RATE * 0.4
+    assert out_geo["geoid"].notna().any()
+    assert synthetic.parse_size("10k") == 10_000
+    assert synthetic.parse_size("2m") == 2_000_000
+
+
+def test_benchmark_writes_results_and_flags_regressions(tmp_path: Path):
+    baseline = tmp_path / "baseline.json"
+    results = tmp_path / "results.json"
+    common = [
+        "--sizes",
+        "300",
+        "--repeat",
+        "1",
+        "--formats",
+        "csv",
+        "--workdir",
+        str(tmp_path),
+    ]
+    assert (
+        benchmark.main(
+            [
+                *common,
+                "--output",
+                str(results),
+                "--baseline",
+                str(baseline),
+                "--save-baseline",
+            ]
+        )
+        == 0
+    )
+    data = json.loads(results.read_text(encoding="utf8"))
+    assert {r["benchmark"] for r in data["results"]} == set(benchmark.BENCHMARKS)
+    exports = next(
+        r for r in data["results"] if r["benchmark"] == "write_exports_and_map"
+    )
+    assert [s["name"] for s in exports["stages"]] == ["export:csv"]
+
+    # every result is "slower" than a baseline with near-zero times
+    for r in data["results"]:
+        r["best_s"] = 1e-6
+    baseline.write_text(json.dumps(data), encoding="utf8")
+    assert (
+        benchmark.main(
+            [
+                *common,
+                "--output",
+                str(results),
+                "--baseline",
+                str(baseline),
+                "--min-delta",
+                "0",
+            ]
+        )
+        == 1
+    )
+    data = json.loads(results.read_text(encoding="utf8"))
+    assert len(data["regressions"]) == len(benchmark.BENCHMARKS)
+    assert sorted(p.name for p in tmp_path.iterdir()) == [
+        "baseline.json",
+        "results.json",
+    ]
@@ -0,0 +1,40 @@
+import pytest
+
+build_manifest = pytest.importorskip("scripts.build_manifest")
+
+
+def test_write_if_changed_keeps_identical_files(tmp_path):
+    path = tmp_path / "page.html"
+    assert build_manifest.write_if_changed(path, "<p>one</p>")
+    mtime = path.stat().st_mtime_ns
+    assert not build_manifest.write_if_changed(path, "<p>one</p>")
+    assert path.stat().st_mtime_ns == mtime
+    assert build_manifest.write_if_changed(path, "<p>two</p>")
+    assert path.read_text(encoding="utf8") == "<p>two</p>"
+
+
+def test_manifest_tracks_inputs_script_params_and_outputs(tmp_path):
+    site = tmp_path / "site"
+    src = tmp_path / "input.csv"
+    src.write_text("a,b\n1,2\n", encoding="utf8")
+    out = site / "page.html"
+    build_manifest.write_if_changed(out, "page")
+
+    manifest = build_manifest.BuildManifest(site)
+    inputs = {"csv": src}
+    assert not manifest.up_to_date("page", inputs, "v1")
+    manifest.record("page", inputs, "v1", [out], {"payload": "columnar"})
+
+    manifest = build_manifest.BuildManifest(site)
+    assert manifest.up_to_date("page", inputs, "v1", {"payload": "columnar"})
+    assert not manifest.up_to_date("page", inputs, "v2", {"payload": "columnar"})
+    assert not manifest.up_to_date("page", inputs, "v1", {"payload": "geojson"})
+    assert not build_manifest.BuildManifest(site, force=True).up_to_date(
+        "page", inputs, "v1", {"payload": "columnar"}
+    )
+
+    out.write_text("edited by hand", encoding="utf8")
+    assert not manifest.up_to_date("page", inputs, "v1", {"payload": "columnar"})
+    build_manifest.write_if_changed(out, "page")
+    src.write_text("a,b\n1,3\n", encoding="utf8")
+    assert not manifest.up_to_date("page", inputs, "v1", {"payload": "columnar"})
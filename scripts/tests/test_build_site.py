@@ -87,3 +87,29 @@ def test_pipeline_sample_mode(tmp_path: Path):
     assert res2.returncode == 0
     assert (sdir / "data" / "nc_localities.geojson").exists()
     assert (sdir / "map.html").exists()
+
+
+def test_build_site_skips_unchanged_inputs(tmp_path: Path):
+    outdir = tmp_path / "output"
+    outdir.mkdir()
+    sdir = tmp_path / "site"
+    make_sample_geojson(outdir / "nc_localities.geojson")
+
+    build_site.main(["--output-dir", str(outdir), "--site-dir", str(sdir)])
+    outputs = sorted(p for p in sdir.rglob("*") if p.is_file())
+    stamps = {p: p.stat().st_mtime_ns for p in outputs}
+    assert (sdir / ".build-manifest.json").exists()
+
+    # unchanged inputs: nothing is rewritten, with or without --force
+    build_site.main(["--output-dir", str(outdir), "--site-dir", str(sdir)])
+    build_site.main(["--output-dir", str(outdir), "--site-dir", str(sdir), "--force"])
+    assert {p: p.stat().st_mtime_ns for p in outputs} == stamps
+
+    # a changed input rebuilds the map with a new data file
+    gj = json.loads((outdir / "nc_localities.geojson").read_text(encoding="utf8"))
+    gj["features"][0]["properties"]["final_name"] = "Renamed Place"
+    (outdir / "nc_localities.geojson").write_text(json.dumps(gj), encoding="utf8")
+    build_site.main(["--output-dir", str(outdir), "--site-dir", str(sdir)])
+    html = (sdir / "map.html").read_text(encoding="utf8")
+    (data_rel,) = list(build_site.map_assets.referenced_assets(html))
+    assert "Renamed Place" in (sdir / data_rel).read_text(encoding="utf8")
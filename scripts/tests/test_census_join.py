@@ -0,0 +1,66 @@
+import pytest
+
+gpd = pytest.importorskip("geopandas")
+np = pytest.importorskip("numpy")
+shapely = pytest.importorskip("shapely")
+from shapely.geometry import Point, box  # noqa: E402
+
+from scripts import census_join  # noqa: E402
+
+
+def census_grid():
+    # A 3x3 grid of square "places" plus a detailed circular one
+    polys, geoids = [], []
+    for i in range(3):
+        for j in range(3):
+            polys.append(box(-80 + i, 35 + j, -79 + i, 36 + j))
+            geoids.append(f"37{i}{j}")
+    polys.append(Point(-85, 30).buffer(0.5, quad_segs=256))
+    geoids.append("37circle")
+    return gpd.GeoDataFrame(
+        {"GEOID": geoids, "NAME": [f"Place {g}" for g in geoids]},
+        geometry=polys,
+        crs="EPSG:4326",
+    )
+
+
+def reference_lookup(census, x, y):
+    out = []
+    for px, py in zip(x, y, strict=True):
+        hits = [i for i, g in enumerate(census.geometry) if g.contains(Point(px, py))]
+        out.append(hits[0] if hits else -1)
+    return np.array(out)
+
+
+@pytest.mark.parametrize("tolerance", [None, 0.01])
+def test_lookup_matches_brute_force(tolerance):
+    census = census_grid()
+    rng = np.random.default_rng(0)
+    x = np.concatenate([rng.uniform(-81, -76, 300), rng.uniform(-85.6, -84.4, 300)])
+    y = np.concatenate([rng.uniform(34, 39, 300), rng.uniform(29.4, 30.6, 300)])
+
+    index = census_join.CensusIndex.from_gdf(census, simplify_tolerance=tolerance)
+    hit = index.lookup(x, y)
+    np.testing.assert_array_equal(hit, reference_lookup(census, x, y))
+
+
+def test_bands_are_persisted_next_to_source(tmp_path, monkeypatch):
+    census = census_grid()
+    source = tmp_path / "tl_2025_37_place.zip"
+    source.write_bytes(b"zip")
+    census.attrs["source_path"] = str(source)
+
+    first = census_join.CensusIndex.for_census(census, simplify_tolerance=0.01)
+    bands_path = tmp_path / ("tl_2025_37_place.zip" + census_join.INDEX_SUFFIX)
+    assert bands_path.exists()
+
+    def rebuilt(*args):
+        raise AssertionError("bands rebuilt despite the saved copy")
+
+    monkeypatch.setattr(census_join.CensusIndex, "_bands", staticmethod(rebuilt))
+    loaded = census_join.CensusIndex.for_census(census, simplify_tolerance=0.01)
+    assert list(loaded.geoid) == list(first.geoid)
+    assert loaded.lookup([-79.5], [35.5])[0] == 0
+    assert all(shapely.equals(loaded.outer, first.outer))
+    # A different tolerance needs different bands
+    assert census_join.load_bands(bands_path, source, 0.02, len(census)) is None
@@ -0,0 +1,46 @@
+import threading
+import time
+
+import pytest
+
+build = pytest.importorskip("scripts.build_nc_localities")
+
+
+class HeadResponse:
+    def __init__(self, status_code):
+        self.status_code = status_code
+
+
+class ProbeSession:
+    def __init__(self, available, delay=0.2):
+        self.available = available
+        self.delay = delay
+        self.lock = threading.Lock()
+        self.probed = []
+
+    def head(self, url, **kwargs):
+        time.sleep(self.delay)
+        with self.lock:
+            self.probed.append(url)
+        year = int(url.rsplit("/", 1)[-1].split("_")[1])
+        return HeadResponse(200 if year in self.available else 404)
+
+
+def test_probe_picks_newest_available_year(monkeypatch):
+    session = ProbeSession(available={2021, 2023})
+    monkeypatch.setattr(build, "get_requests_session", lambda **kw: session)
+
+    start = time.perf_counter()
+    year = build.probe_census_years("37", range(2025, 2019, -1))
+    elapsed = time.perf_counter() - start
+
+    assert year == 2023
+    # Probes overlap instead of costing one round trip per year
+    assert elapsed < 0.2 * 3
+
+
+def test_probe_returns_none_when_nothing_exists(monkeypatch):
+    session = ProbeSession(available=set(), delay=0)
+    monkeypatch.setattr(build, "get_requests_session", lambda **kw: session)
+    assert build.probe_census_years("37", [2025, 2024]) is None
+    assert len(session.probed) == 2
@@ -0,0 +1,57 @@
+import json
+
+import numpy as np
+import pytest
+
+columnar_points = pytest.importorskip("scripts.columnar_points")
+geojson_writer = pytest.importorskip("scripts.geojson_writer")
+
+
+def test_round_trip_drops_missing_coordinates():
+    lon = [-80.123456, -78.5, np.nan, -79.0]
+    lat = [35.1, 36.2, 35.0, 35.15]
+    props = {
+        "name": ["Alpha", None, "Gone", "Delta"],
+        "place": ["town", "town", "city", None],
+        "population": np.array([100.0, np.nan, 3.0, 4.0]),
+        "tags": [{"a": 1}, None, {}, [1]],
+    }
+    payload = columnar_points.encode_points(lon, lat, props, categorical=["place"])
+    assert payload["count"] == 3
+    assert payload["columns"]["place"]["kind"] == "dict"
+    assert payload["columns"]["name"]["kind"] == "str"
+    assert payload["columns"]["tags"]["kind"] == "raw"
+
+    out_lon, out_lat, out_props = columnar_points.decode_points(json.dumps(payload))
+    rows = sorted(
+        zip(
+            out_lon.tolist(),
+            out_lat.tolist(),
+            *[out_props[k] for k in props],
+            strict=True,
+        ),
+        key=lambda r: r[0],
+    )
+    assert rows == [
+        (-80.12346, 35.1, "Alpha", "town", 100.0, {"a": 1}),
+        (-79.0, 35.15, "Delta", None, 4.0, [1]),
+        (-78.5, 36.2, None, "town", None, None),
+    ]
+
+
+def test_payload_is_much_smaller_than_geojson():
+    rng = np.random.default_rng(0)
+    n = 5000
+    lon = rng.uniform(-84.3, -75.5, n)
+    lat = rng.uniform(33.8, 36.6, n)
+    props = {
+        "final_name": [f"Place {i}" for i in range(n)],
+        "place": rng.choice(["city", "town", "village", "hamlet"], n).tolist(),
+        "population": rng.integers(0, 100_000, n),
+    }
+    compact = columnar_points.dumps_points(lon, lat, props)
+    geojson = geojson_writer.dumps_points(lon, lat, props, precision=5)
+    assert len(compact) * 3 < len(geojson)
+    assert json.loads(compact)["columns"]["place"]["kind"] == "dict"
+    # deltas fit an Int32Array
+    assert max(abs(v) for v in json.loads(compact)["x"]) < 2**31
@@ -0,0 +1,104 @@
+import pytest
+
+gpd = pytest.importorskip("geopandas")
+np = pytest.importorskip("numpy")
+from shapely.geometry import Point  # noqa: E402
+
+from scripts import fuzzy_dedupe  # noqa: E402
+
+
+def localities(rows):
+    cols = [
+        "osm_id",
+        "osm_type",
+        "final_name",
+        "place",
+        "population",
+        "geoid",
+        "lon",
+        "lat",
+    ]
+    df = gpd.GeoDataFrame([dict(zip(cols, r, strict=True)) for r in rows])
+    df["geometry"] = [
+        Point(lon, lat) for lon, lat in zip(df.pop("lon"), df.pop("lat"), strict=True)
+    ]
+    return df.set_geometry("geometry").set_crs("EPSG:4326")
+
+
+def test_normalize_name_expands_abbreviations():
+    assert fuzzy_dedupe.normalize_name("Mt. Airy") == "mount airy"
+    assert fuzzy_dedupe.normalize_name("  FT  Bragg ") == "fort bragg"
+    assert fuzzy_dedupe.normalize_name(None) == ""
+
+
+def test_neighbour_pairs_match_brute_force():
+    rng = np.random.default_rng(1)
+    x = rng.uniform(0, 5000, 800)
+    y = rng.uniform(0, 5000, 800)
+    i, j = fuzzy_dedupe.neighbour_pairs(x, y, 150.0)
+    found = {tuple(sorted(p)) for p in zip(i.tolist(), j.tolist(), strict=True)}
+    assert len(found) == len(i)
+
+    d = np.hypot(x[:, None] - x[None, :], y[:, None] - y[None, :])
+    a, b = np.nonzero(np.triu(d <= 150.0, k=1))
+    assert found == set(zip(a.tolist(), b.tolist(), strict=True))
+
+
+def test_fuzzy_dedupe_merges_nearby_similar_names():
+    out_geo = localities(
+        [
+            # way centre ~150 m from the node, spelled differently, with the population
+            (1, "node", "Mount Airy", "town", None, "3744620", -80.6073, 36.4993),
+            (2, "way", "Mt. Airy", "town", "10688", None, -80.6060, 36.5003),
+            # same name but far away: a different place
+            (3, "node", "Mount Airy", "hamlet", None, None, -78.0, 35.0),
+            # mineral site repeating an OSM hamlet
+            (4, "node", "Hiddenite", "hamlet", None, None, -81.0900, 35.9000),
+            (5, "mineral_site", "Hiddenite", "emerald", "", "", -81.0905, 35.9004),
+            # nearby but differently named
+            (6, "node", "Dobson", "town", None, None, -80.6065, 36.4995),
+            # unnamed points are never merged
+            (7, "node", None, "hamlet", None, None, -79.0, 35.5),
+            (8, "node", None, "hamlet", None, None, -79.0, 35.5001),
+        ]
+    )
+    merged = fuzzy_dedupe.fuzzy_dedupe(
+        out_geo, radius_m=250, population=np.array([np.nan, 10688] + [np.nan] * 6)
+    )
+    # The populated way wins; the node's GEOID is carried over
+    assert list(merged["osm_id"]) == [2, 3, 4, 6, 7, 8]
+    airy = merged[merged["osm_id"] == 2].iloc[0]
+    assert airy["population"] == "10688"
+    assert airy["geoid"] == "3744620"
+
+
+def test_zero_radius_disables_merging():
+    out_geo = localities(
+        [
+            (1, "node", "Apex", "town", None, None, -78.85, 35.73),
+            (2, "way", "Apex", "town", None, None, -78.8501, 35.7301),
+        ]
+    )
+    assert len(fuzzy_dedupe.fuzzy_dedupe(out_geo, radius_m=0)) == 2
+
+
+def test_distances_do_not_depend_on_absolute_longitude():
+    # 0.0023 deg of latitude (~254 m) apart, almost due north: not within 250 m
+    far = localities(
+        [
+            (1, "node", "Elk Park", "town", None, None, -81.9800, 36.1580),
+            (2, "way", "Elk Park", "town", None, None, -81.9801, 36.1603),
+        ]
+    )
+    assert len(fuzzy_dedupe.fuzzy_dedupe(far, radius_m=250)) == 2
+    # ~166 m apart north-south: within 200 m
+    near = localities(
+        [
+            (1, "node", "Elk Park", "town", None, None, -81.9800, 36.1580),
+            (2, "way", "Elk Park", "town", None, None, -81.9800, 36.1595),
+        ]
+    )
+    assert len(fuzzy_dedupe.fuzzy_dedupe(near, radius_m=200)) == 1
+    assert fuzzy_dedupe.pair_distances(
+        near.geometry.x.values, near.geometry.y.values, np.array([0]), np.array([1])
+    )[0] == pytest.approx(165.9, abs=0.5)
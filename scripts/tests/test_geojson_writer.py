@@ -0,0 +1,71 @@
+import io
+import json
+
+import pytest
+
+np = pytest.importorskip("numpy")
+gpd = pytest.importorskip("geopandas")
+from shapely.geometry import Point  # noqa: E402
+
+from scripts import geojson_writer  # noqa: E402
+
+
+def test_dumps_points_rounds_and_encodes_properties():
+    text = geojson_writer.dumps_points(
+        [-79.123456789, np.nan],
+        [35.5, 36.0],
+        {
+            "name": np.array(['Quote "Q"', None], dtype=object),
+            "n": np.array([1, 2]),
+            "pop": [np.int64(5), float("nan")],
+        },
+        precision=4,
+    )
+    fc = json.loads(text)
+    first, second = fc["features"]
+    assert first["geometry"]["coordinates"] == [-79.1235, 35.5]
+    assert first["properties"] == {"name": 'Quote "Q"', "n": 1, "pop": 5}
+    assert second["geometry"] is None
+    assert second["properties"] == {"name": None, "n": 2, "pop": None}
+
+
+def test_ndjson_writes_one_feature_per_line():
+    buf = io.StringIO()
+    geojson_writer.write_points(
+        buf, [1.0, 2.0, 3.0], [4.0, 5.0, 6.0], {"id": [1, 2, 3]}, ndjson=True
+    )
+    lines = buf.getvalue().splitlines()
+    assert [json.loads(line)["properties"]["id"] for line in lines] == [1, 2, 3]
+
+
+def test_write_points_gdf_round_trips_through_geopandas(tmp_path, monkeypatch):
+    monkeypatch.setattr(geojson_writer, "CHUNK_SIZE", 2)
+    chunk_sizes = []
+    real_chunks = geojson_writer._chunks
+
+    def recording_chunks(iterable, size=None):
+        for chunk in real_chunks(iterable, size):
+            chunk_sizes.append(len(chunk))
+            yield chunk
+
+    monkeypatch.setattr(geojson_writer, "_chunks", recording_chunks)
+    gdf = gpd.GeoDataFrame(
+        {
+            "osm_id": [1, 2, 3],
+            "final_name": ["Apex", "Cary", "Élan"],
+            "population": ["100", None, "7"],
+        },
+        geometry=[Point(-78.85, 35.73), Point(-78.78, 35.79), Point(-79.0, 35.5)],
+        crs="EPSG:4326",
+    )
+    path = geojson_writer.write_points_gdf(gdf, tmp_path / "places.geojson")
+    back = gpd.read_file(path)
+    assert list(back["final_name"]) == ["Apex", "Cary", "Élan"]
+    assert back.geometry.x.round(6).tolist() == [-78.85, -78.78, -79.0]
+    assert chunk_sizes == [2, 1]
+
+    lon, lat, props = geojson_writer.read_points(
+        geojson_writer.write_points_gdf(gdf, tmp_path / "p.geojsonl")
+    )
+    assert props["population"] == ["100", None, "7"]
+    assert lat.tolist() == [35.73, 35.79, 35.5]
@@ -0,0 +1,71 @@
+import pytest
+
+gpd = pytest.importorskip("geopandas")
+pytest.importorskip("pyarrow")
+from shapely.geometry import Point  # noqa: E402
+
+from scripts import geoparquet_io, osm_snapshot  # noqa: E402
+
+
+def places():
+    return gpd.GeoDataFrame(
+        {
+            "osm_id": [1, 2, 3, 4],
+            "osm_type": ["node", "node", "way", "node"],
+            "name": ["Murphy", "Manteo", "Raleigh", "Andrews"],
+            "population": ["1600", None, "480000", "1700"],
+            "tags": [
+                {"place": "town"},
+                {},
+                {"place": "city", "wikidata": "Q41087"},
+                None,
+            ],
+        },
+        geometry=[
+            Point(-84.03, 35.09),
+            Point(-75.67, 35.91),
+            Point(-78.64, 35.78),
+            Point(-83.82, 35.20),
+        ],
+        crs="EPSG:4326",
+    )
+
+
+def test_round_trip_keeps_rows_tags_and_crs(tmp_path):
+    path = tmp_path / "places.parquet"
+    geoparquet_io.write_geoparquet(places(), path, row_group_size=2)
+    back = geoparquet_io.read_geoparquet(path)
+
+    assert back.crs.to_epsg() == 4326
+    assert list(back.columns) == list(places().columns)
+    by_id = back.set_index("osm_id")
+    assert by_id.loc[3, "tags"] == {"place": "city", "wikidata": "Q41087"}
+    assert by_id.loc[4, "tags"] is None
+    # Hilbert order keeps the two westernmost towns next to each other
+    order = list(back["osm_id"])
+    assert abs(order.index(1) - order.index(4)) == 1
+
+
+def test_read_subset_of_columns_and_bbox(tmp_path):
+    path = tmp_path / "places.parquet"
+    geoparquet_io.write_geoparquet(places(), path, row_group_size=2)
+    west = geoparquet_io.read_geoparquet(
+        path, columns=["name"], bbox=(-85, 34, -83, 36)
+    )
+    assert list(west.columns) == ["name", "geometry"]
+    assert sorted(west["name"]) == ["Andrews", "Murphy"]
+
+
+def test_snapshot_store_uses_geoparquet(tmp_path):
+    store = osm_snapshot.SnapshotStore(tmp_path, "state_37")
+    osm = places()
+    store.save(
+        osm_snapshot.Snapshot(
+            "2026-01-01T00:00:00Z", osm, osm.drop(columns="tags"), "37:2025:4"
+        )
+    )
+    assert (store.dir / "osm.parquet").exists()
+
+    loaded = store.load()
+    assert loaded.census_signature == "37:2025:4"
+    assert sorted(loaded.osm["osm_id"]) == [1, 2, 3, 4]
@@ -0,0 +1,131 @@
+import json
+import os
+import time
+from pathlib import Path
+
+import pytest
+
+from scripts.http_cache import CacheMiss, ResponseCache
+
+
+class FakeResponse:
+    def __init__(self, status_code=200, body=b"", headers=None):
+        self.status_code = status_code
+        self.body = body
+        self.headers = headers or {}
+
+    def iter_content(self, chunk_size=1):
+        for i in range(0, len(self.body), chunk_size):
+            yield self.body[i : i + chunk_size]
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise RuntimeError(f"HTTP {self.status_code}")
+
+    def close(self):
+        pass
+
+
+class FakeSession:
+    def __init__(self, responses):
+        self.responses = list(responses)
+        self.calls = []
+
+    def request(self, method, url, **kwargs):
+        self.calls.append((method, url, kwargs))
+        return self.responses.pop(0)
+
+
+def test_fresh_entry_served_without_network(tmp_path: Path):
+    cache = ResponseCache(tmp_path)
+    body = json.dumps({"elements": []}).encode("utf8")
+    session = FakeSession([FakeResponse(200, body, {"ETag": '"v1"'})])
+
+    first = cache.fetch(session, "POST", "https://example.test/api", data="q", ttl=60)
+    second = cache.fetch(session, "POST", "https://example.test/api", data="q", ttl=60)
+
+    assert len(session.calls) == 1
+    assert not first.from_cache and second.from_cache
+    assert second.json() == {"elements": []}
+
+
+def test_stale_entry_revalidates_with_etag(tmp_path: Path):
+    cache = ResponseCache(tmp_path)
+    session = FakeSession(
+        [FakeResponse(200, b"zipbytes", {"ETag": '"v1"'}), FakeResponse(304)]
+    )
+    url = "https://example.test/tl_2025_37_place.zip"
+    cache.fetch(session, "GET", url, key_extra=2025, ttl=0)
+    entry = cache.fetch(session, "GET", url, key_extra=2025, ttl=0)
+
+    assert session.calls[1][2]["headers"]["If-None-Match"] == '"v1"'
+    assert entry.read_bytes() == b"zipbytes"
+    assert entry.path.suffix == ".zip"
+
+
+def test_key_includes_payload_and_year():
+    a = ResponseCache.key_for("GET", "https://x.test/a", extra=2024)
+    b = ResponseCache.key_for("GET", "https://x.test/a", extra=2025)
+    c = ResponseCache.key_for("POST", "https://x.test/a", data="q1")
+    d = ResponseCache.key_for("POST", "https://x.test/a", data="q2")
+    assert len({a, b, c, d}) == 4
+
+
+def test_offline_mode(tmp_path: Path):
+    online = ResponseCache(tmp_path)
+    online.fetch(FakeSession([FakeResponse(200, b"old")]), "GET", "https://x.test/a")
+
+    offline = ResponseCache(tmp_path, offline=True)
+    # Stale entries are still served offline
+    entry = offline.fetch(FakeSession([]), "GET", "https://x.test/a", ttl=0)
+    assert entry.read_bytes() == b"old"
+    with pytest.raises(CacheMiss):
+        offline.fetch(FakeSession([]), "GET", "https://x.test/missing")
+
+
+def test_lru_eviction_bounds_size(tmp_path: Path):
+    cache = ResponseCache(tmp_path, max_bytes=250)
+    for i in range(3):
+        cache.fetch(
+            FakeSession([FakeResponse(200, b"x" * 100)]), "GET", f"https://x.test/{i}"
+        )
+        # Make access order deterministic on coarse-mtime filesystems
+        meta = tmp_path / f"{cache.key_for('GET', f'https://x.test/{i}')}.meta.json"
+        os.utime(meta, (time.time() - 100 + i, time.time() - 100 + i))
+
+    assert not cache.has("GET", "https://x.test/0")
+    assert cache.has("GET", "https://x.test/1")
+    assert cache.has("GET", "https://x.test/2")
+
+
+def test_eviction_keeps_entries_in_use(tmp_path: Path):
+    cache = ResponseCache(tmp_path, max_bytes=150)
+    old = cache.fetch(
+        FakeSession([FakeResponse(200, b"o" * 100)]), "GET", "https://x.test/old"
+    )
+    os.utime(
+        tmp_path / f"{old.key}.meta.json", (time.time() - 3600, time.time() - 3600)
+    )
+    # census join bands built next to the old body counts towards the bound
+    (tmp_path / (old.path.name + ".census-bands.npz")).write_bytes(b"i" * 40)
+    # larger than the bound on its own: returned intact, the old entry goes
+    big = cache.fetch(
+        FakeSession([FakeResponse(200, b"b" * 200)]), "GET", "https://x.test/big"
+    )
+    assert big.read_bytes() == b"b" * 200
+    assert not cache.has("GET", "https://x.test/old")
+    assert sorted(p.name for p in tmp_path.iterdir()) == sorted(
+        [big.path.name, f"{big.key}.meta.json"]
+    )
+
+
+def test_json_bodies_are_not_mistaken_for_metadata(tmp_path: Path):
+    cache = ResponseCache(tmp_path, max_bytes=10_000)
+    entry = cache.fetch(
+        FakeSession([FakeResponse(200, b'{"a": 1}')]),
+        "GET",
+        "https://x.test/places.json",
+    )
+    assert entry.path.name == f"{entry.key}.json"
+    cache.evict()
+    assert cache.get(entry.key).json() == {"a": 1}
@@ -0,0 +1,136 @@
+import os
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip("requests")
+http_session = pytest.importorskip("scripts.http_session")
+
+
+def test_token_bucket_paces_requests():
+    limiter = http_session.HostLimiter(rate=20.0, burst=2)
+    t0 = time.monotonic()
+    for _ in range(6):
+        limiter.wait()
+    # two from the burst, then one every 50 ms
+    assert 0.18 <= time.monotonic() - t0 < 1.0
+
+
+def test_deferral_holds_back_every_thread():
+    limiter = http_session.HostLimiter()
+    limiter.defer(0.3)
+    started = []
+
+    def worker():
+        limiter.wait()
+        started.append(time.monotonic())
+
+    t0 = time.monotonic()
+    threads = [threading.Thread(target=worker) for _ in range(3)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert min(started) - t0 >= 0.29
+
+
+def test_parse_overpass_status():
+    text = (
+        "Connected as: 1\nCurrent time: 2024-05-01T10:00:00Z\nRate limit: 2\n"
+        "Slot available after: 2024-05-01T10:00:07Z, in 7 seconds.\n"
+        "Slot available after: 2024-05-01T10:00:03Z, in 3 seconds.\n"
+        "Currently running queries (pid, space limit, time limit, start time):\n"
+        "24551\t536870912\t180\t2024-05-01T09:59:58Z\n"
+    )
+    assert http_session.parse_overpass_status(text) == (2, 0, 3, 1)
+    assert http_session.parse_overpass_status(
+        "Rate limit: 2\n1 slots available now.\n"
+    ) == (2, 1, None, 0)
+    assert http_session.parse_overpass_status("Rate limit: 0\n") == (0, None, None, 0)
+
+
+@pytest.mark.parametrize("posix", [True, False])
+def test_slot_accounting_never_signals_this_process(monkeypatch, posix):
+    if not posix:
+        monkeypatch.setattr(http_session, "fcntl", None)
+    signalled = []
+    monkeypatch.setattr(http_session.os, "kill", lambda pid, sig: signalled.append(pid))
+    limiter = http_session.OverpassLimiter("http://overpass.test/api/status", None)
+    own = str(os.getpid())
+    limiter._state.update(lambda state: state.update(sending={own: 1}))
+
+    assert limiter.claim((2, 2, None, 0)) == 0
+    limiter.after_request()
+    assert limiter._state.update(lambda state: state["sending"]) == {own: 1}
+    assert signalled == []
+
+
+def test_retry_after_dates_and_deltas():
+    class Resp:
+        def __init__(self, value):
+            self.headers = {"Retry-After": value} if value else {}
+
+    assert http_session.retry_after_seconds(Resp("4")) == 4
+    assert http_session.retry_after_seconds(Resp(None)) is None
+    assert http_session.retry_after_seconds(Resp("Wed, 21 Oct 2015 07:28:00 GMT")) == 0
+
+
+def test_tiled_fetch_respects_overpass_slots(tmp_path: Path, monkeypatch):
+    pytest.importorskip("geopandas")
+    standin = pytest.importorskip("scripts.dev_tools.http_standin")
+    build = pytest.importorskip("scripts.build_nc_localities")
+    standin.synthesize(tmp_path / "fixtures", size=200)
+
+    # two slots, each busy for a moment after its query; eight tile workers
+    with standin.StandInServer(
+        tmp_path / "fixtures", latency=0.05, overpass_slots=2, slot_cooldown=0.3
+    ) as server:
+        monkeypatch.setattr(
+            build, "OVERPASS_URL", server.service_urls()["OVERPASS_URL"]
+        )
+        gdf = build.fetch_osm_places_tiled(
+            (-84.3, 33.8, -75.4, 36.6), tmp_path / "checkpoint", grid=3, max_workers=8
+        )
+        stats = server.stats()
+
+    assert len(gdf) == 200
+    assert stats["by_path"][standin.OVERPASS_INTERPRETER_PATH] == 9
+    assert "429" not in stats["by_status"]
+    assert stats["max_overpass_running"] <= 2
+    # one pool: far fewer connections than requests
+    assert stats["connections"] < stats["requests"]
+
+
+def test_every_session_keeps_the_pipeline_headers_and_hooks():
+    build = pytest.importorskip("scripts.build_nc_localities")
+    http_session.reset()
+    build.get_requests_session(total_retries=1)
+    session = build.get_requests_session()
+    assert session.headers["User-Agent"] == build.HEADERS["User-Agent"]
+    assert session.hooks["response"] == [build.run_metrics.count_response_bytes]
+    assert http_session.get_session() is not session
+
+
+def _paced_times(n):
+    http_session.reset()
+    limiter = http_session.limiter_for("https://nominatim.example/search")
+    times = []
+    for _ in range(n):
+        limiter.wait()
+        times.append(time.time())
+    return times
+
+
+def test_shared_limits_hold_across_worker_processes(monkeypatch):
+    multiprocessing = pytest.importorskip("multiprocessing")
+    if http_session.fcntl is None:
+        pytest.skip("limits are per process without fcntl")
+    monkeypatch.setitem(http_session.HOST_LIMITS, "nominatim.example", (5.0, 1))
+    with http_session.shared_limits():
+        with multiprocessing.get_context("fork").Pool(3) as pool:
+            times = sorted(t for ts in pool.map(_paced_times, [3, 3, 3]) for t in ts)
+    # nine requests from three processes, still no more than five per second
+    # (per-process limits would finish in about 0.4s)
+    assert times[-1] - times[0] >= 8 * 0.2 - 0.05
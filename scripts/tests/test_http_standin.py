@@ -0,0 +1,104 @@
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip("geopandas")
+pytest.importorskip("requests")
+standin = pytest.importorskip("scripts.dev_tools.http_standin")
+build = pytest.importorskip("scripts.build_nc_localities")
+
+
+@pytest.fixture(scope="module")
+def fixture_dir(tmp_path_factory):
+    path = tmp_path_factory.mktemp("fixtures")
+    standin.synthesize(path, size=500, seed=3)
+    return path
+
+
+def point_pipeline_at(monkeypatch, server):
+    for name, url in server.service_urls().items():
+        monkeypatch.setattr(build, name, url)
+
+
+def test_fetches_replay_through_injected_errors(fixture_dir: Path, monkeypatch):
+    # every path fails once (429, then 504) before the fixture is served
+    with standin.StandInServer(fixture_dir, fail_first=1, retry_after=0) as server:
+        point_pipeline_at(monkeypatch, server)
+        state = build.fetch_state_polygon("North Carolina")
+        osm = build.fetch_osm_places(
+            bbox=build.geojson_to_overpass_bbox(state["geojson"])
+        )
+        census = build.fetch_census_places("37", 2025)
+        stats = server.stats()
+
+    assert state["osm_type"] == "relation"
+    assert len(osm) == 500
+    assert len(census) == 500 // 40
+    assert stats["by_status"]["429"] == 3
+    fixture_paths = [p for p in stats["by_path"] if p != standin.OVERPASS_STATUS_PATH]
+    assert {stats["by_path"][p] for p in fixture_paths} == {2}
+    assert stats["bytes_sent"] > 0
+
+
+def test_cached_fetches_revalidate_with_etag(
+    fixture_dir: Path, tmp_path: Path, monkeypatch
+):
+    http_cache = pytest.importorskip("scripts.http_cache")
+    cache = http_cache.ResponseCache(tmp_path / "cache")
+    monkeypatch.setattr(build, "NOMINATIM_CACHE_TTL", 0)  # always revalidate
+    with standin.StandInServer(fixture_dir) as server:
+        point_pipeline_at(monkeypatch, server)
+        first = build.fetch_state_polygon("North Carolina", cache=cache)
+        second = build.fetch_state_polygon("North Carolina", cache=cache)
+        stats = server.stats()
+    assert first == second
+    assert stats["by_status"] == {"200": 1, "304": 1}
+
+
+def test_record_then_replay(fixture_dir: Path, tmp_path: Path, monkeypatch):
+    recorded = tmp_path / "recorded"
+    with standin.StandInServer(fixture_dir) as upstream:
+        # the "real" services are another stand-in
+        for prefix, (env, path, _) in standin.SERVICES.items():
+            monkeypatch.setitem(
+                standin.SERVICES, prefix, (env, path, upstream.url + prefix)
+            )
+        with standin.StandInServer(recorded, record=True) as proxy:
+            point_pipeline_at(monkeypatch, proxy)
+            live = build.fetch_state_polygon("North Carolina")
+            assert build.probe_census_years("37", [2025, 2024]) == 2025
+
+    with standin.StandInServer(recorded, latency=0.01, bandwidth=1 << 20) as replay:
+        point_pipeline_at(monkeypatch, replay)
+        assert build.fetch_state_polygon("North Carolina") == live
+        assert len(build.fetch_census_places("37", 2025)) == 500 // 40
+        assert replay.stats()["by_status"] == {"200": 2}
+    entries = json.loads((recorded / standin.FIXTURES_FILE).read_text(encoding="utf8"))[
+        "fixtures"
+    ]
+    assert {(e["method"], e["status"]) for e in entries} == {("GET", 200), ("GET", 404)}
+
+
+def test_service_urls_come_from_the_environment():
+    env = {
+        **os.environ,
+        "NOMINATIM_URL": "http://127.0.0.1:1/nominatim/search",
+        "CENSUS_BASE": "http://127.0.0.1:1/census",
+    }
+    code = "from scripts import build_nc_localities as b; print(b.NOMINATIM_URL, b.census_place_url('37', 2025))"
+    out = subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=Path(__file__).resolve().parents[2],
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout.split()
+    assert out == [
+        "http://127.0.0.1:1/nominatim/search",
+        "http://127.0.0.1:1/census/TIGER2025/PLACE/tl_2025_37_place.zip",
+    ]
@@ -0,0 +1,46 @@
+import gzip
+import json
+
+import pytest
+
+map_assets = pytest.importorskip("scripts.map_assets")
+
+
+def test_write_hashed_names_by_content_and_precompresses(tmp_path):
+    data = json.dumps({"type": "FeatureCollection", "features": []})
+    path = map_assets.write_hashed(data, tmp_path / "data", "localities")
+    assert path.name == f"localities.{map_assets.content_hash(data.encode())}.json"
+    assert path.read_text(encoding="utf8") == data
+    assert (
+        gzip.decompress(path.with_name(path.name + ".gz").read_bytes()).decode() == data
+    )
+    if map_assets.brotli is not None:
+        br = path.with_name(path.name + ".br").read_bytes()
+        assert map_assets.brotli.decompress(br).decode() == data
+
+
+def test_write_hashed_keeps_unchanged_and_prunes_old(tmp_path):
+    first = map_assets.write_hashed("[1]", tmp_path, "localities")
+    mtime = first.stat().st_mtime_ns
+    assert map_assets.write_hashed("[1]", tmp_path, "localities") == first
+    assert first.stat().st_mtime_ns == mtime
+
+    other = map_assets.write_hashed("[1]", tmp_path, "minerals")
+    second = map_assets.write_hashed("[2]", tmp_path, "localities")
+    names = sorted(p.name for p in tmp_path.iterdir())
+    assert not first.exists()
+    assert second.exists() and other.exists()
+    assert all(n.startswith((second.name, other.name)) for n in names)
+
+
+def test_copy_page_brings_referenced_data(tmp_path):
+    src = tmp_path / "out"
+    data = map_assets.write_hashed("[1]", src / "data", "localities")
+    page = src / "map.html"
+    page.write_text(f'<script>fetch("data/{data.name}")</script>', encoding="utf8")
+
+    dest = map_assets.copy_page(page, tmp_path / "site" / "map.html")
+    assert dest.read_text(encoding="utf8") == page.read_text(encoding="utf8")
+    copied = tmp_path / "site" / "data" / data.name
+    assert copied.read_text(encoding="utf8") == "[1]"
+    assert copied.with_name(copied.name + ".gz").exists()
@@ -56,3 +56,21 @@ def test_merge_and_export_produces_files(tmp_path: Path):
     gj = json.loads((outdir / "nc_localities.geojson").read_text(encoding="utf8"))
     assert gj["type"] == "FeatureCollection"
     assert len(gj["features"]) >= 1
+
+
+def test_formats_selects_exports(tmp_path: Path):
+    outdir = tmp_path / "output"
+    outdir.mkdir(parents=True)
+    out_geo = build.prepare_out_geo(make_osm_gdf(tmp_path), make_census_gdf(tmp_path))
+    written = build.write_exports_and_map(
+        out_geo, outdir, update_site=False, formats=["csv", "geojson"]
+    )
+    assert sorted(written) == ["csv", "geojson"]
+    assert not (outdir / "nc_localities_shp").exists()
+    assert not (outdir / "nc_localities_map.html").exists()
+
+
+def test_formats_flag_rejects_unknown_names():
+    assert build.parse_args(["--formats", "csv,shp"]).formats == ["csv", "shp"]
+    with pytest.raises(SystemExit):
+        build.parse_args(["--formats", "csv,kml"])
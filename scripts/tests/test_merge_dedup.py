@@ -41,3 +41,29 @@ def test_merge_removes_duplicates(tmp_path: Path):
     gj = json.loads((outdir / "nc_localities.geojson").read_text(encoding="utf8"))
     # should dedupe into 1 feature
     assert len(gj["features"]) == 1
+
+
+def test_dedupe_keeps_numerically_largest_population():
+    gpd = pytest.importorskip("geopandas")
+    from shapely.geometry import Point
+
+    out_geo = gpd.GeoDataFrame(
+        {
+            "osm_id": [1, 2, 3, 4],
+            "osm_type": ["node"] * 4,
+            "final_name": ["Mount Airy", " mount  airy", "Mount Airy", "Dobson"],
+            "place": ["town"] * 4,
+            "population": ["900", "10,688", None, "1500"],
+            "geoid": [None] * 4,
+        },
+        geometry=[
+            Point(-80.6, 36.5),
+            Point(-80.6, 36.5),
+            Point(-80.6, 36.5),
+            Point(-80.6, 36.5),
+        ],
+        crs="EPSG:4326",
+    )
+    deduped = build.dedupe_localities(out_geo)
+    # "10,688" beats "900" numerically even though it sorts lower as a string
+    assert sorted(deduped["osm_id"]) == [2, 4]
@@ -0,0 +1,66 @@
+from pathlib import Path
+
+import pytest
+
+osmium = pytest.importorskip("osmium")
+build = pytest.importorskip("scripts.build_nc_localities")
+pytest.importorskip("geopandas")
+from osmium.osm.mutable import Node, Relation, Way  # noqa: E402
+
+from scripts import osm_pbf  # noqa: E402
+
+
+def write_extract(path: Path):
+    writer = osmium.SimpleWriter(str(path))
+    writer.add_node(
+        Node(id=1, location=(-79.0, 35.5), tags={"place": "town", "name": "Pittsboro"})
+    )
+    writer.add_node(Node(id=2, location=(-78.0, 35.0)))
+    writer.add_node(Node(id=3, location=(-78.2, 35.4)))
+    writer.add_node(Node(id=4, location=(-77.0, 36.0)))
+    writer.add_way(
+        Way(id=10, nodes=[2, 3, 4, 2], tags={"place": "village", "name": "Loop"})
+    )
+    writer.add_way(Way(id=11, nodes=[2, 4]))
+    writer.add_way(Way(id=12, nodes=[3, 4], tags={"highway": "road"}))
+    writer.add_relation(
+        Relation(
+            id=20,
+            members=[("w", 11, "outer"), ("n", 1, "label")],
+            tags={"place": "city", "name": "Metro", "population": "5000"},
+        )
+    )
+    writer.close()
+
+
+def test_bbox_centers_in_bulk():
+    cx, cy = osm_pbf.bbox_centers([0, 2, 10, 10, 12], [0, 4, 1, 3, 2], [0, 2, 5])
+    assert list(cx) == [1.0, 11.0]
+    assert list(cy) == [2.0, 2.0]
+
+
+def test_only_place_ways_and_relation_members_are_read(tmp_path: Path):
+    pbf = tmp_path / "state.osm.pbf"
+    write_extract(pbf)
+    relations, member_ways, place_ways = osm_pbf._read_place_relations(pbf)
+    assert [r[0] for r in relations] == [20]
+    assert (member_ways, place_ways) == ({11}, {10})
+
+    read, member_coords, _ = osm_pbf._read_ways(pbf, member_ways, member_ways)
+    assert read == []  # way 10 is tagged place but was not asked for
+    assert member_coords == {11: [(-78.0, 35.0), (-77.0, 36.0)]}
+
+
+@pytest.mark.parametrize("parallel", [False, True])
+def test_pbf_places_match_overpass_schema(tmp_path: Path, parallel):
+    pbf = tmp_path / "state.osm.pbf"
+    write_extract(pbf)
+    gdf = build.load_osm_places_from_pbf(pbf, parallel=parallel)
+
+    assert list(gdf.columns) == build.OSM_COLUMNS
+    rows = {r.osm_type: r for r in gdf.itertuples()}
+    assert rows["node"].name == "Pittsboro"
+    # Ways/relations sit at the centre of their bounding box, like Overpass "out center"
+    assert (rows["way"].geometry.x, rows["way"].geometry.y) == (-77.6, 35.5)
+    assert (rows["relation"].geometry.x, rows["relation"].geometry.y) == (-78.0, 35.5)
+    assert rows["relation"].population == "5000"
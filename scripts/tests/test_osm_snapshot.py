@@ -0,0 +1,127 @@
+from pathlib import Path
+
+import pytest
+
+build = pytest.importorskip("scripts.build_nc_localities")
+gpd = pytest.importorskip("geopandas")
+from shapely.geometry import Point  # noqa: E402
+
+from scripts import osm_snapshot  # noqa: E402
+
+
+def places(*rows):
+    data = [
+        {
+            "osm_id": osm_id,
+            "osm_type": "node",
+            "name": name,
+            "place": "town",
+            "population": "10",
+            "tags": {"name": name},
+            "geometry": Point(lon, 35.5),
+        }
+        for osm_id, name, lon in rows
+    ]
+    if not data:
+        return build.empty_osm_gdf()
+    return gpd.GeoDataFrame(data, geometry="geometry", crs="EPSG:4326")
+
+
+def test_apply_changes_upserts_and_deletes():
+    base = places((1, "Apex", -78.8), (2, "Cary", -78.7), (3, "Gone", -78.6))
+    changed = places((2, "Cary Town", -78.7), (4, "New", -78.5))
+    current = {("node", 1), ("node", 2), ("node", 4)}
+    updated, affected = osm_snapshot.apply_changes(base, changed, current)
+    assert sorted(updated["osm_id"]) == [1, 2, 4]
+    assert updated.set_index("osm_id").loc[2, "name"] == "Cary Town"
+    assert sorted(affected) == [("node", 2), ("node", 3), ("node", 4)]
+
+
+def test_refresh_only_rejoins_changed_rows(tmp_path: Path, monkeypatch):
+    monkeypatch.setattr(build, "fetch_census_for_state", lambda args, cache=None: None)
+    monkeypatch.setattr(
+        build,
+        "fetch_osm_for_state",
+        lambda args, cache=None: places((1, "Apex", -78.8), (2, "Cary", -78.7)),
+    )
+    monkeypatch.setattr(
+        build,
+        "fetch_osm_changes_for_state",
+        lambda args, since, cache=None: (
+            places((3, "Holly Springs", -78.9)),
+            {("node", 1), ("node", 3)},
+        ),
+    )
+    joined_sizes = []
+    real_join = build.join_census
+
+    def recording_join(osm_gdf, census_gdf, *args):
+        joined_sizes.append(len(osm_gdf))
+        return real_join(osm_gdf, census_gdf, *args)
+
+    monkeypatch.setattr(build, "join_census", recording_join)
+    args = build.parse_args(
+        ["--output-dir", str(tmp_path), "--snapshot-dir", str(tmp_path / "snap")]
+    )
+
+    first = build.refresh_from_snapshot(args, tmp_path)
+    assert sorted(first["final_name"]) == ["Apex", "Cary"]
+
+    second = build.refresh_from_snapshot(args, tmp_path)
+    assert sorted(second["final_name"]) == ["Apex", "Holly Springs"]
+    assert joined_sizes == [2, 1]
+
+    snapshot = osm_snapshot.SnapshotStore(tmp_path / "snap", "state_37").load()
+    assert sorted(snapshot.osm["osm_id"]) == [1, 3]
+
+
+def test_snapshot_timestamp_is_the_overpass_database_time(tmp_path: Path, monkeypatch):
+    monkeypatch.setattr(build, "fetch_census_for_state", lambda args, cache=None: None)
+    full = build.with_osm_base(places((1, "Apex", -78.8)), "2026-03-01T12:00:00Z")
+    monkeypatch.setattr(build, "fetch_osm_for_state", lambda args, cache=None: full)
+    asked = []
+
+    def changes(args, since, cache=None):
+        asked.append(since)
+        return build.with_osm_base(places(), "2026-03-02T08:30:00Z"), {("node", 1)}
+
+    monkeypatch.setattr(build, "fetch_osm_changes_for_state", changes)
+    args = build.parse_args(
+        ["--output-dir", str(tmp_path), "--snapshot-dir", str(tmp_path / "snap")]
+    )
+    store = osm_snapshot.SnapshotStore(tmp_path / "snap", "state_37")
+
+    build.refresh_from_snapshot(args, tmp_path)
+    assert store.load().timestamp == "2026-03-01T12:00:00Z"
+    build.refresh_from_snapshot(args, tmp_path)
+    assert asked == ["2026-03-01T12:00:00Z"]
+    assert store.load().timestamp == "2026-03-02T08:30:00Z"
+
+
+def test_changes_refuse_a_partial_id_list(monkeypatch):
+    complete = {"osm3s": {"timestamp_osm_base": "2024-05-01T00:00:00Z"}}
+    partial = {
+        "elements": [{"type": "node", "id": 1}],
+        "remark": 'runtime error: Query timed out in "query" at line 1',
+    }
+
+    class Session:
+        def __init__(self, *bodies):
+            self.bodies = list(bodies)
+
+        def post(self, url, data, timeout):
+            body = self.bodies.pop(0)
+
+            class Response:
+                def raise_for_status(self):
+                    pass
+
+                def json(self):
+                    return body
+
+            return Response()
+
+    for session in (Session(complete, partial), Session(partial)):
+        monkeypatch.setattr(build, "get_requests_session", lambda s=session: s)
+        with pytest.raises(RuntimeError, match="partial result"):
+            build.fetch_osm_changes(["area"], "2024-04-01T00:00:00Z")
@@ -0,0 +1,53 @@
+import pytest
+
+shapely = pytest.importorskip("shapely")
+gpd = pytest.importorskip("geopandas")
+from shapely.geometry import MultiPolygon, Point, mapping  # noqa: E402
+
+from scripts import overpass_area  # noqa: E402
+
+
+def detailed_state():
+    # A 4000-vertex "mainland" plus a chain of small barrier islands
+    mainland = Point(-79.0, 35.5).buffer(1.5, quad_segs=1000)
+    islands = [
+        Point(-76.0 + i * 0.02, 35.0).buffer(0.005, quad_segs=16) for i in range(40)
+    ]
+    return MultiPolygon([mainland, *islands])
+
+
+def test_simplified_area_meets_budget_and_covers_boundary():
+    geom = detailed_state()
+    parts = overpass_area.simplify_to_budget(geom, max_vertices=200, max_parts=4)
+    assert overpass_area.vertex_count(parts) <= 200
+    assert len(parts) <= 4
+    covering = shapely.union_all(parts)
+    assert covering.contains(geom)
+
+
+def test_overpass_polys_use_lat_lon_order():
+    square = {
+        "type": "Polygon",
+        "coordinates": [[[-80, 35], [-79, 35], [-79, 36], [-80, 36], [-80, 35]]],
+    }
+    (poly,) = overpass_area.overpass_polys_from_geojson(square)
+    assert poly.split()[:2] == ["35.000000", "-80.000000"]
+    assert len(poly.split()) == 8
+
+
+def test_clip_to_polygon_culls_outside_points():
+    gdf = gpd.GeoDataFrame(
+        {"osm_id": [1, 2, 3]},
+        geometry=[Point(-79.0, 35.5), Point(-70.0, 35.5), Point(-79.0, 34.0)],
+        crs="EPSG:4326",
+    )
+    clipped = overpass_area.clip_to_polygon(gdf, detailed_state())
+    assert list(clipped["osm_id"]) == [1, 3]
+
+
+def test_polygon_query_and_multipolygon_legacy_string():
+    build = pytest.importorskip("scripts.build_nc_localities")
+    query = build.overpass_place_query(['poly:"35 -80 36 -80 36 -79"'])
+    assert query.count('(poly:"35 -80 36 -80 36 -79")') == 3
+    legacy = build.polygon_to_overpass_poly(mapping(detailed_state()))
+    assert legacy.split()[:2] == ["35.5", str(-79.0 + 1.5)]
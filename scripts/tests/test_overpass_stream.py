@@ -0,0 +1,75 @@
+import json
+
+import pytest
+
+from scripts.overpass_stream import iter_elements, iter_place_batches
+
+RESPONSE = {
+    "version": 0.6,
+    "generator": "Overpass API",
+    "osm3s": {
+        "timestamp_osm_base": "2026-03-01T12:00:00Z",
+        "copyright": "The data included in this document is from www.openstreetmap.org.",
+    },
+    "elements": [
+        {
+            "type": "node",
+            "id": 1,
+            "lat": 35.5,
+            "lon": -79.0,
+            "tags": {"name": "Siler City", "place": "town"},
+        },
+        {
+            "type": "way",
+            "id": 2,
+            "center": {"lat": 35.7, "lon": -78.6},
+            "tags": {"name": "Raleigh ]}", "place": "city", "population": "467665"},
+        },
+        {"type": "relation", "id": 3, "tags": {"name": "No Center", "place": "hamlet"}},
+        {
+            "type": "node",
+            "id": 4,
+            "lat": 36.1,
+            "lon": -80.2,
+            "tags": {"name": "Ünïcode", "place": "village"},
+        },
+    ],
+}
+
+
+def chunked(data: bytes, size: int):
+    return [data[i : i + size] for i in range(0, len(data), size)]
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 64, 1 << 20])
+def test_iter_elements_across_chunk_boundaries(chunk_size):
+    raw = json.dumps(RESPONSE, ensure_ascii=False).encode("utf8")
+    header = {}
+    elements = list(iter_elements(chunked(raw, chunk_size), header))
+    assert elements == RESPONSE["elements"]
+    assert header == {"timestamp_osm_base": "2026-03-01T12:00:00Z"}
+
+
+def test_iter_elements_rejects_truncated_response():
+    raw = json.dumps(RESPONSE).encode("utf8")[:-40]
+    with pytest.raises(ValueError):
+        list(iter_elements([raw]))
+
+
+def test_place_batches_are_bounded_and_skip_missing_coords():
+    batches = list(iter_place_batches(RESPONSE["elements"], batch_size=2))
+    assert [len(b["osm_id"]) for b in batches] == [2, 1]
+    assert list(batches[0]["osm_id"]) == [1, 2]
+    assert batches[0]["lon"][1] == -78.6
+    assert batches[0]["population"][1] == "467665"
+    assert batches[1]["name"][0] == "Ünïcode"
+
+
+def test_osm_places_from_batches_matches_schema():
+    build = pytest.importorskip("scripts.build_nc_localities")
+    pytest.importorskip("geopandas")
+    gdf = build.osm_places_from_batches(iter_place_batches(RESPONSE["elements"], 2))
+    assert list(gdf.columns) == build.OSM_COLUMNS
+    assert len(gdf) == 3
+    assert gdf.crs.to_epsg() == 4326
+    assert gdf.geometry.iloc[0].x == -79.0
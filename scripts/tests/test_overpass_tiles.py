@@ -0,0 +1,107 @@
+import asyncio
+from pathlib import Path
+
+import pytest
+
+from scripts import overpass_tiles
+from scripts.overpass_tiles import (
+    Tile,
+    TileCheckpoint,
+    TileTooLarge,
+    fetch_tiles,
+    grid_tiles,
+)
+
+BOUNDS = (-84.0, 34.0, -76.0, 36.0)
+
+
+def node(i):
+    return {
+        "type": "node",
+        "id": i,
+        "lat": 35.0,
+        "lon": -79.0,
+        "tags": {"place": "town"},
+    }
+
+
+def test_grid_covers_bounds():
+    tiles = grid_tiles(BOUNDS, rows=2)
+    assert len(tiles) == 4
+    assert min(t.west for t in tiles) == -84.0 and max(t.north for t in tiles) == 36.0
+
+
+def test_too_large_tiles_are_subdivided_and_results_deduped():
+    calls = []
+
+    def fetch(tile):
+        calls.append(tile)
+        if tile.depth == 0:
+            raise TileTooLarge("runtime error: Query timed out")
+        # A way crossing the quadrant boundary is returned by every quadrant
+        return [{"type": "way", "id": 99}, node(len(calls))]
+
+    elements = fetch_tiles([Tile(34, -84, 36, -76)], fetch, max_workers=2)
+    assert len(calls) == 5
+    assert sum(1 for e in elements if e["type"] == "way") == 1
+    assert len(elements) == 5
+
+
+def test_element_cap_triggers_split():
+    def fetch(tile):
+        return [node(i) for i in range(3 if tile.depth == 0 else 1)]
+
+    elements = fetch_tiles([Tile(34, -84, 36, -76)], fetch, element_limit=3)
+    assert len(elements) == 1  # every quadrant returned node 0
+
+
+def test_interrupted_run_resumes_from_checkpoint(tmp_path: Path):
+    tiles = grid_tiles(BOUNDS, rows=2)
+    flaky = tiles[2]
+    checkpoint = TileCheckpoint(tmp_path, overpass_tiles.query_signature(BOUNDS, 2))
+
+    def first(tile):
+        if tile == flaky:
+            raise ConnectionError("reset by peer")
+        checkpoint.note_osm_base("2026-03-01T12:00:00Z")
+        return [node(tiles.index(tile))]
+
+    with pytest.raises(RuntimeError, match="Re-run to resume"):
+        fetch_tiles(tiles, first, checkpoint=checkpoint, retries=1, backoff=0)
+
+    refetched = []
+    checkpoint = TileCheckpoint(tmp_path, overpass_tiles.query_signature(BOUNDS, 2))
+
+    def second(tile):
+        refetched.append(tile)
+        checkpoint.note_osm_base("2026-03-02T08:30:00Z")
+        return [node(tiles.index(tile))]
+
+    elements = fetch_tiles(tiles, second, checkpoint=checkpoint)
+    assert refetched == [flaky]
+    assert sorted(e["id"] for e in elements) == [0, 1, 2, 3]
+    # the resumed tiles are as old as the first run's responses
+    assert checkpoint.osm_base() == "2026-03-01T12:00:00Z"
+
+
+def test_async_fetch_subdivides_and_bounds_concurrency():
+    running = []
+    peak = []
+
+    async def fetch(tile):
+        running.append(tile)
+        peak.append(len(running))
+        call = len(peak)
+        await asyncio.sleep(0.01)
+        running.remove(tile)
+        if tile.depth == 0:
+            raise TileTooLarge("runtime error: Query timed out")
+        return [{"type": "way", "id": 99}, node(call)]
+
+    tiles = grid_tiles(BOUNDS, rows=2)
+    elements = asyncio.run(
+        overpass_tiles.fetch_tiles_async(tiles, fetch, max_concurrent=3)
+    )
+    assert len(peak) == 4 + 16
+    assert max(peak) == 3
+    assert len(elements) == 17
@@ -0,0 +1,77 @@
+import json
+import pstats
+from pathlib import Path
+
+import pytest
+
+run_metrics = pytest.importorskip("scripts.run_metrics")
+
+
+def test_stage_records_rows_and_errors(tmp_path):
+    recorder = run_metrics.Recorder(profile_dir=tmp_path / "profiles")
+    previous = run_metrics.activate(recorder)
+    try:
+        with run_metrics.stage("join", rows_in=10) as st:
+            st.rows_out = 7
+        with pytest.raises(RuntimeError):
+            with run_metrics.stage("broken"):
+                raise RuntimeError("boom")
+
+        @run_metrics.timed("fetch")
+        def fetch():
+            return [1, 2, 3]
+
+        assert fetch() == [1, 2, 3]
+    finally:
+        run_metrics.activate(previous)
+
+    by_name = {r["name"]: r for r in recorder.records}
+    assert (by_name["join"]["rows_in"], by_name["join"]["rows_out"]) == (10, 7)
+    assert by_name["broken"]["error"] == "RuntimeError: boom"
+    assert by_name["fetch"]["rows_out"] == 3
+    assert all(r["wall_s"] >= 0 and r["cpu_s"] >= 0 for r in recorder.records)
+    pstats.Stats(by_name["join"]["profile"])  # a loadable cProfile dump
+
+    path = recorder.write(tmp_path / "run_metrics.json", argv=["--x"])
+    data = json.loads(path.read_text(encoding="utf8"))
+    assert data["argv"] == ["--x"]
+    assert [s["name"] for s in data["stages"]] == ["join", "broken", "fetch"]
+    # ru_maxrss is a lifetime high-water mark: only the run total carries it
+    assert "peak_rss_bytes" in data["total"]
+    assert not any("peak_rss_bytes" in s for s in data["stages"])
+    assert "join" in recorder.summary()
+
+
+def test_stages_without_recorder_are_noops():
+    assert run_metrics.active() is None
+    with run_metrics.stage("anything") as st:
+        st.rows_out = 1
+
+
+def test_collect_returns_worker_records():
+    def work(n):
+        with run_metrics.stage("inner", rows_in=n):
+            return n * 2
+
+    result, records = run_metrics.collect(work, 4)
+    assert result == 8
+    assert [r["name"] for r in records] == ["inner"]
+    assert run_metrics.active() is None
+
+
+def test_pipeline_writes_run_metrics(tmp_path: Path):
+    pytest.importorskip("geopandas")
+    build = pytest.importorskip("scripts.build_nc_localities")
+    outdir = tmp_path / "output"
+    build.main(
+        ["--output-dir", str(outdir), "--use-sample", "--formats", "csv", "--profile"]
+    )
+    data = json.loads((outdir / "run_metrics.json").read_text(encoding="utf8"))
+    assert data["status"] == "ok"
+    stages = {s["name"]: s for s in data["stages"]}
+    assert {"census_join", "dedupe", "export:csv"} <= set(stages)
+    assert (
+        stages["export:csv"]["bytes_written"]
+        == (outdir / "nc_localities.csv").stat().st_size
+    )
+    assert (outdir / "profiles" / "export_csv.prof").exists()
@@ -0,0 +1,113 @@
+import gzip
+import struct
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from scripts import vector_tiles  # noqa: E402
+
+
+def test_tile_ids_follow_the_pmtiles_hilbert_order():
+    assert vector_tiles.zxy_to_tileid(0, 0, 0) == 0
+    assert [
+        vector_tiles.zxy_to_tileid(1, x, y) for x, y in [(0, 0), (0, 1), (1, 1), (1, 0)]
+    ] == [1, 2, 3, 4]
+    z = 4
+    n = 1 << z
+    ids = {
+        vector_tiles.zxy_to_tileid(z, x, y): (x, y) for x in range(n) for y in range(n)
+    }
+    first = ((1 << 2 * z) - 1) // 3
+    assert sorted(ids) == list(range(first, first + n * n))
+    # consecutive ids are neighbouring tiles
+    for tid in range(first, first + n * n - 1):
+        (x1, y1), (x2, y2) = ids[tid], ids[tid + 1]
+        assert abs(x1 - x2) + abs(y1 - y2) == 1
+
+
+def test_thinning_keeps_one_point_per_cell_preferring_priority():
+    px = np.array([10, 20, 30, 3000])
+    py = np.array([10, 20, 30, 3000])
+    keep = vector_tiles.thin(
+        np.zeros(4, dtype=np.int64), px, py, np.array([1.0, 5.0, 2.0, 0.0]), cell=256
+    )
+    assert keep.tolist() == [1, 3]
+
+
+def read_archive(path):
+    data = path.read_bytes()
+    assert data[:7] == b"PMTiles" and data[7] == 3
+    fields = struct.unpack_from("<11Q", data, 8)
+    return data, dict(
+        zip(
+            [
+                "root_offset",
+                "root_length",
+                "meta_offset",
+                "meta_length",
+                "leaf_offset",
+                "leaf_length",
+                "data_offset",
+                "data_length",
+                "addressed",
+                "entries",
+                "contents",
+            ],
+            fields,
+            strict=True,
+        )
+    )
+
+
+def test_build_pmtiles_writes_a_readable_archive(tmp_path):
+    rng = np.random.default_rng(0)
+    n = 500
+    lon = rng.uniform(-84, -75, n)
+    lat = rng.uniform(33.8, 36.6, n)
+    props = {"final_name": [f"Place {i}" for i in range(n)], "osm_id": np.arange(n)}
+    path = vector_tiles.build_pmtiles(
+        tmp_path / "places.pmtiles", lon, lat, props, max_zoom=6, max_workers=1
+    )
+    data, header = read_archive(path)
+    assert header["root_offset"] == vector_tiles.HEADER_SIZE
+    assert header["data_offset"] + header["data_length"] == len(data)
+    meta = gzip.decompress(
+        data[header["meta_offset"] : header["meta_offset"] + header["meta_length"]]
+    )
+    assert b'"osm_id": "Number"' in meta
+    # One z0 tile plus at least one tile per further zoom
+    assert header["addressed"] >= 7
+
+
+def test_tiles_decode_with_reference_libraries(tmp_path):
+    mvt = pytest.importorskip("mapbox_vector_tile")
+    reader = pytest.importorskip("pmtiles.reader")
+
+    lon = np.array([-78.6382, -78.6390, -80.0])
+    lat = np.array([35.7796, 35.7800, 36.0])
+    props = {
+        "final_name": ["Raleigh", "Oakwood", None],
+        "population": ["480000", None, "5"],
+    }
+    priority = vector_tiles.place_priority(
+        ["city", "suburb", "town"], props["population"]
+    )
+    path = vector_tiles.build_pmtiles(
+        tmp_path / "nc.pmtiles",
+        lon,
+        lat,
+        props,
+        priority=priority,
+        max_zoom=8,
+        max_workers=1,
+    )
+    with open(path, "rb") as fh:
+        archive = reader.Reader(reader.MmapSource(fh))
+        z0 = mvt.decode(gzip.decompress(archive.get(0, 0, 0)))["localities"]["features"]
+        z8 = mvt.decode(gzip.decompress(archive.get(8, 72, 100)))["localities"][
+            "features"
+        ]
+    # Thinned to the city at z0; every point at max zoom
+    assert [f["properties"]["final_name"] for f in z0] == ["Raleigh"]
+    assert {f["properties"].get("final_name") for f in z8} == {"Raleigh", "Oakwood"}
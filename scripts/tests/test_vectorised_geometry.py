@@ -0,0 +1,80 @@
+import json
+from pathlib import Path
+
+import pytest
+
+build = pytest.importorskip("scripts.build_nc_localities")
+gpd = pytest.importorskip("geopandas")
+
+ELEMENTS = [
+    {
+        "type": "node",
+        "id": 1,
+        "lat": 35.5,
+        "lon": -79.0,
+        "tags": {"name": "A", "place": "town"},
+    },
+    {
+        "type": "way",
+        "id": 2,
+        "center": {"lat": 35.7, "lon": -78.6},
+        "tags": {"name": "B", "place": "city"},
+    },
+    {"type": "relation", "id": 3, "tags": {"name": "No Center", "place": "hamlet"}},
+]
+
+
+class FakeResponse:
+    def __init__(self, body: bytes):
+        self.body = body
+        self.status_code = 200
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return json.loads(self.body)
+
+    def iter_content(self, chunk_size=1):
+        for i in range(0, len(self.body), 5):
+            yield self.body[i : i + 5]
+
+    def close(self):
+        pass
+
+
+class FakeSession:
+    def post(self, url, **kwargs):
+        return FakeResponse(json.dumps({"elements": ELEMENTS}).encode("utf8"))
+
+
+@pytest.mark.parametrize("stream", [False, True])
+def test_fetch_osm_places_builds_points_in_bulk(monkeypatch, stream):
+    monkeypatch.setattr(build, "get_requests_session", lambda **kw: FakeSession())
+    gdf = build.fetch_osm_places(stream=stream)
+    assert list(gdf.columns) == build.OSM_COLUMNS
+    assert list(gdf["osm_id"]) == [1, 2]
+    assert [(p.x, p.y) for p in gdf.geometry] == [(-79.0, 35.5), (-78.6, 35.7)]
+    assert gdf.crs.to_epsg() == 4326
+
+
+def test_points_from_lonlat_fallback_matches(monkeypatch):
+    lon, lat = [-79.0, -78.5], [35.5, 36.0]
+    fast = build.points_from_lonlat(lon, lat)
+    monkeypatch.setattr(build, "np", None)
+    slow = build.points_from_lonlat(lon, lat)
+    assert [p.wkt for p in fast] == [p.wkt for p in slow]
+
+
+def test_load_mineral_localities_from_csv(tmp_path: Path):
+    csv_path = tmp_path / "minerals.csv"
+    csv_path.write_text(
+        "name,latitude,longitude,mineral_type,description\n"
+        "Reed Gold Mine,35.2856,-80.4686,gold,Gold.\n"
+        "Hiddenite,35.9000,-81.0900,hiddenite,Gems.\n",
+        encoding="utf8",
+    )
+    gdf = build.load_mineral_localities_from_csv(csv_path)
+    assert len(gdf) == 2
+    assert gdf.geometry.iloc[0].x == pytest.approx(-80.4686)
+    assert list(gdf["place"]) == ["gold", "hiddenite"]
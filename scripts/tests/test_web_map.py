@@ -0,0 +1,75 @@
+import json
+
+import numpy as np
+import pytest
+
+pytest.importorskip("folium")
+web_map = pytest.importorskip("scripts.web_map")
+
+
+def test_point_map_emits_one_geojson_layer(tmp_path):
+    n = 500
+    lon = np.linspace(-84.0, -76.0, n)
+    lat = np.linspace(34.0, 36.5, n)
+    props = {
+        "final_name": [f"Place {i}" for i in range(n)],
+        "place": ["town"] * n,
+        "population": [None] * (n - 1) + [1200],
+        "tags": [{"wikidata": "Q1"}] * n,
+    }
+    m = web_map.point_map(
+        lon, lat, props, popup_fields=[("Place", "place"), ("Population", "population")]
+    )
+    path = tmp_path / "map.html"
+    m.save(str(path))
+    html = path.read_text(encoding="utf8")
+
+    assert html.count("L.geoJson(") == 1
+    assert "circle_marker_" not in html
+    assert "Place 499" in html and "1200" in html
+    # only the popup/title fields are embedded
+    assert "wikidata" not in html
+    # constant template plus the payload (folium re-serialises it with spaces)
+    fields = {k: props[k] for k in ("final_name", "place", "population")}
+    payload = len(web_map.geojson_writer.dumps_points(lon, lat, fields))
+    assert len(html) < 1.25 * payload + 10_000
+
+
+def test_point_map_centers_on_bounds():
+    m = web_map.point_map([-80.0, -78.0], [35.0, 36.0], {"final_name": ["a", "b"]})
+    assert m.location == [35.5, -79.0]
+
+
+def test_point_map_loads_hashed_data_file(tmp_path):
+    m = web_map.point_map(
+        [-80.0, -78.0],
+        [35.0, 36.0],
+        {"final_name": ["Alpha", "Beta"]},
+        page_dir=tmp_path,
+    )
+    m.save(str(tmp_path / "map.html"))
+    html = (tmp_path / "map.html").read_text(encoding="utf8")
+    (data_file,) = (tmp_path / "data").glob("localities.*.json")
+    assert "Alpha" not in html
+    assert f'"data/{data_file.name}"' in html
+    assert json.loads(data_file.read_text(encoding="utf8"))["features"][1][
+        "properties"
+    ] == {"final_name": "Beta"}
+
+
+def test_point_map_columnar_payload(tmp_path):
+    m = web_map.point_map(
+        [-80.0, -78.0],
+        [35.0, 36.0],
+        {"final_name": ["Alpha", "Beta"]},
+        page_dir=tmp_path,
+        payload="columnar",
+    )
+    m.save(str(tmp_path / "map.html"))
+    html = (tmp_path / "map.html").read_text(encoding="utf8")
+    (data_file,) = (tmp_path / "data").glob("localities.*.json")
+    assert "function columnarToGeoJSON" in html
+    assert f'fetch("data/{data_file.name}")' in html
+    payload = json.loads(data_file.read_text(encoding="utf8"))
+    assert payload["format"] == "columnar-points"
+    assert payload["strings"] == ["Alpha", "Beta"]
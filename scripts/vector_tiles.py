@@ -0,0 +1,467 @@
+"""
+Point vector tiles (Mapbox Vector Tile) in a single-file PMTiles v3 archive.
+
+The localities are cut into one MVT layer per tile for zooms ``min_zoom`` to
+``max_zoom``; the browser then fetches only the tiles in view (HTTP range requests
+into the ``.pmtiles`` file) instead of parsing the whole dataset. Below the
+maximum zoom points are thinned: each tile keeps at most one point per
+``THIN_CELL`` x ``THIN_CELL`` pixel cell, preferring larger places. Zoom levels
+are encoded in parallel worker processes.
+
+Both formats are small enough to write by hand, so no extra dependency is needed:
+
+- MVT: https://github.com/mapbox/vector-tile-spec/tree/master/2.1
+- PMTiles v3: https://github.com/protomaps/PMTiles/blob/main/spec/v3/spec.md
+"""
+
+from __future__ import annotations
+
+import gzip
+import json
+import logging
+import math
+import multiprocessing
+import os
+import struct
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+EXTENT = 4096
+BUFFER = 64  # tile units; points this close to an edge are repeated in the neighbour
+THIN_CELL = 16  # screen pixels (of 256) per thinning cell below max zoom
+DEFAULT_MIN_ZOOM = 0
+DEFAULT_MAX_ZOOM = 12
+DEFAULT_LAYER = "localities"
+
+# PMTiles header enums
+COMPRESSION_GZIP = 2
+TILE_TYPE_MVT = 1
+HEADER_SIZE = 127
+ROOT_DIR_MAX = 16_384 - HEADER_SIZE
+
+_MAX_LAT = 85.0511287798
+
+
+# --- protobuf / MVT encoding -------------------------------------------------
+
+
+def _varint(n: int) -> bytes:
+    out = bytearray()
+    while True:
+        byte = n & 0x7F
+        n >>= 7
+        if n:
+            out.append(byte | 0x80)
+        else:
+            out.append(byte)
+            return bytes(out)
+
+
+def _zigzag(n: int) -> int:
+    return (n << 1) ^ (n >> 63)
+
+
+def _key(field: int, wire_type: int) -> bytes:
+    return _varint((field << 3) | wire_type)
+
+
+def _len_field(field: int, payload: bytes) -> bytes:
+    return _key(field, 2) + _varint(len(payload)) + payload
+
+
+def _value(v) -> bytes:
+    if isinstance(v, (bool, np.bool_)):
+        return _key(7, 0) + _varint(int(v))
+    if isinstance(v, (int, np.integer)):
+        v = int(v)
+        if v >= 0:
+            return _key(5, 0) + _varint(v)
+        return _key(6, 0) + _varint(_zigzag(v))
+    if isinstance(v, (float, np.floating)):
+        return _key(3, 1) + struct.pack("<d", float(v))
+    return _len_field(1, str(v).encode("utf8"))
+
+
+def _is_missing(v):
+    if v is None:
+        return True
+    try:
+        return bool(v != v)
+    except (TypeError, ValueError):
+        return False
+
+
+def encode_tile(layer, px, py, ids, properties, extent=EXTENT) -> bytes:
+    """Encode one MVT tile holding a single point layer.
+
+    ``px``/``py`` are tile-local integer coordinates, ``properties`` maps each
+    field name to the per-point values (missing values are left out).
+    """
+    keys = list(properties)
+    values = []
+    value_index = {}
+    features = bytearray()
+    columns = [properties[k] for k in keys]
+    for n in range(len(px)):
+        tags = []
+        for k, col in enumerate(columns):
+            v = col[n]
+            if _is_missing(v):
+                continue
+            vk = (type(v).__name__, v)
+            idx = value_index.get(vk)
+            if idx is None:
+                idx = value_index[vk] = len(values)
+                values.append(_value(v))
+            tags += (k, idx)
+        geometry = (
+            _varint(9) + _varint(_zigzag(int(px[n]))) + _varint(_zigzag(int(py[n])))
+        )
+        feature = (
+            _key(1, 0)
+            + _varint(int(ids[n]))
+            + _len_field(2, b"".join(_varint(t) for t in tags))
+            + _key(3, 0)
+            + _varint(1)  # POINT
+            + _len_field(4, geometry)
+        )
+        features += _len_field(2, feature)
+
+    body = (
+        _key(15, 0)
+        + _varint(2)
+        + _len_field(1, layer.encode("utf8"))
+        + bytes(features)
+        + b"".join(_len_field(3, k.encode("utf8")) for k in keys)
+        + b"".join(_len_field(4, v) for v in values)
+        + _key(5, 0)
+        + _varint(extent)
+    )
+    return _len_field(3, body)
+
+
+# --- tiling ---------------------------------------------------------------------
+
+
+def lonlat_to_world(lon, lat):
+    """Web Mercator coordinates in [0, 1) x [0, 1), y growing southwards."""
+    lon = np.asarray(lon, dtype=np.float64)
+    lat = np.clip(np.asarray(lat, dtype=np.float64), -_MAX_LAT, _MAX_LAT)
+    wx = (lon + 180.0) / 360.0
+    wy = (
+        1.0 - np.log(np.tan(np.radians(lat)) + 1.0 / np.cos(np.radians(lat))) / math.pi
+    ) / 2.0
+    eps = 1e-12
+    return np.clip(wx, 0.0, 1.0 - eps), np.clip(wy, 0.0, 1.0 - eps)
+
+
+def zxy_to_tileid(z: int, x: int, y: int) -> int:
+    """PMTiles tile id: tiles of lower zooms first, then Hilbert order."""
+    acc = ((1 << (2 * z)) - 1) // 3
+    s = 1 << (z - 1) if z else 0
+    d = 0
+    while s > 0:
+        rx = 1 if x & s else 0
+        ry = 1 if y & s else 0
+        d += s * s * ((3 * rx) ^ ry)
+        if ry == 0:
+            if rx == 1:
+                x = s - 1 - x
+                y = s - 1 - y
+            x, y = y, x
+        s >>= 1
+    return acc + d
+
+
+def thin(tile, px, py, priority, cell):
+    """Indices of the highest-priority point in each ``cell`` of each tile."""
+    cells_per_side = EXTENT // cell
+    key = (tile * cells_per_side + py // cell) * cells_per_side + px // cell
+    order = np.lexsort((np.arange(len(key)), -priority, key))
+    first = np.ones(len(order), dtype=bool)
+    first[1:] = key[order][1:] != key[order][:-1]
+    return np.sort(order[first])
+
+
+def encode_zoom(z, wx, wy, ids, properties, priority, thin_points, layer=DEFAULT_LAYER):
+    """Encode every non-empty tile of zoom ``z``; returns ``{tile_id: gzipped MVT}``."""
+    scale = 1 << z
+    gx, gy = wx * scale, wy * scale
+    tx, ty = np.floor(gx).astype(np.int64), np.floor(gy).astype(np.int64)
+    px = np.floor((gx - tx) * EXTENT).astype(np.int64)
+    py = np.floor((gy - ty) * EXTENT).astype(np.int64)
+
+    if thin_points:
+        keep = thin(tx * scale + ty, px, py, priority, THIN_CELL * EXTENT // 256)
+    else:
+        keep = np.arange(len(tx))
+    tx, ty, px, py = tx[keep], ty[keep], px[keep], py[keep]
+    rows = keep
+
+    # Repeat points near an edge in the neighbouring tiles so symbols are not clipped
+    parts = [(tx, ty, px, py, rows)]
+    for dx in (-1, 0, 1):
+        for dy in (-1, 0, 1):
+            if not dx and not dy:
+                continue
+            near = np.ones(len(tx), dtype=bool)
+            if dx:
+                near &= (px < BUFFER) if dx < 0 else (px >= EXTENT - BUFFER)
+            if dy:
+                near &= (py < BUFFER) if dy < 0 else (py >= EXTENT - BUFFER)
+            nx, ny = tx[near] + dx, ty[near] + dy
+            valid = (nx >= 0) & (nx < scale) & (ny >= 0) & (ny < scale)
+            parts.append(
+                (
+                    nx[valid],
+                    ny[valid],
+                    px[near][valid] - dx * EXTENT,
+                    py[near][valid] - dy * EXTENT,
+                    rows[near][valid],
+                )
+            )
+    tx, ty, px, py, rows = (np.concatenate(c) for c in zip(*parts, strict=True))
+
+    # Group by tile; within a tile draw the most important points last (on top)
+    order = np.lexsort((priority[rows], ty, tx))
+    tx, ty, px, py, rows = tx[order], ty[order], px[order], py[order], rows[order]
+    bounds = np.flatnonzero(np.diff(tx) | np.diff(ty)) + 1
+    tiles = {}
+    for start, stop in zip(np.r_[0, bounds], np.r_[bounds, len(tx)], strict=True):
+        if start == stop:
+            continue
+        r = rows[start:stop]
+        data = encode_tile(
+            layer,
+            px[start:stop],
+            py[start:stop],
+            ids[r],
+            {k: [col[i] for i in r] for k, col in properties.items()},
+        )
+        tile_id = zxy_to_tileid(z, int(tx[start]), int(ty[start]))
+        tiles[tile_id] = gzip.compress(data, compresslevel=6, mtime=0)
+    return tiles
+
+
+# --- PMTiles container ----------------------------------------------------------
+
+
+def serialize_directory(entries) -> bytes:
+    """Entries are ``(tile_id, offset, length, run_length)`` sorted by tile id."""
+    out = bytearray(_varint(len(entries)))
+    last = 0
+    for tile_id, _, _, _ in entries:
+        out += _varint(tile_id - last)
+        last = tile_id
+    for _, _, _, run in entries:
+        out += _varint(run)
+    for _, _, length, _ in entries:
+        out += _varint(length)
+    for n, (_, offset, _, _) in enumerate(entries):
+        prev = entries[n - 1] if n else None
+        if prev is not None and offset == prev[1] + prev[2]:
+            out += _varint(0)
+        else:
+            out += _varint(offset + 1)
+    return gzip.compress(bytes(out), mtime=0)
+
+
+def build_directories(entries):
+    """Return ``(root_bytes, leaves_bytes)``; leaves are used once the root gets too big."""
+    root = serialize_directory(entries)
+    if len(root) <= ROOT_DIR_MAX:
+        return root, b""
+    leaf_size = 4096
+    while True:
+        root_entries, leaves = [], bytearray()
+        for start in range(0, len(entries), leaf_size):
+            chunk = entries[start : start + leaf_size]
+            leaf = serialize_directory(chunk)
+            root_entries.append((chunk[0][0], len(leaves), len(leaf), 0))
+            leaves += leaf
+        root = serialize_directory(root_entries)
+        if len(root) <= ROOT_DIR_MAX:
+            return root, bytes(leaves)
+        leaf_size *= 2
+
+
+def write_pmtiles(
+    path: Path,
+    tiles: dict,
+    metadata: dict,
+    min_zoom,
+    max_zoom,
+    bounds,
+    center_zoom=None,
+):
+    """Write ``{tile_id: bytes}`` as a clustered PMTiles v3 archive.
+
+    Identical tiles (e.g. sea tiles around the same coastal point) are stored once.
+    """
+    entries, data, seen = [], bytearray(), {}
+    for tile_id in sorted(tiles):
+        blob = tiles[tile_id]
+        if blob in seen:
+            offset, length = seen[blob]
+        else:
+            offset, length = len(data), len(blob)
+            seen[blob] = (offset, length)
+            data += blob
+        last = entries[-1] if entries else None
+        if last and last[1] == offset and last[0] + last[3] == tile_id:
+            entries[-1] = (last[0], offset, length, last[3] + 1)
+        else:
+            entries.append((tile_id, offset, length, 1))
+
+    root, leaves = build_directories(entries)
+    meta = gzip.compress(json.dumps(metadata).encode("utf8"), mtime=0)
+    root_offset = HEADER_SIZE
+    meta_offset = root_offset + len(root)
+    leaves_offset = meta_offset + len(meta)
+    data_offset = leaves_offset + len(leaves)
+    west, south, east, north = bounds
+    if center_zoom is None:
+        center_zoom = min_zoom
+    e7 = lambda v: int(round(v * 1e7))  # noqa: E731
+    header = (
+        b"PMTiles"
+        + bytes([3])
+        + struct.pack(
+            "<11Q",
+            root_offset,
+            len(root),
+            meta_offset,
+            len(meta),
+            leaves_offset,
+            len(leaves),
+            data_offset,
+            len(data),
+            len(tiles),
+            len(entries),
+            len(seen),
+        )
+        + bytes(
+            [1, COMPRESSION_GZIP, COMPRESSION_GZIP, TILE_TYPE_MVT, min_zoom, max_zoom]
+        )
+        + struct.pack("<4i", e7(west), e7(south), e7(east), e7(north))
+        + bytes([center_zoom])
+        + struct.pack("<2i", e7((west + east) / 2), e7((south + north) / 2))
+    )
+    assert len(header) == HEADER_SIZE
+
+    path = Path(path)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as fh:
+            fh.write(header)
+            fh.write(root)
+            fh.write(meta)
+            fh.write(leaves)
+            fh.write(data)
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.unlink(tmp)
+        raise
+    return path
+
+
+# --- build step -------------------------------------------------------------------
+
+
+PLACE_PRIORITY = {"city": 5, "town": 4, "village": 3, "hamlet": 2, "suburb": 1}
+
+
+def _number(v):
+    if _is_missing(v):
+        return 0.0
+    try:
+        return float(str(v).replace(",", ""))
+    except ValueError:
+        return 0.0
+
+
+def place_priority(place, population=None):
+    """Thinning priority: place type first, then population."""
+    rank = np.array([PLACE_PRIORITY.get(p, 0) for p in place], dtype=np.float64)
+    if population is None:
+        return rank
+    pop = np.array([_number(p) for p in population], dtype=np.float64)
+    # Population breaks ties within a place type without overtaking the type
+    return rank + np.log1p(np.clip(pop, 0, None)) / 100.0
+
+
+def build_pmtiles(
+    path: Path,
+    lon,
+    lat,
+    properties: dict,
+    priority=None,
+    min_zoom=DEFAULT_MIN_ZOOM,
+    max_zoom=DEFAULT_MAX_ZOOM,
+    layer=DEFAULT_LAYER,
+    max_workers=None,
+):
+    """Cut points into a PMTiles archive, encoding each zoom level in its own process.
+
+    Workers are spawned rather than forked because the caller may have other
+    threads running (e.g. the other export formats being written concurrently).
+    """
+    lon = np.asarray(lon, dtype=np.float64)
+    lat = np.asarray(lat, dtype=np.float64)
+    valid = ~(np.isnan(lon) | np.isnan(lat))
+    lon, lat = lon[valid], lat[valid]
+    fields = {}
+    for k, v in properties.items():
+        kind = np.asarray(v).dtype.kind
+        fields[k] = (
+            "Number" if kind in "iuf" else "Boolean" if kind == "b" else "String"
+        )
+    properties = {k: np.asarray(v, dtype=object)[valid] for k, v in properties.items()}
+    priority = (
+        np.zeros(len(lon))
+        if priority is None
+        else np.asarray(priority, dtype=np.float64)[valid]
+    )
+    ids = np.arange(1, len(lon) + 1, dtype=np.int64)
+    wx, wy = lonlat_to_world(lon, lat)
+
+    tiles = {}
+    zooms = list(range(min_zoom, max_zoom + 1))
+    workers = max_workers or min(len(zooms), os.cpu_count() or 1)
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+        futures = [
+            pool.submit(
+                encode_zoom, z, wx, wy, ids, properties, priority, z < max_zoom, layer
+            )
+            for z in zooms
+        ]
+        for z, fut in zip(zooms, futures, strict=True):
+            zoom_tiles = fut.result()
+            logger.info(f"Zoom {z}: {len(zoom_tiles)} tile(s)")
+            tiles.update(zoom_tiles)
+
+    bounds = (
+        (float(lon.min()), float(lat.min()), float(lon.max()), float(lat.max()))
+        if len(lon)
+        else (-180.0, -85.0, 180.0, 85.0)
+    )
+    metadata = {
+        "name": layer,
+        "format": "pbf",
+        "attribution": "© OpenStreetMap contributors, U.S. Census Bureau",
+        "vector_layers": [
+            {"id": layer, "fields": fields, "minzoom": min_zoom, "maxzoom": max_zoom}
+        ],
+    }
+    write_pmtiles(
+        path, tiles, metadata, min_zoom, max_zoom, bounds, center_zoom=min(max_zoom, 7)
+    )
+    logger.info(f"Wrote {len(tiles)} vector tiles for {len(lon)} points to {path}")
+    return path
@@ -0,0 +1,192 @@
+"""
+Folium maps of point layers as a single data-driven GeoJSON layer.
+
+Instead of one ``folium.CircleMarker`` and ``Popup`` per row (a separate JS block
+per feature), the points are serialised once by ``geojson_writer`` and added as
+one ``folium.GeoJson`` layer. Markers are created by Leaflet from the data, and
+popups are built in the browser from each feature's properties when opened. The
+HTML is a constant template plus the GeoJSON payload.
+
+With ``page_dir`` the payload is written by ``map_assets`` to a content-hashed
+``data/<name>.<hash>.json`` next to the page (with .gz/.br variants) and loaded
+from there, so the page itself stays a few KB. With ``payload="columnar"`` the
+data is a ``columnar_points`` payload, decoded in the page by its ``DECODER_JS``.
+"""
+
+from __future__ import annotations
+
+import json
+import re
+from pathlib import Path
+
+import numpy as np
+
+try:
+    import folium
+    from branca.element import MacroElement
+    from folium.template import Template
+    from folium.utilities import JsCode
+except ImportError:
+    folium = None
+
+try:
+    from scripts import columnar_points, geojson_writer, map_assets
+except ImportError:  # executed from inside ``scripts/``
+    import columnar_points
+    import geojson_writer
+    import map_assets
+
+DEFAULT_CENTER = [35.5, -79.0]
+PAYLOADS = ("geojson", "columnar")
+# folium names every element <kind>_<uuid4 hex>
+_ELEMENT_ID = re.compile(r"(?<=_)[0-9a-f]{32}(?![0-9A-Za-z])")
+
+# Leaflet onEachFeature: bind a lazily-built popup from the feature's properties.
+# Values are HTML-escaped; missing values are skipped.
+_POPUP_JS = """
+function (feature, layer) {{
+    const titleFields = {title_fields};
+    const rows = {popup_fields};
+    const esc = (v) => String(v).replace(/[&<>"']/g, (c) => ({{
+        "&": "&amp;", "<": "&lt;", ">": "&gt;", '"': "&quot;", "'": "&#39;"
+    }})[c]);
+    layer.bindPopup(() => {{
+        const p = feature.properties || {{}};
+        const key = titleFields.find((k) => p[k] !== null && p[k] !== undefined && p[k] !== "");
+        let html = "<b>" + (key ? esc(p[key]) : "") + "</b>";
+        for (const [label, field] of rows) {{
+            const v = p[field];
+            if (v !== null && v !== undefined && v !== "") html += "<br>" + esc(label) + ": " + esc(v);
+        }}
+        return html;
+    }});
+}}
+"""
+
+
+if folium is not None:
+
+    class ColumnarLoader(MacroElement):
+        """Fill an (empty) GeoJson layer from a columnar payload, inline or fetched."""
+
+        _template = Template(
+            """
+            {% macro script(this, kwargs) %}
+            """
+            + columnar_points.DECODER_JS
+            + """
+            {%- if this.url %}
+            fetch({{ this.url|tojson }})
+                .then((r) => r.json())
+                .then((p) => {{ this.layer.get_name() }}.addData(loadPoints(p)));
+            {%- else %}
+            {{ this.layer.get_name() }}.addData(loadPoints({{ this.payload }}));
+            {%- endif %}
+            {% endmacro %}
+            """
+        )
+
+        def __init__(self, layer, url=None, payload=None):
+            super().__init__()
+            self._name = "ColumnarLoader"
+            self.layer = layer
+            self.url = url
+            self.payload = payload
+
+
+def _points_center(lon, lat):
+    """``[lat, lon]`` centre of the points' bounding box (DEFAULT_CENTER if none)."""
+    valid = ~(np.isnan(lon) | np.isnan(lat))
+    if not valid.any():
+        return DEFAULT_CENTER
+    return [
+        float((lat[valid].min() + lat[valid].max()) / 2),
+        float((lon[valid].min() + lon[valid].max()) / 2),
+    ]
+
+
+def point_map(
+    lon,
+    lat,
+    properties,
+    title_fields=("final_name",),
+    popup_fields=(),
+    center=None,
+    zoom_start=7,
+    radius=3,
+    color="blue",
+    page_dir=None,
+    data_name="localities",
+    payload="geojson",
+):
+    """Build a folium Map with all points in one GeoJSON layer.
+
+    ``popup_fields`` is a sequence of ``(label, property)`` pairs shown under the
+    title, which is the first non-empty property of ``title_fields``. When
+    ``page_dir`` (the directory the page will be saved in) is given, the data is
+    written to ``page_dir/data/<data_name>.<hash>.json`` instead of inlined.
+    ``payload`` is ``"geojson"`` or ``"columnar"`` (see ``columnar_points``).
+    """
+    if folium is None:
+        raise ImportError("folium is required to build the HTML map")
+    if payload not in PAYLOADS:
+        raise ValueError(
+            f"Unknown payload format {payload!r} (choose from {', '.join(PAYLOADS)})"
+        )
+    lon = np.asarray(lon, dtype=np.float64)
+    lat = np.asarray(lat, dtype=np.float64)
+    if center is None:
+        center = _points_center(lon, lat)
+
+    needed = list(dict.fromkeys([*title_fields, *(field for _, field in popup_fields)]))
+    columns = {k: properties[k] for k in needed if k in properties}
+    if payload == "columnar":
+        data = columnar_points.dumps_points(lon, lat, columns)
+    else:
+        data = geojson_writer.dumps_points(lon, lat, columns)
+    m = folium.Map(location=center, zoom_start=zoom_start, tiles="OpenStreetMap")
+    data_url = None
+    if page_dir is not None:
+        data_file = map_assets.write_hashed(
+            data, Path(page_dir) / map_assets.DATA_DIR, data_name
+        )
+        data_url = f"{map_assets.DATA_DIR}/{data_file.name}"
+
+    if payload == "columnar":
+        # the layer starts empty and is filled by the decoder
+        source, embed = {"type": "FeatureCollection", "features": []}, True
+    elif data_url is None:
+        source, embed = json.loads(data), True
+    else:
+        source, embed = str(data_file), False
+    layer = folium.GeoJson(
+        source,
+        embed=embed,
+        name="localities",
+        marker=folium.CircleMarker(radius=radius, color=color, fill=True),
+        on_each_feature=JsCode(
+            _POPUP_JS.format(
+                title_fields=json.dumps(list(title_fields)),
+                popup_fields=json.dumps([list(pair) for pair in popup_fields]),
+            )
+        ),
+    )
+    if not embed:
+        # folium would link the on-disk path; the page loads it relative to itself
+        layer.embed_link = data_url
+    layer.add_to(m)
+    if payload == "columnar":
+        # escaped so the inline payload is safe inside <script>
+        inline = None if data_url else data.replace("</", "<\\/")
+        ColumnarLoader(layer, url=data_url, payload=inline).add_to(m)
+    return m
+
+
+def render_html(m) -> str:
+    """Render a folium Map to HTML with element ids numbered in document order,
+    so the same map always renders to the same bytes."""
+    ids = {}
+    html = m.get_root().render()
+    return _ELEMENT_ID.sub(
+        lambda match: ids.setdefault(match.group(0), f"{len(ids):032x}"), html
+    )